@@ -1,4 +1,68 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+
+# 'onefile' unpacks to a temp directory on every launch; 'onedir' starts straight from disk
+build_mode = os.environ.get('MEDIAWIDGET_BUILD_MODE', 'onefile')
+
+# Qt modules and stdlib packages the widget never imports, and the development-only code
+excludes = [
+    'checks',
+    'spotify_stub',
+    'mpd_stub',
+    'soak',
+    'tkinter',
+    'unittest',
+    'pydoc',
+    'PyQt5.QtBluetooth',
+    'PyQt5.QtDBus',
+    'PyQt5.QtDesigner',
+    'PyQt5.QtHelp',
+    'PyQt5.QtLocation',
+    'PyQt5.QtMultimedia',
+    'PyQt5.QtMultimediaWidgets',
+    'PyQt5.QtNetwork',
+    'PyQt5.QtNfc',
+    'PyQt5.QtOpenGL',
+    'PyQt5.QtPositioning',
+    'PyQt5.QtPrintSupport',
+    'PyQt5.QtQml',
+    'PyQt5.QtQuick',
+    'PyQt5.QtQuickWidgets',
+    'PyQt5.QtRemoteObjects',
+    'PyQt5.QtSensors',
+    'PyQt5.QtSerialPort',
+    'PyQt5.QtSql',
+    'PyQt5.QtSvg',
+    'PyQt5.QtTest',
+    'PyQt5.QtWebChannel',
+    'PyQt5.QtWebEngine',
+    'PyQt5.QtWebEngineCore',
+    'PyQt5.QtWebEngineWidgets',
+    'PyQt5.QtWebSockets',
+    'PyQt5.QtXml',
+    'PyQt5.QtXmlPatterns',
+]
+
+# Qt resources that are bundled by default but never loaded
+unused_qt_resources = (
+    os.path.join('Qt5', 'translations'),
+    os.path.join('Qt5', 'qml'),
+    os.path.join('imageformats', 'qgif'),
+    os.path.join('imageformats', 'qicns'),
+    os.path.join('imageformats', 'qjpeg'),
+    os.path.join('imageformats', 'qsvg'),
+    os.path.join('imageformats', 'qtga'),
+    os.path.join('imageformats', 'qtiff'),
+    os.path.join('imageformats', 'qwbmp'),
+    os.path.join('imageformats', 'qwebp'),
+    os.path.join('platforms', 'qminimal'),
+    os.path.join('platforms', 'qoffscreen'),
+    os.path.join('platforms', 'qwebgl'),
+)
+
+
+def is_used(entry):
+    return not any(part in entry[0] for part in unused_qt_resources)
 
 
 a = Analysis(
@@ -10,30 +74,62 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=excludes,
     noarchive=False,
     optimize=0,
 )
+a.binaries = [entry for entry in a.binaries if is_used(entry)]
+a.datas = [entry for entry in a.datas if is_used(entry)]
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='MediaWidget',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-    icon=['icons\\app.ico'],
-)
+if build_mode == 'onedir':
+    # No UPX here: compressed DLLs would have to be unpacked in memory on every launch
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='MediaWidget',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+        icon=['icons\\app.ico'],
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        name='MediaWidget',
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='MediaWidget',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+        icon=['icons\\app.ico'],
+    )
@@ -0,0 +1,115 @@
+import logging
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+from PyQt5.QtCore import QObject, pyqtSignal
+
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost')
+
+RESPONSE_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Media Widget</title></head>
+<body style="font-family: Segoe UI, sans-serif; text-align: center; margin-top: 80px;">
+<h2>{message}</h2><p>You can close this tab.</p></body></html>"""
+
+
+def is_loopback_uri(redirect_uri):
+    """Check if a redirect URI points at this machine"""
+    parsed = urlparse(redirect_uri)
+    return parsed.scheme == 'http' and parsed.hostname in LOOPBACK_HOSTS and parsed.port is not None
+
+
+class _CallbackHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logging.debug("Auth listener: " + format % args)
+
+    def _respond(self, status, message):
+        body = RESPONSE_PAGE.format(message=message).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        listener = self.server.listener
+        url = urlparse(self.path)
+        if url.path.rstrip('/') != listener.callback_path:
+            self._respond(404, "Not found")
+            return
+
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if not secrets.compare_digest(query.get('state', ''), listener.expected_state):
+            # Not our request; keep waiting for the real redirect
+            logging.error("Ignoring authorization callback with mismatched state")
+            self._respond(400, "Invalid authorization state")
+            return
+
+        if 'error' in query:
+            self._respond(200, "Spotify authorization was cancelled")
+            listener.finish(error=query['error'])
+        elif 'code' in query:
+            self._respond(200, "Connected to Spotify")
+            listener.finish(code=query['code'])
+        else:
+            self._respond(400, "Missing authorization code")
+
+
+class LoopbackAuthListener(QObject):
+    # Emitted from the listener thread; connect to QObject slots so they run on the GUI thread
+    code_received = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, redirect_uri, expected_state, timeout=300):
+        super().__init__()
+        parsed = urlparse(redirect_uri)
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.callback_path = parsed.path.rstrip('/')
+        self.expected_state = expected_state
+        self.timeout = timeout
+        self._server = None
+        self._timer = None
+        self._lock = threading.Lock()
+        self._finished = False
+
+    def start(self):
+        """Start listening for the redirect on the loopback interface"""
+        self._server = HTTPServer((self.host, self.port), _CallbackHandler)
+        self._server.listener = self
+        threading.Thread(target=self._server.serve_forever, name='AuthListener', daemon=True).start()
+        self._timer = threading.Timer(self.timeout, self.finish, kwargs={'error': 'timeout'})
+        self._timer.daemon = True
+        self._timer.start()
+        logging.info(f"Listening for Spotify redirect on {self.host}:{self.port}")
+
+    def finish(self, code=None, error=None):
+        """Report the result once and shut the listener down"""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        if code:
+            logging.info("Received authorization code")
+            self.code_received.emit(code)
+        else:
+            logging.error(f"Spotify authorization failed: {error}")
+            self.failed.emit(error or 'unknown')
+        self.stop()
+
+    def stop(self):
+        """Stop the listener and the timeout"""
+        with self._lock:
+            self._finished = True
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        server = self._server
+        self._server = None
+        if server:
+            # shutdown() waits for serve_forever(), so never call it on the serving thread
+            def close():
+                server.shutdown()
+                server.server_close()
+            threading.Thread(target=close, daemon=True).start()
+
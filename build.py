@@ -1,7 +1,15 @@
+import argparse
+import json
 import os
 import shutil
+import statistics
 import subprocess
 import sys
+import tempfile
+import time
+from datetime import datetime
+
+STARTUP_HISTORY = "startup_history.json"
 
 def find_nsis():
     """Find NSIS installation"""
@@ -34,20 +42,74 @@ def clean_build():
     if os.path.exists("dist"):
         shutil.rmtree("dist")
 
-def create_executable():
+def create_executable(mode):
     """Create executable using PyInstaller"""
-    print("Creating executable...")
+    print(f"Creating {mode} executable...")
+    # MediaWidget.spec reads the build mode and the module excludes
+    env = dict(os.environ, MEDIAWIDGET_BUILD_MODE=mode)
     subprocess.run([
         "pyinstaller",
-        "--noconsole",
-        "--icon=icons/app.ico",
-        "--add-data", "icons/*;icons/",
-        "--add-data", "spotify_credentials.json;.",
-        "--name", "MediaWidget",
         "--clean",  # Clean PyInstaller cache
-        "--onefile",  # Create a single executable
-        "media_widget.py"
-    ], check=True)  # Add check=True to raise error if command fails
+        "--noconfirm",
+        "MediaWidget.spec"
+    ], check=True, env=env)  # Add check=True to raise error if command fails
+
+def executable_path(mode):
+    """Return the path of the built executable"""
+    if mode == "onedir":
+        return os.path.join("dist", "MediaWidget", "MediaWidget.exe")
+    return os.path.join("dist", "MediaWidget.exe")
+
+def measure_startup(mode, runs):
+    """Launch the frozen app and record the time to its first paint"""
+    print(f"Measuring startup time ({runs} runs)...")
+    exe = os.path.abspath(executable_path(mode))
+    work_dir = os.path.join("dist", "MediaWidget")  # icons and credentials live here
+    times = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            marker = os.path.join(tmp, "first_paint.txt")
+            # A fresh APPDATA keeps the user's history, token and saved track out of the run,
+            # and every run starts cold instead of from the last run's snapshot
+            env = dict(os.environ, APPDATA=tmp)
+            started = time.time()
+            try:
+                subprocess.run([exe, "--measure-startup", marker], cwd=work_dir, env=env, timeout=60)
+            except subprocess.TimeoutExpired:
+                print("  Warning: the app didn't exit within 60 s, run not counted")
+                continue
+            if not os.path.exists(marker):
+                print("  Warning: the app exited without reporting its first paint")
+                continue
+            with open(marker) as f:
+                times.append(float(f.read()) - started)
+        print(f"  {times[-1] * 1000:.0f} ms")
+    if not times:
+        print("Startup measurement failed: no run reported its first paint")
+        return None
+
+    result = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "mode": mode,
+        "runs_ms": [round(t * 1000) for t in times],
+        "median_ms": round(statistics.median(times) * 1000)
+    }
+    history = []
+    if os.path.exists(STARTUP_HISTORY):
+        with open(STARTUP_HISTORY) as f:
+            history = json.load(f)
+    previous = [entry for entry in history if entry["mode"] == mode]
+    print(f"Median time to first paint ({mode}): {result['median_ms']} ms")
+    if previous and result["median_ms"] > previous[-1]["median_ms"] * 1.2:
+        print(f"Warning: startup regressed from {previous[-1]['median_ms']} ms in the previous {mode} build")
+    for other in ("onefile", "onedir"):
+        last = [entry for entry in history if entry["mode"] == other]
+        if other != mode and last:
+            print(f"Last {other} build: {last[-1]['median_ms']} ms")
+    history.append(result)
+    with open(STARTUP_HISTORY, "w") as f:
+        json.dump(history, f, indent=2)
+    return result
 
 def copy_additional_files():
     """Copy additional files to dist directory"""
@@ -77,7 +139,7 @@ def copy_additional_files():
     
     print(f"Files copied to {dist_dir}")
 
-def create_installer():
+def create_installer(mode):
     """Create installer using NSIS"""
     print("Creating installer...")
     
@@ -96,7 +158,8 @@ def create_installer():
     
     try:
         print(f"Using NSIS at: {nsis_path}")
-        subprocess.run([nsis_path, "installer.nsi"], check=True)
+        defines = ["/DONEDIR"] if mode == "onedir" else []
+        subprocess.run([nsis_path, *defines, "installer.nsi"], check=True)
         print("Installer created successfully!")
     except subprocess.CalledProcessError as e:
         print(f"Error creating installer: {e}")
@@ -104,7 +167,16 @@ def create_installer():
 
 def main():
     """Main build process"""
-    print("Starting build process...")
+    parser = argparse.ArgumentParser(description="Build the Media Widget executable and installer")
+    parser.add_argument("--mode", choices=["onefile", "onedir"], default="onefile",
+                        help="onedir starts faster because nothing is unpacked at launch")
+    parser.add_argument("--measure-startup", action="store_true",
+                        help="Launch the built app and record its time to first paint")
+    parser.add_argument("--startup-runs", type=int, default=5)
+    parser.add_argument("--skip-installer", action="store_true")
+    args = parser.parse_args()
+
+    print(f"Starting {args.mode} build process...")
     
     # Check for required files
     required_files = [
@@ -130,13 +202,18 @@ def main():
         clean_build()
         
         # Create executable
-        create_executable()
+        create_executable(args.mode)
         
         # Copy additional files
         copy_additional_files()
         
+        # Record cold start time of the frozen app
+        if args.measure_startup:
+            measure_startup(args.mode, args.startup_runs)
+        
         # Create installer
-        create_installer()
+        if not args.skip_installer:
+            create_installer(args.mode)
         
         print("\nBuild and installer creation completed successfully!")
         print("You can find:")
@@ -0,0 +1,92 @@
+import argparse
+import sys
+import time
+from urllib.error import HTTPError
+from urllib.request import urlopen
+from PyQt5.QtCore import QCoreApplication
+from auth_listener import LoopbackAuthListener
+from checks.support import Expectations, free_port
+
+
+def get(url):
+    """Return the HTTP status of a GET, or None when nothing answers"""
+    try:
+        with urlopen(url, timeout=5) as response:
+            return response.status
+    except HTTPError as e:
+        return e.code
+    except OSError:
+        # Refused or reset: nothing is listening anymore
+        return None
+
+
+def still_listening(redirect_uri):
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        if get(redirect_uri) is None:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def check(timeout):
+    """Send the listener a matching state, a wrong state, an error redirect and nothing at all"""
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    checks = Expectations()
+    expect = checks.expect
+
+    def start(listener_timeout=30):
+        redirect_uri = f"http://127.0.0.1:{free_port()}/callback"
+        listener = LoopbackAuthListener(redirect_uri, 'expected-state', timeout=listener_timeout)
+        results = []
+        # Queued to this thread, as they are to the widget's GUI thread
+        listener.code_received.connect(lambda code: results.append(('code', code)))
+        listener.failed.connect(lambda error: results.append(('failed', error)))
+        listener.start()
+        return listener, redirect_uri, results
+
+    def wait_for(results):
+        deadline = time.monotonic() + timeout
+        while not results and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.01)
+        # Anything reported twice would arrive right behind the first result
+        time.sleep(0.05)
+        app.processEvents()
+
+    listener, redirect_uri, results = start()
+    expect("matching state: response", get(f"{redirect_uri}?code=abc&state=expected-state"), 200)
+    wait_for(results)
+    expect("matching state: result", results, [('code', 'abc')])
+    expect("matching state: listening afterwards", still_listening(redirect_uri), False)
+
+    listener, redirect_uri, results = start()
+    expect("wrong state: response", get(f"{redirect_uri}?code=evil&state=other-state"), 400)
+    expect("wrong path: response", get(redirect_uri.replace('/callback', '/other') + "?code=x&state=expected-state"), 404)
+    app.processEvents()
+    expect("wrong state: result", results, [])
+    # A forged redirect mustn't end the login; the real one still has to get through
+    expect("wrong state, then matching: response", get(f"{redirect_uri}?code=abc&state=expected-state"), 200)
+    wait_for(results)
+    expect("wrong state, then matching: result", results, [('code', 'abc')])
+
+    listener, redirect_uri, results = start()
+    expect("error redirect: response", get(f"{redirect_uri}?error=access_denied&state=expected-state"), 200)
+    wait_for(results)
+    expect("error redirect: result", results, [('failed', 'access_denied')])
+    expect("error redirect: listening afterwards", still_listening(redirect_uri), False)
+
+    listener, redirect_uri, results = start(listener_timeout=0.5)
+    started = time.monotonic()
+    wait_for(results)
+    expect("timeout: result", results, [('failed', 'timeout')])
+    expect("timeout: reported within a second", time.monotonic() - started < 1.0, True)
+    expect("timeout: listening afterwards", still_listening(redirect_uri), False)
+    return checks
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check the loopback listener against good, forged, cancelled and missing redirects")
+    parser.add_argument('--timeout', type=float, default=5.0, help="Seconds to wait for each result")
+    args = parser.parse_args()
+    check(args.timeout).finish()
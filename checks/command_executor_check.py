@@ -0,0 +1,167 @@
+import argparse
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from PyQt5.QtCore import QCoreApplication
+from spotipy.exceptions import SpotifyException
+from command_executor import CommandSuperseded, HedgedCommandExecutor
+from checks.support import Expectations
+
+
+class FakeBackend:
+    """A simulated backend: a delay before the command is sent, a delay for the acknowledgement, and injected errors"""
+
+    def __init__(self, name, before_send, after_send=lambda: 0.0, error=lambda: None, error_before_send=lambda: None,
+                 commands=None):
+        self.name = name
+        # What a fallback can perform; None for everything
+        self.commands = commands
+        self.before_send = before_send
+        self.after_send = after_send
+        self.error = error
+        # Errors raised before claiming, like a failed playback fetch or device lookup
+        self.error_before_send = error_before_send
+        self.performed = Counter()
+        self.arguments = []
+        self._lock = threading.Lock()
+
+    def handles(self, command):
+        return self.commands is None or command in self.commands
+
+    def run(self, command, claim, **kwargs):
+        time.sleep(self.before_send())
+        error = self.error_before_send()
+        if error is not None:
+            raise error
+        if not claim():
+            raise CommandSuperseded()
+        error = self.error()
+        time.sleep(self.after_send())
+        if error is not None:
+            raise error
+        with self._lock:
+            self.performed[command] += 1
+            self.arguments.append(kwargs)
+
+
+def _simulated_api(rng):
+    def before_send():
+        # Usually a cached device; sometimes a device lookup, rarely a token refresh or new connection
+        roll = rng.random()
+        if roll < 0.02:
+            return rng.uniform(1.5, 3.0)
+        if roll < 0.10:
+            return rng.uniform(0.15, 0.6)
+        return rng.uniform(0.005, 0.03)
+
+    def after_send():
+        return rng.uniform(0.8, 2.0) if rng.random() < 0.03 else rng.uniform(0.04, 0.12)
+
+    def error():
+        if rng.random() < 0.05:
+            return SpotifyException(403, -1, "Player command failed: Premium required", reason='PREMIUM_REQUIRED')
+        return None
+
+    def error_before_send():
+        # The playback fetch or device lookup failing with an error never_performed() doesn't list
+        if rng.random() < 0.03:
+            return SpotifyException(502, -1, "Bad gateway")
+        return None
+    return before_send, after_send, error, error_before_send
+
+
+def simulate(commands, budget_ms, seed, checks):
+    """Compare API-only commands with hedged ones on simulated tail latency"""
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    # Injected failures would otherwise log one line each
+    logging.disable(logging.ERROR)
+    print(f"{commands} commands, {budget_ms} ms budget")
+    for label, hedged in (("API only", False), ("hedged", True)):
+        rng = random.Random(seed)
+        api = FakeBackend('api', *_simulated_api(rng))
+        media_key = FakeBackend('media_key', lambda: rng.uniform(0.001, 0.003))
+        executor = HedgedCommandExecutor(api, media_key if hedged else None, budget_ms=budget_ms)
+        outcomes = []
+        executor.command_finished.connect(outcomes.append)
+        for index in range(commands):
+            executor.execute(rng.choice(['play_pause', 'next_track', 'previous_track']))
+            while len(outcomes) <= index:
+                app.processEvents()
+                time.sleep(0.0005)
+        # Let any request that lost its claim finish before counting what was performed
+        time.sleep(3.5)
+        app.processEvents()
+        executor.shutdown()
+
+        elapsed = sorted(outcome.elapsed_ms for outcome in outcomes)
+        succeeded = sum(1 for outcome in outcomes if outcome.winner)
+        performed = sum(api.performed.values()) + sum(media_key.performed.values())
+        reasons = Counter(outcome.reason for outcome in outcomes if outcome.reason)
+        print(f"{label:<9} p50 {elapsed[len(elapsed) // 2]:6.0f} ms  p95 {elapsed[int(len(elapsed) * 0.95)]:6.0f} ms  "
+              f"p99 {elapsed[int(len(elapsed) * 0.99)]:6.0f} ms  failed {commands - succeeded:3d}  "
+              f"wins {dict(executor.wins)}  fallbacks {dict(reasons)}")
+        checks.expect(f"{label}: commands performed twice", performed - succeeded, 0)
+        if hedged:
+            checks.expect(f"{label}: failed commands", commands - succeeded, 0)
+
+
+def api_error_after_fallback(budget_ms, checks):
+    """The Web API fails before sending, but only after the budget has handed the command to the media key"""
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    late = budget_ms / 1000 + 0.1
+    # The media key still pressing when the API error arrives, and already done by then
+    for label, key_delay in (("media key still running", late + 0.2), ("media key already done", 0.0)):
+        api = FakeBackend('api', lambda: late, error_before_send=lambda: SpotifyException(502, -1, "Bad gateway"))
+        media_key = FakeBackend('media_key', lambda: 0.0, after_send=lambda: key_delay)
+        executor = HedgedCommandExecutor(api, media_key, budget_ms=budget_ms)
+        outcomes = []
+        executor.command_finished.connect(outcomes.append)
+        executor.execute('next_track')
+        deadline = time.monotonic() + late + key_delay + 1.0
+        while time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.001)
+        executor.shutdown()
+        checks.expect(f"API error after fallback, {label}: outcomes",
+                      [(outcome.winner, outcome.reason) for outcome in outcomes], [('media_key', 'budget')])
+        checks.expect(f"API error after fallback, {label}: key presses", media_key.performed['next_track'], 1)
+
+
+def command_without_key(budget_ms, checks):
+    """Starting a picked track has no media key, so it waits out a slow API and fails with it"""
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    slow = budget_ms / 1000 + 0.2
+    for label, error in (("slow API", None), ("API error", SpotifyException(502, -1, "Bad gateway"))):
+        api = FakeBackend('api', lambda: slow, error=lambda: error)
+        media_key = FakeBackend('media_key', lambda: 0.0, commands={'play_pause', 'next_track', 'previous_track'})
+        executor = HedgedCommandExecutor(api, media_key, budget_ms=budget_ms)
+        outcomes = []
+        executor.command_finished.connect(outcomes.append)
+        executor.execute('start_playback', uris=['spotify:track:picked'])
+        deadline = time.monotonic() + slow + 1.0
+        while not outcomes and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.001)
+        executor.shutdown()
+        winner = 'api' if error is None else None
+        checks.expect(f"start_playback, {label}: outcomes",
+                      [(outcome.winner, outcome.reason) for outcome in outcomes], [(winner, None)])
+        checks.expect(f"start_playback, {label}: key presses", sum(media_key.performed.values()), 0)
+        if error is None:
+            checks.expect(f"start_playback, {label}: arguments", api.arguments, [{'uris': ['spotify:track:picked']}])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulate hedged playback commands with fake backends")
+    parser.add_argument('--commands', type=int, default=300)
+    parser.add_argument('--budget-ms', type=int, default=400)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    checks = Expectations()
+    simulate(args.commands, args.budget_ms, args.seed, checks)
+    api_error_after_fallback(args.budget_ms, checks)
+    command_without_key(args.budget_ms, checks)
+    checks.finish()
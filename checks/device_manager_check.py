@@ -0,0 +1,121 @@
+import argparse
+import sys
+import threading
+from types import SimpleNamespace
+import spotipy
+from PyQt5.QtCore import QCoreApplication
+from spotipy.exceptions import SpotifyException
+from device_manager import DeviceManager
+from spotify_stub import SpotifyStubServer, StubState
+from checks.support import Expectations, process_until
+
+
+def check(device_count, workers, rounds):
+    """Pick target devices against a stub with several devices, then hammer the manager from worker threads"""
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    checks = Expectations()
+    expect = checks.expect
+
+    def start():
+        server = SpotifyStubServer(state=StubState(device_count=device_count)).start()
+        spotify = spotipy.Spotify(auth='stub')
+        spotify.prefix = server.prefix
+        return server, SimpleNamespace(spotify=spotify)
+
+    server, widget = start()
+    state = server.state
+    try:
+        state.activate('stubdevice1')
+        manager = DeviceManager(widget)
+        expect("active device: target", manager.target_device_id(), 'stubdevice1')
+        expect("active device: remembered as last used", manager.last_device_id, 'stubdevice1')
+
+        state.activate(None)
+        manager = DeviceManager(widget)
+        expect("nothing active, nothing used before: target", manager.target_device_id(), None)
+
+        manager = DeviceManager(widget, last_device_id='stubdevice2')
+        expect("nothing active, used before: target", manager.target_device_id(), 'stubdevice2')
+        manager.run_command(widget.spotify.start_playback)
+        expect("nothing active, used before: woken device", state.active_device()['id'], 'stubdevice2')
+
+        state.activate(None)
+        manager = DeviceManager(widget, last_device_id='gone')
+        expect("last used device gone: target", manager.target_device_id(), None)
+
+        # The target disappears between the device fetch and the command
+        manager = DeviceManager(widget)
+        manager.observe_playback({'device': {'id': 'stubdevice2', 'name': "Stub Device 2"}})
+        state.devices = [d for d in state.devices if d['id'] != 'stubdevice2']
+        state.activate('stubdevice1')
+        fetches = state.request_counts.get('GET /v1/me/player/devices', 0)
+        try:
+            manager.run_command(widget.spotify.start_playback)
+            outcome = 'played'
+        except SpotifyException as e:
+            outcome = f"failed with {e.http_status}"
+        expect("removed device: command", outcome, 'played')
+        expect("removed device: device fetches", state.request_counts.get('GET /v1/me/player/devices', 0) - fetches, 1)
+        expect("removed device: target afterwards", manager.device_id, 'stubdevice1')
+
+        # Refreshed from a worker, delivered on this thread, as the widget rebuilds its menu on the GUI thread
+        received = []
+        manager.devices_changed.connect(lambda devices: received.append([d['id'] for d in devices]))
+        refresher = threading.Thread(target=manager.refresh)
+        refresher.start()
+        refresher.join()
+        process_until(app, lambda: received, 2)
+        expect("devices_changed from a worker: lists received", received, [[d['id'] for d in state.devices]])
+    finally:
+        server.stop()
+
+    server, widget = start()
+    state = server.state
+    try:
+        state.activate('stubdevice0')
+        manager = DeviceManager(widget, ttl=0)
+        errors = []
+        commands = [widget.spotify.start_playback, widget.spotify.pause_playback]
+
+        def send(index):
+            for i in range(rounds):
+                try:
+                    manager.run_command(commands[(index + i) % 2])
+                except Exception as e:
+                    errors.append(repr(e))
+
+        threads = [threading.Thread(target=send, args=(i,)) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        # Meanwhile the GUI thread observes polls, forgets the account and refreshes the menu
+        ids = [d['id'] for d in state.devices]
+        i = 0
+        while any(thread.is_alive() for thread in threads):
+            step = i % 4
+            if step == 0:
+                manager.observe_playback({'device': {'id': ids[i % len(ids)], 'name': 'Stub'}})
+            elif step == 1:
+                manager.reset()
+            elif step == 2:
+                manager.invalidate()
+            else:
+                manager.refresh()
+            app.processEvents()
+            i += 1
+        for thread in threads:
+            thread.join()
+        print(f"{workers} workers x {rounds} commands against {i} GUI-thread updates")
+        expect("concurrent commands: errors", errors[:3], [])
+        expect("concurrent commands: target is a known device", manager.target_device_id() in ids, True)
+    finally:
+        server.stop()
+    return checks
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check device targeting against the Spotify stub with several devices")
+    parser.add_argument('--devices', type=int, default=4, help="Devices the stub reports")
+    parser.add_argument('--workers', type=int, default=4, help="Threads sending commands at once")
+    parser.add_argument('--rounds', type=int, default=50, help="Commands each thread sends")
+    args = parser.parse_args()
+    check(args.devices, args.workers, args.rounds).finish()
@@ -0,0 +1,37 @@
+import argparse
+import os
+import tempfile
+import time
+from history_store import HistoryStore, WEEK_SECONDS
+
+
+def benchmark(rows, batch_size):
+    """Measure write throughput and aggregate query time on synthetic plays"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, 'history.db'), batch_size=batch_size, max_age_days=None).start()
+        now = time.time()
+        started = time.perf_counter()
+        for i in range(rows):
+            store.add_play(f"track{i % 50000}", f"Song {i % 50000}", f"Artist {i % 2000}",
+                           now - (rows - i) * 30, 180000, 'Benchmark')
+        queued = time.perf_counter() - started
+        store.flush()
+        written = time.perf_counter() - started
+        print(f"Queued {rows} plays in {queued:.2f} s ({rows / queued:,.0f}/s on the caller)")
+        print(f"Wrote {rows} plays in {written:.2f} s ({rows / written:,.0f} rows/s)")
+
+        started = time.perf_counter()
+        store.top_artists(now - WEEK_SECONDS)
+        print(f"Top artists this week: {(time.perf_counter() - started) * 1000:.1f} ms")
+        started = time.perf_counter()
+        store.total_listened_ms(now - WEEK_SECONDS)
+        print(f"Total time this week: {(time.perf_counter() - started) * 1000:.1f} ms")
+        store.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Listening history write benchmark")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+    benchmark(args.rows, args.batch_size)
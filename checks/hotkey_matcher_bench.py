@@ -0,0 +1,98 @@
+import argparse
+import random
+import time
+from hotkey_matcher import HotkeyMatcher, KEY_DOWN, KEY_UP, MODIFIERS, parse_hotkey
+
+
+class _PerHotkeyBaseline:
+    """The previous approach: one handler per hotkey, each checking the pressed keys on every event"""
+
+    def __init__(self, bindings, resolve):
+        self.pressed = set()
+        self.handlers = []
+        for action, hotkey in bindings.items():
+            modifiers, key = parse_hotkey(hotkey)
+            chord = set()
+            for modifier in modifiers:
+                chord.update(resolve(MODIFIERS[modifier][1][0]))
+            chord.update(resolve(key))
+            self.handlers.append((action, frozenset(chord)))
+
+    def feed(self, event_type, scan_code):
+        if event_type == KEY_DOWN:
+            self.pressed.add(scan_code)
+        else:
+            self.pressed.discard(scan_code)
+        triggered = None
+        for action, chord in self.handlers:
+            if event_type == KEY_DOWN and chord <= self.pressed and scan_code in chord:
+                triggered = action
+        return triggered
+
+
+def _synthetic_scan_codes():
+    names = ['ctrl', 'right ctrl', 'shift', 'right shift', 'alt', 'right alt', 'left windows', 'right windows',
+             'up', 'down', 'left', 'right', 'space', 'enter', 'backspace']
+    names += [chr(c) for c in range(ord('a'), ord('z') + 1)] + [str(d) for d in range(10)]
+    codes = {name: (index + 1,) for index, name in enumerate(names)}
+
+    def resolve(name):
+        if name not in codes:
+            raise ValueError(f"Unknown key {name}")
+        return codes[name]
+    return resolve
+
+
+def _key_stream(resolve, count, chord_every, seed=0):
+    rng = random.Random(seed)
+    letters = [resolve(c)[0] for c in 'abcdefghijklmnopqrstuvwxyz'] + [resolve('space')[0]]
+    ctrl, alt, shift = resolve('ctrl')[0], resolve('alt')[0], resolve('shift')[0]
+    chord_keys = [resolve(k)[0] for k in ('p', 'n', 'b', 'up', 'down')]
+    events = []
+    while len(events) < count:
+        if chord_every and rng.random() < 1.0 / chord_every:
+            key = rng.choice(chord_keys)
+            events += [(KEY_DOWN, ctrl), (KEY_DOWN, alt), (KEY_DOWN, key), (KEY_UP, key), (KEY_UP, alt), (KEY_UP, ctrl)]
+        elif rng.random() < 0.05:
+            key = rng.choice(letters)
+            events += [(KEY_DOWN, shift), (KEY_DOWN, key), (KEY_UP, key), (KEY_UP, shift)]
+        else:
+            key = rng.choice(letters)
+            events += [(KEY_DOWN, key), (KEY_UP, key)]
+    return events[:count]
+
+
+def benchmark(events, chord_every):
+    """Feed synthetic key streams to the compiled matcher and to per-hotkey matching"""
+    bindings = {
+        'play_pause': 'ctrl+alt+p',
+        'next_track': 'ctrl+alt+n',
+        'prev_track': 'ctrl+alt+b',
+        'volume_up': 'ctrl+alt+up',
+        'volume_down': 'ctrl+alt+down'
+    }
+    resolve = _synthetic_scan_codes()
+    matcher = HotkeyMatcher(resolve)
+    started = time.perf_counter()
+    matcher.compile(bindings)
+    print(f"compile: {(time.perf_counter() - started) * 1e6:.1f} us for {len(bindings)} bindings")
+
+    for label, every in (('typing only', 0), (f"1 chord per {chord_every} keys", chord_every)):
+        stream = _key_stream(resolve, events, every)
+        for name, engine in (('compiled table', matcher), ('per-hotkey check', _PerHotkeyBaseline(bindings, resolve))):
+            feed = engine.feed
+            matches = 0
+            started = time.perf_counter()
+            for event_type, scan_code in stream:
+                if feed(event_type, scan_code):
+                    matches += 1
+            elapsed = time.perf_counter() - started
+            print(f"{label:<22} {name:<17} {elapsed / len(stream) * 1e9:7.0f} ns/event  ({matches} matches)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure per-keystroke hotkey matching cost")
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--chord-every', type=int, default=50)
+    args = parser.parse_args()
+    benchmark(args.events, args.chord_every)
@@ -0,0 +1,115 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from PyQt5.QtCore import QElapsedTimer, QModelIndex, QTimer
+from PyQt5.QtWidgets import QApplication, QListView, QListWidget
+from library_panel import LibraryCache, LibraryClient, LibraryLoader, SAVED_TRACKS, TrackListModel, compact_rows
+from spotify_stub import SpotifyStubServer, StubState
+
+
+def _process_until(app, predicate, timeout=120):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError("Library benchmark timed out")
+        app.processEvents()
+        time.sleep(0.0005)
+
+
+def benchmark(playlist_size, visible_rows):
+    """Stream a huge playlist from the local stub and compare it with loading everything up front"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    server = SpotifyStubServer(state=StubState(playlist_sizes=(playlist_size,), saved_count=500)).start()
+    folder = tempfile.mkdtemp(prefix='library_bench_')
+    client = LibraryClient('stub', api_prefix=server.prefix)
+    loader = LibraryLoader(client, LibraryCache(os.path.join(folder, 'library_cache.db')))
+
+    # A 1 ms heartbeat: its longest gap is the longest the GUI thread stopped responding
+    heartbeat = {'last': None, 'worst': 0.0}
+    clock = QElapsedTimer()
+
+    def beat():
+        now = clock.nsecsElapsed() / 1e6
+        if heartbeat['last'] is not None:
+            heartbeat['worst'] = max(heartbeat['worst'], now - heartbeat['last'])
+        heartbeat['last'] = now
+    timer = QTimer()
+    timer.timeout.connect(beat)
+
+    def listing():
+        result = []
+        loader.playlists_loaded.connect(result.append)
+        loader.load_playlists()
+        _process_until(app, lambda: result)
+        loader.playlists_loaded.disconnect(result.append)
+        return result[0][0]
+
+    def stream(collection, label):
+        model = TrackListModel(loader)
+        view = QListView()
+        view.setUniformItemSizes(True)
+        view.setLayoutMode(QListView.Batched)
+        view.setModel(model)
+        view.resize(320, visible_rows * 20)
+        view.show()
+        requests_before = client.requests
+        heartbeat.update(last=None, worst=0.0)
+        clock.start()
+        timer.start(1)
+        started = time.perf_counter()
+        model.open(collection)
+        _process_until(app, lambda: model.rows)
+        first = time.perf_counter() - started
+        while len(model.rows) < model.total:
+            # Scrolling to the end is what makes the view call fetchMore
+            view.scrollToBottom()
+            model.fetchMore(QModelIndex())
+            app.processEvents()
+            time.sleep(0.0005)
+        elapsed = time.perf_counter() - started
+        timer.stop()
+        model.detach()
+        view.close()
+        print(f"{label:<26} first rows {first * 1000:7.1f} ms, all {len(model.rows):,} rows "
+              f"{elapsed * 1000:8.1f} ms, {client.requests - requests_before:3d} requests, "
+              f"longest GUI stall {heartbeat['worst']:5.1f} ms")
+        return model
+
+    try:
+        print(f"playlist of {playlist_size:,} tracks, {visible_rows} visible rows")
+        playlist = listing()
+        stream(playlist, "streamed (cold cache)")
+        stream(playlist, "streamed (warm cache)")
+        server.state.edit_playlist(playlist.key.split(':', 1)[1])
+        stream(listing(), "streamed (snapshot moved)")
+        stream(SAVED_TRACKS, "liked songs (cold)")
+        stream(SAVED_TRACKS, "liked songs (304 reuse)")
+
+        # Previous approach: fetch every page, then fill a QListWidget, all on the GUI thread
+        started = time.perf_counter()
+        rows = []
+        for start in range(0, playlist_size, 100):
+            data, _ = client.get(playlist.path, loader._page_params(playlist, start))
+            rows.extend(compact_rows(data['items']))
+        fetched = time.perf_counter() - started
+        widget = QListWidget()
+        for _, title, artist, _ in rows:
+            widget.addItem(f"{title} — {artist}")
+        widget.show()
+        app.processEvents()
+        elapsed = time.perf_counter() - started
+        print(f"{'load all then show':<26} first rows {elapsed * 1000:7.1f} ms, GUI thread blocked "
+              f"{elapsed * 1000:8.1f} ms ({fetched * 1000:.1f} ms of it on the network)")
+    finally:
+        loader.shutdown()
+        server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark streaming a huge playlist into the library panel")
+    parser.add_argument('--tracks', type=int, default=10000)
+    parser.add_argument('--visible-rows', type=int, default=20)
+    args = parser.parse_args()
+    benchmark(args.tracks, args.visible_rows)
@@ -0,0 +1,76 @@
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from lyrics import LyricsLibrary
+
+
+def _make_lrc(song, lines, rng):
+    position = 0
+    rows = [f"[ar:Bench Artist {song % 100}]", f"[ti:Bench Song {song}]"]
+    for line in range(lines):
+        position += rng.randint(1500, 6000)
+        minutes, millis = divmod(position, 60000)
+        rows.append(f"[{minutes:02d}:{millis / 1000:05.2f}]Line {line} of song {song} la la la")
+    return '\n'.join(rows)
+
+
+def benchmark(songs, lines, lookups):
+    """Measure indexing, parsing and line lookup on a generated lyric collection"""
+    rng = random.Random(0)
+    folder = tempfile.mkdtemp(prefix='lyrics_bench_')
+    try:
+        for song in range(songs):
+            with open(os.path.join(folder, f"Bench Artist {song % 100} - Bench Song {song}.lrc"), 'w',
+                      encoding='utf-8') as f:
+                f.write(_make_lrc(song, lines, rng))
+
+        library = LyricsLibrary(folder, cache_size=songs)
+        started = time.perf_counter()
+        library._refresh_index()
+        print(f"index {songs} files:      {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+        started = time.perf_counter()
+        parsed = [library.find(f"Bench Artist {song % 100}", f"Bench Song {song}") for song in range(songs)]
+        elapsed = time.perf_counter() - started
+        print(f"parse ({lines} lines/file): {elapsed / songs * 1000:8.3f} ms per file")
+
+        started = time.perf_counter()
+        for song in range(songs):
+            library.find(f"Bench Artist {song % 100}", f"Bench Song {song}")
+        print(f"cached find:           {(time.perf_counter() - started) / songs * 1e6:8.2f} us per track")
+
+        started = time.perf_counter()
+        for song in range(songs):
+            library.find("No Such Artist", f"Missing Song {song}")
+        print(f"miss (stats folders):  {(time.perf_counter() - started) / songs * 1e6:8.2f} us per track")
+
+        positions = [(rng.choice(parsed), rng.randint(0, lines * 4000)) for _ in range(lookups)]
+        started = time.perf_counter()
+        for lyrics, position in positions:
+            lyrics.line_at(position)
+        bisect_ns = (time.perf_counter() - started) / lookups * 1e9
+
+        started = time.perf_counter()
+        for lyrics, position in positions:
+            current = ''
+            for stamp, line in zip(lyrics.times, lyrics.lines):
+                if stamp > position:
+                    break
+                current = line
+        linear_ns = (time.perf_counter() - started) / lookups * 1e9
+        print(f"line lookup (bisect):  {bisect_ns:8.0f} ns")
+        print(f"line lookup (scan):    {linear_ns:8.0f} ns")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark lyric parsing and line lookup")
+    parser.add_argument('--songs', type=int, default=5000)
+    parser.add_argument('--lines', type=int, default=80)
+    parser.add_argument('--lookups', type=int, default=200000)
+    args = parser.parse_args()
+    benchmark(args.songs, args.lines, args.lookups)
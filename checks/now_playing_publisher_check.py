@@ -0,0 +1,141 @@
+import argparse
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+from media_sources import PlaybackState
+from now_playing_publisher import NowPlayingPublisher, now_playing_payload, replace_file
+from checks.support import Expectations
+
+
+def load_check(subscribers, updates, output_dir, checks):
+    """Publish a run of changes to many simulated SSE subscribers and check what each one received"""
+    publisher = NowPlayingPublisher(output_dir, port=0).start()
+    received = [[] for _ in range(subscribers)]
+    ready = threading.Barrier(subscribers + 1, timeout=30)
+
+    def subscribe(index):
+        connection = http.client.HTTPConnection('127.0.0.1', publisher.server_port, timeout=30)
+        connection.request('GET', '/events')
+        response = connection.getresponse()
+        ready.wait()
+        for raw in response:
+            line = raw.decode('utf-8').strip()
+            if line.startswith('data: '):
+                received[index].append(json.loads(line[6:]))
+                if received[index][-1]['title'] == f"Song {updates - 1}":
+                    break
+        connection.close()
+
+    threads = [threading.Thread(target=subscribe, args=(i,), daemon=True) for i in range(subscribers)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+
+    publish_seconds = []
+    for update in range(updates):
+        state = PlaybackState(f"Song {update}", "Load Artist", True, 0, 180000, None)
+        payload = now_playing_payload('spotify', 'Spotify', state)
+        started = time.perf_counter()
+        publisher.publish(payload)
+        publisher.publish(dict(payload, progress_ms=1000))  # progress only: not a change
+        publish_seconds.append(time.perf_counter() - started)
+        time.sleep(0.01)
+
+    for thread in threads:
+        thread.join(30)
+    publisher.stop()
+
+    complete = sum(1 for events in received if events and events[-1]['title'] == f"Song {updates - 1}")
+    sequences = [[int(e['title'].split()[1]) for e in events if e['title']] for events in received]
+    delivered = sum(len(events) for events in received)
+    publish_seconds.sort()
+    print(f"{subscribers} subscribers, {updates} changes")
+    print(f"publish() p50 {publish_seconds[len(publish_seconds) // 2] * 1e6:.1f} us, "
+          f"max {publish_seconds[-1] * 1e6:.1f} us")
+    print(f"events delivered: {delivered} (slow readers skip straight to the latest state)")
+    checks.expect("subscribers that saw the final state", complete, subscribers)
+    checks.expect("every subscriber saw changes in order",
+                  all(sequence == sorted(sequence) for sequence in sequences), True)
+    with open(os.path.join(output_dir, 'now_playing.json'), encoding='utf-8') as f:
+        checks.expect("now_playing.json title", json.load(f)['title'], f"Song {updates - 1}")
+
+
+def access_check(output_dir, checks):
+    """Local tools and allowed pages can read the state; other pages and rebound host names can't"""
+    allowed = 'https://overlay.example'
+    publisher = NowPlayingPublisher(output_dir, port=0, allowed_origins=[allowed, 'null']).start()
+
+    def get(path, headers):
+        connection = http.client.HTTPConnection('127.0.0.1', publisher.server_port, timeout=5)
+        connection.request('GET', path, headers=headers)
+        response = connection.getresponse()
+        result = (response.status, response.getheader('Access-Control-Allow-Origin'))
+        connection.close()
+        return result
+
+    try:
+        for path in ('/now-playing', '/now-playing.txt', '/events'):
+            checks.expect(f"{path}: local tool", get(path, {}), (200, None))
+            checks.expect(f"{path}: allowed page", get(path, {'Origin': allowed}), (200, allowed))
+            checks.expect(f"{path}: other page", get(path, {'Origin': 'https://evil.example'}), (403, None))
+        checks.expect("/now-playing: local file overlay", get('/now-playing', {'Origin': 'null'}), (200, 'null'))
+        checks.expect("/now-playing: localhost host name", get('/now-playing', {'Host': 'localhost:8974'}),
+                      (200, None))
+        checks.expect("/now-playing: rebound host name", get('/now-playing', {'Host': 'evil.example:8974'}),
+                      (403, None))
+    finally:
+        publisher.stop()
+
+
+def replace_file_check(output_dir, writers, writes, checks):
+    """Writers replacing the same file at once must never fail, tear it or leave temporary files"""
+    path = os.path.join(output_dir, 'replaced.json')
+    errors = []
+    torn = []
+
+    def write(index):
+        for n in range(writes):
+            try:
+                replace_file(path, json.dumps({'writer': index, 'n': n, 'padding': 'x' * 4096}))
+            except OSError as e:
+                errors.append(repr(e))
+
+    def read():
+        while any(thread.is_alive() for thread in threads):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    json.load(f)
+            except FileNotFoundError:
+                pass
+            except ValueError:
+                torn.append(1)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(writers)]
+    reader = threading.Thread(target=read)
+    for thread in threads:
+        thread.start()
+    reader.start()
+    for thread in threads:
+        thread.join()
+    reader.join()
+    leftovers = [name for name in os.listdir(output_dir) if name.startswith('replaced.json.')]
+    checks.expect(f"{writers} writers x {writes}: errors", errors[:3], [])
+    checks.expect(f"{writers} writers x {writes}: torn reads", len(torn), 0)
+    checks.expect(f"{writers} writers x {writes}: temporary files left", leftovers, [])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load and access check the now-playing fan-out")
+    parser.add_argument('--subscribers', type=int, default=200)
+    parser.add_argument('--updates', type=int, default=100)
+    parser.add_argument('--writers', type=int, default=8, help="Threads replacing the same file at once")
+    args = parser.parse_args()
+    checks = Expectations()
+    with tempfile.TemporaryDirectory() as output_dir:
+        load_check(args.subscribers, args.updates, output_dir, checks)
+        access_check(output_dir, checks)
+        replace_file_check(output_dir, args.writers, 200, checks)
+    checks.finish()
@@ -0,0 +1,42 @@
+import argparse
+import json
+import time
+import requests
+from spotify_stub import SpotifyStubServer
+from playback_fetch import LeanPlaybackFetcher, orjson
+
+
+def benchmark(polls):
+    """Compare the full player endpoint against the lean fetch on the local stub"""
+    server = SpotifyStubServer().start()
+    server.state.activate('stubdevice0')
+    server.state.set_playing(True)
+    session = requests.Session()
+    try:
+        total_bytes = 0
+        parse_seconds = 0.0
+        for _ in range(polls):
+            response = session.get(f"{server.prefix}me/player", timeout=5)
+            total_bytes += len(response.content)
+            started = time.perf_counter()
+            json.loads(response.content)
+            parse_seconds += time.perf_counter() - started
+        print(f"current_playback():  {total_bytes / polls:8.0f} bytes/poll  "
+              f"{parse_seconds / polls * 1000:.4f} ms parse/poll (json)")
+
+        decoders = [('json', json.loads)] + ([('orjson', orjson.loads)] if orjson else [])
+        for name, decode in decoders:
+            fetcher = LeanPlaybackFetcher('stub', api_prefix=server.prefix, decode=decode)
+            for _ in range(polls):
+                fetcher.current_playback()
+            print(f"lean fetch ({name}):".ljust(21) + f"{fetcher.bytes_received / polls:8.0f} bytes/poll  "
+                  f"{fetcher.parse_seconds / polls * 1000:.4f} ms parse/poll")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark playback fetch payload size and parse time")
+    parser.add_argument('--polls', type=int, default=500)
+    args = parser.parse_args()
+    benchmark(args.polls)
@@ -0,0 +1,110 @@
+import argparse
+import sys
+import threading
+import time
+from collections import namedtuple
+from PyQt5.QtCore import QCoreApplication
+from diagnostics import LagWatchdog
+from power_manager import BATTERY_SAVER, PERFORMANCE, PowerManager, decide_profile, poll_interval
+from checks.support import Expectations
+
+# The fields of psutil.sensors_battery() that matter here
+Battery = namedtuple('Battery', 'percent secsleft power_plugged')
+
+ON_AC = Battery(100, -2, True)
+ON_BATTERY = Battery(60, 7200, False)
+UNKNOWN_SOURCE = Battery(60, -1, None)
+
+DECISIONS = [
+    ("desktop", None, 'auto', None, PERFORMANCE),
+    ("laptop on AC", ON_AC, 'auto', None, PERFORMANCE),
+    ("laptop on battery", ON_BATTERY, 'auto', None, BATTERY_SAVER),
+    ("unknown source after battery", UNKNOWN_SOURCE, 'auto', BATTERY_SAVER, BATTERY_SAVER),
+    ("unknown source after AC", UNKNOWN_SOURCE, 'auto', PERFORMANCE, PERFORMANCE),
+    ("unknown source at startup", UNKNOWN_SOURCE, 'auto', None, PERFORMANCE),
+    ("fixed performance on battery", ON_BATTERY, 'performance', None, PERFORMANCE),
+    ("fixed saver on AC", ON_AC, 'saver', None, BATTERY_SAVER),
+    ("fixed saver on a desktop", None, 'saver', None, BATTERY_SAVER),
+]
+
+
+def monitor_threads():
+    return sum(1 for thread in threading.enumerate() if thread.name == 'LagWatchdog' and thread.is_alive())
+
+
+def check(cycles):
+    """Feed simulated power readings through the profile decision, the manager and the watchdog switch"""
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    checks = Expectations()
+    expect = checks.expect
+
+    for label, battery, mode, previous, expected in DECISIONS:
+        expect(f"decide: {label}", decide_profile(battery, mode, previous).name, expected.name)
+
+    for profile in (PERFORMANCE, BATTERY_SAVER):
+        expect(f"{profile.name}: poll while playing (ms)", poll_interval(profile, idle=False), profile.active_interval)
+        expect(f"{profile.name}: poll while idle (ms)", poll_interval(profile, idle=True), profile.idle_interval)
+    expect("saver polls less often while playing", BATTERY_SAVER.active_interval > PERFORMANCE.active_interval, True)
+    expect("saver polls less often while idle", BATTERY_SAVER.idle_interval > PERFORMANCE.idle_interval, True)
+    expect("saver: animations", BATTERY_SAVER.animations, False)
+    expect("saver: lag watchdog", BATTERY_SAVER.lag_watchdog, False)
+    expect("performance: lag watchdog", PERFORMANCE.lag_watchdog, True)
+
+    # Unplugged, a reading the driver can't make sense of, a failed read, plugged back in
+    readings = [ON_AC, ON_AC, ON_BATTERY, UNKNOWN_SOURCE, ON_BATTERY, RuntimeError("no battery driver"), ON_AC]
+    feed = iter(readings)
+
+    def read_battery():
+        reading = next(feed)
+        if isinstance(reading, Exception):
+            raise reading
+        return reading
+
+    watchdog = LagWatchdog()
+    manager = PowerManager('auto', read_battery=read_battery, check_interval=60000)
+    emitted = []
+
+    def apply(profile):
+        # What the widget does with the watchdog when the profile changes
+        emitted.append(profile.name)
+        if profile.lag_watchdog:
+            watchdog.start()
+        else:
+            watchdog.stop()
+
+    manager.profile_changed.connect(apply)
+    running = []
+    manager.start()
+    running.append(watchdog.is_running())
+    for _ in readings[1:]:
+        manager.check()
+        running.append(watchdog.is_running())
+    manager.stop()
+    expect("readings: profiles emitted", emitted, ['performance', 'saver', 'performance'])
+    expect("readings: watchdog running after each", running, [True, True, False, False, False, True, True])
+
+    manager = PowerManager('auto', read_battery=lambda: ON_BATTERY)
+    manager.set_mode('performance')
+    expect("fixed performance on battery: profile", manager.profile.name, 'performance')
+    manager.set_mode('auto')
+    expect("back to automatic on battery: profile", manager.profile.name, 'saver')
+
+    # Pausing must not leave monitor threads behind, however often the power source flips
+    for _ in range(cycles):
+        watchdog.stop()
+        watchdog.start()
+    time.sleep(watchdog.interval_ms / 1000.0)
+    app.processEvents()
+    expect(f"{cycles} pause/resume cycles: monitor threads", monitor_threads(), 1)
+    watchdog.stop()
+    time.sleep(watchdog.interval_ms / 1000.0)
+    expect("paused: monitor threads", monitor_threads(), 0)
+    expect("paused: timer active", watchdog.timer.isActive(), False)
+    return checks
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check power profiles against simulated battery, AC and idle readings")
+    parser.add_argument('--cycles', type=int, default=50, help="Times to pause and resume the lag watchdog")
+    args = parser.parse_args()
+    check(args.cycles).finish()
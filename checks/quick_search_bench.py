@@ -0,0 +1,80 @@
+import argparse
+import random
+import sys
+import time
+import spotipy
+from PyQt5.QtWidgets import QApplication
+from spotify_stub import SpotifyStubServer, make_search_track
+from quick_search import QuickSearch, normalize_query
+
+
+def _typing_session(rng, searches):
+    """Pick queries a user might type: catalog titles and artists, some refined and some repeated"""
+    session = []
+    for _ in range(searches):
+        roll = rng.random()
+        if session and roll < 0.25:
+            session.append(rng.choice(session))
+        else:
+            track = make_search_track(rng.randrange(2000))
+            words = track['name'].split()
+            session.append(' '.join(words[:rng.randint(1, len(words))]) if roll < 0.6 else track['name'])
+    return session
+
+
+def benchmark(searches, latency, seed):
+    """Type queries into QuickSearch against the stub and count requests and keystroke-to-results latency"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    server = SpotifyStubServer().start()
+    server.state.search_index()
+    server.state.latency = latency
+    spotify = spotipy.Spotify(auth='stub')
+    spotify.prefix = server.prefix
+    session = _typing_session(random.Random(seed), searches)
+    keystrokes = sum(len(query) for query in session)
+    print(f"{len(session)} searches, {keystrokes} keystrokes, {latency * 1000:.0f} ms server latency")
+
+    configurations = [
+        ("every keystroke", 0, 0),
+        ("debounced", 250, 0),
+        ("debounced + cache", 250, 64),
+    ]
+    for label, debounce_ms, cache_size in configurations:
+        search = QuickSearch(lambda query, limit: spotify.search(q=query, type='track', limit=limit),
+                             debounce_ms=debounce_ms, cache_size=cache_size)
+        shown = {}
+        search.results_ready.connect(lambda query, rows: shown.__setitem__(query, time.perf_counter()))
+        rng = random.Random(seed)
+        latencies = []
+        for query in session:
+            shown.clear()
+            for length in range(1, len(query) + 1):
+                search.set_text(query[:length])
+                typed_at = time.perf_counter()
+                # 60-180 ms between keystrokes
+                deadline = typed_at + rng.uniform(0.06, 0.18) if length < len(query) else typed_at + 10
+                while time.perf_counter() < deadline and normalize_query(query) not in shown:
+                    app.processEvents()
+                    time.sleep(0.001)
+            latencies.append(shown[normalize_query(query)] - typed_at)
+            search.set_text('')
+            app.processEvents()
+        time.sleep(latency + 0.1)
+        app.processEvents()
+        search.shutdown()
+        latencies.sort()
+        print(f"{label:<18} {search.requests / len(session):5.2f} requests/search, "
+              f"{search.local_answers:3d} answered locally, {search.superseded:3d} superseded, "
+              f"last key to results mean {sum(latencies) / len(latencies) * 1000:6.1f} ms "
+              f"p50 {latencies[len(latencies) // 2] * 1000:6.1f} ms "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:6.1f} ms")
+    server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure search requests and latency while typing")
+    parser.add_argument('--searches', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.08, help="Seconds the stub delays each response")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    benchmark(args.searches, args.latency, args.seed)
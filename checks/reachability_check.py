@@ -0,0 +1,125 @@
+import argparse
+import socket
+import sys
+import time
+import requests
+from PyQt5.QtCore import QCoreApplication, QTimer
+from spotipy.exceptions import SpotifyException
+from playback_fetch import LeanPlaybackFetcher
+from reachability import AUTH, OFFLINE, OTHER, SERVER, ReachabilityMonitor, classify_error, probe_address
+from spotify_stub import SpotifyStubServer
+from checks.support import Expectations
+
+# Errors a poll can raise, and how each one has to be classified
+CLASSIFIED = (
+    (requests.exceptions.ConnectionError("refused"), OFFLINE),
+    (requests.exceptions.ConnectTimeout("connect timeout"), OFFLINE),
+    (requests.exceptions.ReadTimeout("read timeout"), OFFLINE),
+    (socket.gaierror("name resolution"), OFFLINE),
+    (ConnectionResetError("reset"), OFFLINE),
+    # A working network that returned something unusable
+    (requests.exceptions.HTTPError("500"), OTHER),
+    (requests.exceptions.JSONDecodeError("bad json", "{", 0), OTHER),
+    (requests.exceptions.ChunkedEncodingError("chunked"), OTHER),
+    (requests.exceptions.ContentDecodingError("gzip"), OTHER),
+    (requests.exceptions.TooManyRedirects("redirects"), OTHER),
+    (requests.exceptions.InvalidURL("url"), OTHER),
+    (SpotifyException(401, -1, "expired"), AUTH),
+    (SpotifyException(429, -1, "rate limited"), SERVER),
+    (SpotifyException(503, -1, "unavailable"), SERVER),
+    (SpotifyException(404, -1, "no device"), OTHER),
+    (ValueError("parse"), OTHER),
+)
+
+
+def check_classification(checks):
+    for error, expected in CLASSIFIED:
+        status = f" {error.http_status}" if isinstance(error, SpotifyException) else ''
+        checks.expect(f"classify {type(error).__name__}{status}", classify_error(error), expected)
+
+
+def simulate(tick_ms, outage_s, latency, checks):
+    """Poll the stub, take it down for an outage and bring it back, with and without the monitor"""
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+
+    def run_events(seconds):
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.001)
+
+    print(f"polls every {tick_ms} ms, {outage_s:.0f} s outage, probes start at {tick_ms} ms and double")
+    for with_monitor in (False, True):
+        server = SpotifyStubServer().start()
+        server.state.activate(server.state.devices[0]['id'])
+        server.state.set_playing(True)
+        server.state.latency = latency
+        port = server.server_address[1]
+        fetcher = LeanPlaybackFetcher('stub', api_prefix=server.prefix, timeout=2)
+        monitor = ReachabilityMonitor(probe_address(server.prefix), first_delay=tick_ms, max_delay=tick_ms * 8)
+        counts = {'attempts': 0, 'errors': 0, 'login_screens': 0, 'shown': None, 'back_at': None}
+        # On reconnect the widget polls once right away instead of waiting for the next tick
+        monitor.back_online.connect(lambda: poll(True))
+
+        def poll(resume=False):
+            if with_monitor and monitor.offline:
+                return
+            counts['attempts'] += 1
+            try:
+                current = fetcher.current_playback()
+                monitor.report_success()
+                counts['shown'] = current['item']['name']
+                if resume and counts['back_at'] is None:
+                    counts['back_at'] = time.monotonic()
+            except Exception as e:
+                counts['errors'] += 1
+                if with_monitor and monitor.report_error(e) == OFFLINE:
+                    # The last good track stays on screen
+                    return
+                # What the widget did before: log, then show the login screen and clear the track
+                counts['login_screens'] += 1
+                counts['shown'] = None
+
+        timer = QTimer()
+        timer.timeout.connect(poll)
+        timer.start(tick_ms)
+        run_events(1.0)
+        before = dict(counts)
+        server.stop()
+        run_events(outage_s)
+        during = {key: counts[key] - before[key] for key in ('attempts', 'errors', 'login_screens')}
+        shown_during = counts['shown']
+        probes = monitor.probes
+        # Same port and state, like the network coming back
+        server = SpotifyStubServer(port, server.state).start()
+        up_at = time.monotonic()
+        run_events(tick_ms * 10 / 1000 + 1.0)
+        timer.stop()
+        monitor.stop()
+        server.stop()
+        if with_monitor:
+            recovered = (counts['back_at'] - up_at) * 1000 if counts['back_at'] else float('nan')
+        else:
+            recovered = float('nan')
+        label = "with monitor" if with_monitor else "before"
+        print(f"{label:<13} during the outage: {during['attempts']:3d} API attempts, {during['errors']:3d} errors, "
+              f"{during['login_screens']:3d} login screens, {probes:2d} probes, "
+              f"track shown: {shown_during or 'nothing'}")
+        if with_monitor:
+            print(f"{'':<13} polling resumed {recovered:.0f} ms after the stub came back, "
+                  f"{outage_s * 1000 / tick_ms:.0f} ticks were skipped")
+            checks.expect("with monitor: login screens during the outage", during['login_screens'], 0)
+            checks.expect("with monitor: track kept during the outage", shown_during is not None, True)
+            checks.expect("with monitor: polling resumed", counts['back_at'] is not None, True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulate a network outage by stopping and restarting the stub")
+    parser.add_argument('--tick-ms', type=int, default=200, help="Poll interval (the widget uses 2000)")
+    parser.add_argument('--outage', type=float, default=10.0, help="Seconds the stub is down")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds the stub delays each response")
+    args = parser.parse_args()
+    checks = Expectations()
+    check_classification(checks)
+    simulate(args.tick_ms, args.outage, args.latency, checks)
+    checks.finish()
@@ -0,0 +1,149 @@
+import argparse
+import sys
+import threading
+import time
+from types import SimpleNamespace
+import spotipy
+from PyQt5.QtCore import QCoreApplication
+from device_manager import DeviceManager
+from media_sources import MpdSource, SourceScheduler, SpotifySource
+from mpd_stub import MpdStubServer, MpdStubState
+from spotify_stub import SpotifyStubServer
+from checks.support import Expectations, free_port, process_until
+
+
+def spotify_widget(server):
+    """The parts of the widget SpotifySource reads, pointed at the stub"""
+    spotify = spotipy.Spotify(auth='stub')
+    spotify.prefix = server.prefix
+    widget = SimpleNamespace(spotify=spotify, is_spotify_connected=True,
+                             is_spotify_process_running=lambda: True,
+                             fetch_playback=lambda client: client.current_playback())
+    widget.device_manager = DeviceManager(widget)
+    return widget
+
+
+def check(latency, repeats):
+    """Poll the Spotify and MPD stubs through one scheduler and check concurrency, selection and commands"""
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    checks = Expectations()
+    expect = checks.expect
+
+    spotify_server = SpotifyStubServer().start()
+    spotify_server.state.activate('stubdevice0')
+    spotify_server.state.set_playing(True)
+    mpd_state = MpdStubState()
+    mpd_state.set_state('play')
+    mpd_server = MpdStubServer(0, mpd_state).start()
+    scheduler = SourceScheduler([SpotifySource(spotify_widget(spotify_server)), MpdSource(port=mpd_server.port)])
+    updates = []
+    threads = set()
+
+    def on_updated(name):
+        updates.append(name)
+        threads.add(threading.current_thread() is threading.main_thread())
+
+    scheduler.source_updated.connect(on_updated)
+    failures = []
+    scheduler.command_failed.connect(lambda name, command: failures.append((name, command)))
+
+    def title(name):
+        state = scheduler.states.get(name)
+        return state.title if state else None
+
+    def poll_all(timeout=10):
+        updates.clear()
+        scheduler.poll()
+        process_until(app, lambda: len(updates) >= len(scheduler.sources), timeout)
+
+    try:
+        poll_all()
+        expect("first poll: sources updated", sorted(updates), ['mpd', 'spotify'])
+        expect("first poll: mpd title", title('mpd'), "MPD Song 0")
+        expect("first poll: spotify title", title('spotify'), spotify_server.state.tracks[0]['name'])
+
+        # Both players answer slowly; polled together, the round takes one delay rather than two
+        spotify_server.state.latency = mpd_state.latency = latency
+        rounds = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            poll_all()
+            rounds.append(time.perf_counter() - started)
+        rounds.sort()
+        print(f"both sources {latency * 1000:.0f} ms late: round p50 {rounds[len(rounds) // 2] * 1000:.0f} ms")
+        expect("slow sources: polled concurrently", rounds[len(rounds) // 2] < latency * 1.8, True)
+        mpd_state.latency = 0.0
+
+        # Spotify hangs; MPD must still update, and repeated polls must not pile up Spotify requests
+        spotify_server.state.latency = latency * 4
+        requests_before = spotify_server.state.request_counts.get('GET /v1/me/player', 0)
+        updates.clear()
+        scheduler.poll()
+        mpd_answered = process_until(app, lambda: 'mpd' in updates, latency * 2)
+        expect("one slow source: mpd updated while spotify pending", mpd_answered and 'spotify' not in updates, True)
+        for _ in range(5):
+            answered = len(updates)
+            scheduler.poll()
+            process_until(app, lambda: len(updates) > answered, latency * 2)
+        process_until(app, lambda: 'spotify' in updates, latency * 8)
+        spotify_server.state.latency = 0.0
+        expect("one slow source: spotify requests while in flight",
+               spotify_server.state.request_counts.get('GET /v1/me/player', 0) - requests_before, 1)
+        expect("updates delivered on the GUI thread", threads, {True})
+
+        # Selection: playing beats paused, then priority, then the most recent to play
+        poll_all()
+        expect("both playing: active source", scheduler.active_source(), 'spotify')
+        spotify_server.state.set_playing(False)
+        poll_all()
+        expect("spotify paused: active source", scheduler.active_source(), 'mpd')
+        mpd_state.set_state('pause')
+        poll_all()
+        expect("both paused: active source (mpd played last)", scheduler.active_source(), 'mpd')
+        spotify_server.state.set_playing(True)
+        poll_all()
+        expect("spotify resumed: active source", scheduler.active_source(), 'spotify')
+        mpd_state.set_state('stop')
+        spotify_server.state.set_playing(False)
+        poll_all()
+        expect("mpd stopped: mpd state", scheduler.states['mpd'], None)
+        expect("mpd stopped: active source", scheduler.active_source(), 'spotify')
+
+        # A command runs on a worker, then the source is polled again
+        updates.clear()
+        scheduler.run_command('mpd', 'play')
+        process_until(app, lambda: 'mpd' in updates, 5)
+        expect("mpd play command: stub state", mpd_state.state, 'play')
+        expect("mpd play command: polled again", bool(scheduler.states['mpd'] and scheduler.states['mpd'].is_playing),
+               True)
+        expect("mpd play command: active source", scheduler.active_source(), 'mpd')
+        updates.clear()
+        scheduler.run_command('mpd', 'next_track')
+        process_until(app, lambda: 'mpd' in updates, 5)
+        expect("mpd next command: title", title('mpd'), "MPD Song 1")
+
+        # MPD goes away: its state clears and the failure is reported, Spotify carries on
+        mpd_server.stop()
+        scheduler.sources['mpd'].close()
+        scheduler.sources['mpd'].port = free_port()
+        spotify_server.state.set_playing(True)
+        poll_all()
+        expect("mpd down: mpd state", scheduler.states['mpd'], None)
+        expect("mpd down: error recorded", 'mpd' in scheduler.errors, True)
+        expect("mpd down: active source", scheduler.active_source(), 'spotify')
+        updates.clear()
+        scheduler.run_command('mpd', 'pause')
+        process_until(app, lambda: 'mpd' in updates, 5)
+        expect("mpd down: failed commands", failures, [('mpd', 'pause')])
+    finally:
+        scheduler.shutdown()
+        spotify_server.stop()
+    return checks
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check the shared source scheduler against the Spotify and MPD stubs")
+    parser.add_argument('--latency', type=float, default=0.2, help="Seconds the stubs delay each response")
+    parser.add_argument('--repeats', type=int, default=5, help="Poll rounds with both sources slow")
+    args = parser.parse_args()
+    check(args.latency, args.repeats).finish()
@@ -0,0 +1,72 @@
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from PyQt5.QtWidgets import QApplication
+from playback_trace import import_isolated_widget
+from spotify_stub import SpotifyStubServer
+
+
+def benchmark(runs, latency):
+    """Start the widget against the stub with and without a saved snapshot and time its first content"""
+    server = SpotifyStubServer().start()
+    server.state.activate(server.state.devices[0]['id'])
+    server.state.set_playing(True)
+    server.state.latency = latency
+    expected = server.state.tracks[0]['name']
+    app = QApplication.instance() or QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as appdata:
+        # media_widget reads the API prefix when it's imported
+        os.environ['MEDIA_WIDGET_API_PREFIX'] = server.prefix
+        media_widget = import_isolated_widget(appdata)
+        # The stub accepts any token, so no credentials file or token cache is needed
+        media_widget.MediaWidget._read_saved_token = lambda self: 'stub'
+        snapshot_path = os.path.join(media_widget.appdata_path, 'last_state.json')
+
+        def start_widget():
+            started = time.perf_counter()
+            widget = media_widget.MediaWidget()
+            widget.is_spotify_process_running = lambda: True
+            widget.show()
+            first = fresh = None
+            while fresh is None and time.perf_counter() - started < 15:
+                app.processEvents()
+                now = time.perf_counter()
+                if first is None and widget.song_label.text():
+                    first = now - started
+                if widget.stale_snapshot is None and widget.song_label.text() == expected:
+                    fresh = now - started
+                time.sleep(0.001)
+            widget.close()
+            return first, fresh
+
+        # Also leaves a snapshot behind for the first run that wants one
+        start_widget()
+        results = {False: [], True: []}
+        for run in range(runs):
+            for with_snapshot in (False, True) if run % 2 == 0 else (True, False):
+                if not with_snapshot and os.path.exists(snapshot_path):
+                    os.remove(snapshot_path)
+                results[with_snapshot].append(start_widget())
+                if not os.path.exists(snapshot_path):
+                    logging.error("The widget closed without saving a snapshot")
+        logging.shutdown()
+    server.stop()
+
+    print(f"{runs} starts each, {latency * 1000:.0f} ms server latency, median time from constructing the widget")
+    for with_snapshot, label in ((False, "no snapshot"), (True, "with snapshot")):
+        firsts = [first for first, fresh in results[with_snapshot] if first is not None]
+        freshes = [fresh for first, fresh in results[with_snapshot] if fresh is not None]
+        print(f"{label:<14} first track shown {statistics.median(firsts) * 1000:7.0f} ms, "
+              f"confirmed by a poll {statistics.median(freshes) * 1000:7.0f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure time to meaningful content at startup")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.15, help="Seconds the stub delays each response")
+    args = parser.parse_args()
+    benchmark(args.runs, args.latency)
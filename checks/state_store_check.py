@@ -0,0 +1,115 @@
+import argparse
+import statistics
+import sys
+import threading
+import time
+from PyQt5.QtCore import QCoreApplication
+from state_store import StateStore
+from checks.support import Expectations
+
+
+def stress(writers, seconds, pause, max_latency_ms):
+    """Write from many threads and the GUI thread at once
+
+    Readers check every snapshot for a torn pair of keys, the version count checks that no transition
+    was lost, and every notification has to arrive within max_latency_ms.
+    """
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    store = StateStore()
+    notifications = []
+    store.changed.connect(lambda keys, state: notifications.append(keys))
+
+    def write(n):
+        # last_track_info always names the track in current_playback_state, written in one transition
+        store.update(current_playback_state={'n': n}, last_track_info=f"Song {n}")
+        # A read-modify-write has to be a transition to see the latest snapshot
+        store.transition(lambda state: {'is_spotify_running': not state.is_spotify_running})
+
+    def torn(state):
+        current = state.current_playback_state
+        return current is not None and state.last_track_info != f"Song {current['n']}"
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    counts = {'writes': 0, 'torn': 0, 'reads': 0}
+
+    def writer(index):
+        n = writes = 0
+        while not stop.is_set():
+            write(index + n * (writers + 1))
+            writes += 1
+            n += 1
+            # Busy-looping writers would only measure how long the GIL starves the GUI thread
+            time.sleep(pause)
+        with lock:
+            counts['writes'] += writes
+
+    def reader():
+        torn_reads = reads = 0
+        while not stop.is_set():
+            torn_reads += torn(store.state)
+            reads += 1
+        with lock:
+            counts['torn'] += torn_reads
+            counts['reads'] += reads
+
+    # Switch threads every few bytecodes instead of every 5 ms, so writers really interleave
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    latencies = []
+    gui_writes = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        # The widget writes from the GUI thread too, the thread notifications are delivered on
+        write(writers + gui_writes * (writers + 1))
+        gui_writes += 1
+        counts['torn'] += torn(store.state)
+        app.processEvents()
+        if store.notify_latency:
+            latencies.append(store.notify_latency)
+            store.notify_latency = 0.0
+        time.sleep(0.001)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    sys.setswitchinterval(switch_interval)
+    app.processEvents()
+    if store.notify_latency:
+        latencies.append(store.notify_latency)
+
+    writes = counts['writes'] + gui_writes
+    # Each write is two transitions that both change something: the track always moves on and the flag flips
+    lost = writes * 2 - store.version
+    print(f"{writers} writer threads pausing {pause * 1000:.1f} ms, the GUI thread and 2 readers for {seconds:.0f} s")
+    print(f"{writes / seconds:.0f} writes/s ({gui_writes} on the GUI thread), {counts['torn']} torn of "
+          f"{counts['reads']} reads, {lost} of {writes * 2} transitions lost, {len(notifications)} notifications")
+    latencies.sort()
+    worst = latencies[-1] * 1000 if latencies else 0.0
+    if latencies:
+        print(f"notification latency median {statistics.median(latencies) * 1000:.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms, max {worst:.2f} ms")
+    started = time.perf_counter()
+    for _ in range(100000):
+        store.state.last_track_info
+    print(f"{(time.perf_counter() - started) * 10:.3f} us per read of .state")
+
+    checks = Expectations()
+    checks.expect("torn snapshots", counts['torn'], 0)
+    checks.expect("lost transitions", lost, 0)
+    checks.expect("notifications delivered", bool(notifications), True)
+    checks.expect(f"slowest notification within {max_latency_ms:.0f} ms", worst <= max_latency_ms, True)
+    return checks
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stress the state store from many threads and check its guarantees")
+    parser.add_argument('--writers', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--pause', type=float, default=0.0005, help="Seconds each writer sleeps between writes")
+    parser.add_argument('--max-latency-ms', type=float, default=100.0)
+    args = parser.parse_args()
+    stress(args.writers, args.seconds, args.pause, args.max_latency_ms).finish()
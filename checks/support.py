@@ -0,0 +1,39 @@
+import socket
+import sys
+import time
+
+
+class Expectations:
+    """Collects mismatches so a check reports all of them before exiting non-zero"""
+
+    def __init__(self):
+        self.problems = []
+
+    def expect(self, label, actual, expected):
+        print(f"{label:<48} {actual}")
+        if actual != expected:
+            self.problems.append(f"{label}: got {actual}, expected {expected}")
+
+    def finish(self):
+        """Print the problems and exit with 1 if there were any"""
+        for problem in self.problems:
+            print(f"FAILED: {problem}")
+        sys.exit(1 if self.problems else 0)
+
+
+def free_port():
+    """A loopback port nothing is listening on right now"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def process_until(app, predicate, timeout):
+    """Run the event loop until predicate() holds; returns whether it did in time"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        app.processEvents()
+        time.sleep(0.001)
+    return True
@@ -0,0 +1,120 @@
+import argparse
+import random
+import sys
+import time
+from PyQt5.QtCore import QEvent, QObject
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import QApplication, QFrame, QLabel, QMainWindow, QSizePolicy, QVBoxLayout, QWidget
+from text_layout import ElidedLabel, elider
+
+
+class _LayoutCounter(QObject):
+    """Counts layout passes anywhere in a window and resizes of the window itself"""
+
+    def __init__(self, window):
+        super().__init__()
+        self.window = window
+        self.layout_requests = 0
+        self.window_resizes = 0
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.LayoutRequest:
+            self.layout_requests += 1
+        elif event.type() == QEvent.Resize and obj is self.window:
+            self.window_resizes += 1
+        return False
+
+
+CJK_WORDS = ['夜に駆ける', '紅蓮華', '残響散歌', '青と夏', '아무노래', '봄날', '稻香', '晴天', '告白氣球']
+LATIN_WORDS = ['Midnight', 'River', 'Golden', 'Hour', 'Paper', 'Planes', 'Electric', 'Dreams', 'Of', 'The',
+               'Neon', 'Summer', 'Heart', 'Glass', 'Wildest', 'Satellite', 'Remastered', 'Version', 'Live']
+
+
+def _track_titles(count, seed):
+    """Titles and artists of mixed length and script, like a real listening session"""
+    rng = random.Random(seed)
+    tracks = []
+    for _ in range(count):
+        words = CJK_WORDS if rng.random() < 0.3 else LATIN_WORDS
+        joiner = '' if words is CJK_WORDS and rng.random() < 0.5 else ' '
+        title = joiner.join(rng.choice(words) for _ in range(rng.choice([1, 2, 3, 5, 8])))
+        artist = ' '.join(rng.choice(words) for _ in range(rng.choice([1, 2, 4])))
+        tracks.append((title, artist))
+    return tracks
+
+
+def _truncate(text, max_length):
+    # The character-count truncation the widget used before
+    return text[:max_length - 3] + "..." if len(text) > max_length else text
+
+
+def _build_window(elided):
+    window = QMainWindow()
+    central = QWidget()
+    window.setCentralWidget(central)
+    layout = QVBoxLayout(central)
+    layout.setContentsMargins(40, 40, 40, 40)
+    labels = []
+    for size, bold in ((9, False), (18, True), (12, False)):
+        if elided:
+            label = ElidedLabel()
+        else:
+            label = QLabel()
+            label.setWordWrap(True)
+            label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
+        label.setFont(QFont('Segoe UI', size, QFont.Bold if bold else QFont.Normal))
+        layout.addWidget(label)
+        labels.append(label)
+    # Stands in for the volume slider and the control buttons
+    controls = QFrame()
+    controls.setFixedHeight(120)
+    layout.addWidget(controls)
+    window.setMinimumWidth(360)
+    window.setMaximumWidth(500)
+    return window, labels
+
+
+def benchmark(changes, seed):
+    """Show a session of tracks with character-count truncation and with elision, counting relayouts"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    tracks = _track_titles(changes, seed)
+    print(f"{changes} track changes, {sum(1 for title, _ in tracks if not title.isascii())} with CJK or Hangul titles")
+    for label, elided in (("character count", False), ("elided", True)):
+        window, (status, song, artist) = _build_window(elided)
+        window.show()
+        app.processEvents()
+        counter = _LayoutCounter(window)
+        app.installEventFilter(counter)
+        overflowed = cut_early = 0
+        started = time.perf_counter()
+        for title, name in tracks:
+            status.setText("Now playing on Spotify")
+            if elided:
+                song.setText(title)
+                artist.setText(name)
+            else:
+                song.setText(_truncate(title, 25))
+                artist.setText(_truncate(name, 30))
+            app.processEvents()
+            if not elided:
+                for widget, text, limit in ((song, title, 25), (artist, name, 30)):
+                    needed = widget.fontMetrics().horizontalAdvance(widget.text())
+                    if needed > widget.contentsRect().width():
+                        overflowed += 1
+                    elif len(text) > limit and widget.fontMetrics().horizontalAdvance(text) <= widget.contentsRect().width():
+                        cut_early += 1
+        elapsed_us = (time.perf_counter() - started) / changes * 1e6
+        app.removeEventFilter(counter)
+        print(f"{label:<16} layout passes {counter.layout_requests / changes:5.2f}/change, "
+              f"window resizes {counter.window_resizes:3d}, {elapsed_us:6.0f} us/change, "
+              f"labels wrapped past one line {overflowed:3d}, cut while they fit {cut_early:3d}")
+        window.close()
+    print(f"elision cache: {elider.hits} hits, {elider.misses} misses")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Count relayouts per track change with and without elision")
+    parser.add_argument('--changes', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=3)
+    args = parser.parse_args()
+    benchmark(args.changes, args.seed)
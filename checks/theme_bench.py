@@ -0,0 +1,140 @@
+import argparse
+import sys
+import time
+from PyQt5.QtCore import QEvent, Qt
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import (QApplication, QFrame, QHBoxLayout, QLabel, QLineEdit, QPushButton, QSlider,
+                             QVBoxLayout, QWidget)
+from theme import apply_theme, build_stylesheet
+
+
+def _build_card(parent_layout):
+    """One copy of the widget's styled controls"""
+    class ModernButton(QPushButton):
+        pass
+
+    class CloseButton(ModernButton):
+        pass
+
+    class GlassFrame(QFrame):
+        pass
+
+    frame = QFrame()
+    frame.setObjectName('contentFrame')
+    layout = QVBoxLayout(frame)
+    header = QWidget()
+    header_layout = QHBoxLayout(header)
+    for name in ('accountButton', 'settingsButton'):
+        button = QPushButton()
+        button.setObjectName(name)
+        header_layout.addWidget(button)
+    search = QLineEdit()
+    search.setObjectName('searchBox')
+    header_layout.addWidget(search)
+    header_layout.addWidget(CloseButton("×"))
+    layout.addWidget(header)
+    song = QWidget()
+    song.setObjectName('songContainer')
+    song_layout = QVBoxLayout(song)
+    for name, text in (('statusLabel', "Playing on Spotify"), ('songLabel', "Song title"),
+                       ('artistLabel', "Artist"), ('lyricsLabel', "A line of lyrics")):
+        label = QLabel(text)
+        label.setObjectName(name)
+        song_layout.addWidget(label)
+    layout.addWidget(song)
+    slider = QSlider(Qt.Horizontal)
+    slider.setObjectName('volumeSlider')
+    layout.addWidget(slider)
+    glass = GlassFrame()
+    glass_layout = QHBoxLayout(glass)
+    buttons = [ModernButton() for _ in range(3)]
+    for button in buttons:
+        button.setFixedSize(45, 45)
+        glass_layout.addWidget(button)
+    layout.addWidget(glass)
+    parent_layout.addWidget(frame)
+    return frame, buttons
+
+
+def _split_rules(sheet):
+    return [block.strip() + '\n}' for block in sheet.split('}') if block.strip()]
+
+
+def _per_widget_sheets(root, sheet):
+    """The previous approach: each styled widget gets its own stylesheet with just its rules"""
+    rules = _split_rules(sheet)
+    for widget in [root] + root.findChildren(QWidget):
+        keys = [f"#{widget.objectName()}"] if widget.objectName() else []
+        keys.append(type(widget).__name__)
+        own = [rule for rule in rules if any(key in rule.split('{')[0] for key in keys)]
+        if own:
+            widget.setStyleSheet('\n'.join(own))
+
+
+def _measure(app, label, cards, hovers):
+    app.setStyleSheet('')
+    window = QWidget()
+    layout = QVBoxLayout(window)
+    buttons = []
+    for _ in range(cards):
+        buttons += _build_card(layout)[1]
+    started = time.perf_counter()
+    if label == "application sheet":
+        apply_theme(app, 'dark')
+    else:
+        _per_widget_sheets(window, build_stylesheet('dark'))
+    window.show()
+    app.processEvents()
+    polish_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for index in range(hovers):
+        button = buttons[index % len(buttons)]
+        QTest.mouseMove(button)
+        button.repaint()
+    hover_us = (time.perf_counter() - started) / hovers * 1e6
+
+    switch_ms = None
+    if label == "application sheet":
+        started = time.perf_counter()
+        apply_theme(app, 'light')
+        app.processEvents()
+        apply_theme(app, 'dark')
+        app.processEvents()
+        switch_ms = (time.perf_counter() - started) / 2 * 1000
+    widgets = len(window.findChildren(QWidget)) + 1
+    window.close()
+    window.deleteLater()
+    # processEvents() doesn't run deferred deletes; stale widgets would be restyled by the next run
+    app.sendPostedEvents(None, QEvent.DeferredDelete)
+    return widgets, polish_ms, hover_us, switch_ms
+
+
+def benchmark(cards, hovers, repeats):
+    """Time style polish, hover repaints and theme switches with one app sheet versus per-widget sheets"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    labels = ("per-widget sheets", "application sheet")
+    # Font and style setup happens once per process; keep it out of either measurement
+    _measure(app, labels[0], 1, 10)
+    results = {label: [] for label in labels}
+    for repeat in range(repeats):
+        for label in labels if repeat % 2 == 0 else reversed(labels):
+            results[label].append(_measure(app, label, cards, hovers))
+    print(f"{cards} cards, median of {repeats} runs")
+    for label in labels:
+        runs = results[label]
+        median = lambda values: sorted(values)[len(values) // 2]
+        switch = ''
+        if runs[0][3] is not None:
+            switch = f", theme switch {median([run[3] for run in runs]):.1f} ms"
+        print(f"{label:<18} {runs[0][0]} widgets: style + first show {median([run[1] for run in runs]):7.1f} ms, "
+              f"hover + repaint {median([run[2] for run in runs]):6.0f} us{switch}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark style polish and hover repaint cost")
+    parser.add_argument('--cards', type=int, default=20, help="Copies of the widget's controls to style")
+    parser.add_argument('--hovers', type=int, default=2000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+    benchmark(args.cards, args.hovers, args.repeats)
@@ -0,0 +1,66 @@
+import argparse
+import os
+import tempfile
+import time
+from library_panel import LibraryClient
+from spotify_stub import SpotifyStubServer, make_track
+from track_cache import TrackCache
+
+
+def benchmark(ids, latency):
+    """Count API calls for resolving ids one at a time, batched cold, warm in memory and warm from disk"""
+    server = SpotifyStubServer().start()
+    server.state.latency = latency
+    # A listening history repeats tracks; every id here is distinct, the worst case for a cache
+    track_ids = [make_track(i)['id'] for i in range(ids)]
+
+    def measure(label, run, client):
+        before = client.requests
+        started = time.perf_counter()
+        resolved = run()
+        elapsed = time.perf_counter() - started
+        print(f"{label:<26} {client.requests - before:5d} API calls {elapsed * 1000:8.0f} ms, "
+              f"{resolved:5d} resolved")
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'track_cache.json')
+            print(f"{ids} distinct track ids, {latency * 1000:.0f} ms server latency")
+
+            client = LibraryClient('stub', server.prefix)
+            measure("one at a time", lambda: sum(1 for track_id in track_ids
+                                                 if client.get(f"tracks/{track_id}", {'market': client.market})[0]),
+                    client)
+
+            cache = TrackCache(path, client)
+            measure("batched, cold", lambda: len(cache.resolve(track_ids).result()), client)
+            measure("batched, warm", lambda: len(cache.resolve(track_ids).result()), client)
+            cache.close()
+
+            client = LibraryClient('stub', server.prefix)
+            cache = TrackCache(path, client)
+            started = time.perf_counter()
+            cache.load()
+            print(f"{'loaded from disk':<26} {len(cache.entries):5d} tracks in {(time.perf_counter() - started) * 1000:.0f} ms, "
+                  f"{os.path.getsize(path) / 1024:.0f} KiB")
+            measure("batched, warm from disk", lambda: len(cache.resolve(track_ids).result()), client)
+            cache.close()
+
+            # Two callers asking for overlapping ids at once, e.g. the history dialog and a queue refresh
+            client = LibraryClient('stub', server.prefix)
+            cache = TrackCache(os.path.join(tmp, 'coalesce.json'), client)
+            measure("overlapping callers, cold",
+                    lambda: sum(len(future.result()) for future in [cache.resolve(track_ids[:600]),
+                                                                   cache.resolve(track_ids[400:])]), client)
+            print(f"{'':<26} {cache.coalesced:5d} ids shared a pending request")
+            cache.close()
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Count API calls for resolving track ids with the track cache")
+    parser.add_argument('--ids', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.02, help="Seconds the stub delays each response")
+    args = parser.parse_args()
+    benchmark(args.ids, args.latency)
@@ -0,0 +1,91 @@
+import argparse
+import sys
+import time
+from PyQt5.QtCore import QCoreApplication
+from volume_engine import VolumeEngine
+
+
+class FakeAudioBackend:
+    """Records every write, as (seconds, percent)"""
+
+    def __init__(self):
+        self.history = []
+        self.started = time.monotonic()
+
+    def set_level(self, percent):
+        self.history.append((time.monotonic() - self.started, percent))
+
+    def release(self):
+        pass
+
+
+def _largest_jump(history, start):
+    levels = [start] + [level for _, level in history]
+    return max((abs(b - a) for a, b in zip(levels, levels[1:])), default=0)
+
+
+def benchmark(ramp_ms, fade_ms):
+    """Count backend writes for volume hotkeys, slider drags and fades, before and with the engine"""
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+
+    def run_events(seconds):
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.001)
+
+    def engine_at(level):
+        backend = FakeAudioBackend()
+        engine = VolumeEngine(backend, ramp_ms=ramp_ms, fade_ms=fade_ms)
+        engine.set_target(level)
+        backend.history.clear()
+        engine.writes = 0
+        return engine, backend
+
+    print(f"{ramp_ms} ms ramps, {fade_ms} ms fades")
+    # Ten volume-up presses 40 ms apart (keyboard auto-repeat), starting from 50%
+    backend = FakeAudioBackend()
+    slider = 50
+    for _ in range(10):
+        # What the hotkeys did before: set_volume(slider + 5) without moving the slider
+        backend.set_level(min(100, slider + 5))
+    print(f"{'10 presses, before':<26} {len(backend.history):3d} writes, ends at {backend.history[-1][1]:3d}%, "
+          f"largest jump {_largest_jump(backend.history, 50):2d}%")
+    engine, backend = engine_at(50)
+    for _ in range(10):
+        engine.nudge(5)
+        run_events(0.04)
+    run_events(ramp_ms / 1000 + 0.05)
+    print(f"{'10 presses, engine':<26} {engine.writes:3d} writes, ends at {engine.level:3d}%, "
+          f"largest jump {_largest_jump(backend.history, 50):2d}%")
+
+    # A slider drag from 0 to 100 that emits a value every 8 ms
+    engine, backend = engine_at(0)
+    for value in range(2, 101, 2):
+        engine.set_target(value)
+        run_events(0.008)
+    run_events(ramp_ms / 1000 + 0.05)
+    print(f"{'slider drag, before':<26} {50:3d} writes (one per valueChanged)")
+    print(f"{'slider drag, engine':<26} {engine.writes:3d} writes, ends at {engine.level:3d}%")
+
+    # Fade out before a pause, then back in after the next play
+    engine, backend = engine_at(60)
+    paused_at = []
+    engine.fade_out(lambda: paused_at.append(engine.level))
+    run_events(fade_ms / 1000 + 0.05)
+    fade_out_writes = engine.writes
+    engine.end_fade(fade_in=False)
+    engine.silence()
+    engine.end_fade(fade_in=True)
+    run_events(fade_ms / 1000 + 0.05)
+    print(f"{'fade out, pause':<26} {fade_out_writes:3d} writes, pause sent at {paused_at[0]:3d}%, "
+          f"largest jump {_largest_jump(backend.history[:fade_out_writes], 60):2d}%")
+    print(f"{'restore, silence, fade in':<26} {engine.writes - fade_out_writes:3d} writes, ends at {engine.level:3d}%")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Count volume backend writes with a fake audio backend")
+    parser.add_argument('--ramp-ms', type=int, default=150)
+    parser.add_argument('--fade-ms', type=int, default=300)
+    args = parser.parse_args()
+    benchmark(args.ramp_ms, args.fade_ms)
@@ -0,0 +1,216 @@
+import logging
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from requests.exceptions import ConnectTimeout, ConnectionError as RequestsConnectionError
+from spotipy.exceptions import SpotifyException
+from urllib3.exceptions import ConnectTimeoutError
+
+# winner is the backend that performed the command, or None when it failed; reason says why the fallback ran
+CommandOutcome = namedtuple('CommandOutcome', 'command winner reason result elapsed_ms error')
+
+
+class CommandSuperseded(Exception):
+    """Raised inside a backend that lost the command to the other path"""
+
+
+class ClaimGate:
+    """Lets exactly one backend perform a command"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.owner = None
+
+    def claim(self, owner):
+        with self._lock:
+            if self.owner is None:
+                self.owner = owner
+            return self.owner == owner
+
+    def release(self, owner):
+        """Hand the command back after its owner failed without performing it"""
+        with self._lock:
+            if self.owner == owner:
+                self.owner = None
+
+
+def never_performed(error):
+    """Whether an API error from the command request itself proves it had no effect, so the fallback can't double it
+
+    Errors raised before the request went out (the playback fetch, the device lookup) never reach
+    this: the executor sees the unclaimed gate and falls back whatever they were.
+    """
+    if isinstance(error, SpotifyException):
+        # Expired token, Premium required, no device or rate limited: rejected before anything happened
+        return error.http_status in (401, 403, 404, 429)
+    if isinstance(error, ConnectTimeout):
+        return True
+    if isinstance(error, RequestsConnectionError):
+        # Offline or DNS failure; a connection dropped mid-request may still have gone through
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, ConnectTimeoutError)
+    return False
+
+
+class WebApiBackend:
+    name = 'api'
+
+    def __init__(self, widget):
+        # The widget owns the Web API client and the device handling
+        self.widget = widget
+
+    def run(self, command, claim, **kwargs):
+        """Perform a command through the Web API; claim() is called right before the request goes out"""
+        widget = self.widget
+        spotify = widget.spotify
+        result = None
+        if command == 'play_pause':
+            current = widget.fetch_playback(spotify)
+            result = 'pause' if current and current['is_playing'] else 'play'
+            method = spotify.pause_playback if result == 'pause' else spotify.start_playback
+        else:
+            method = getattr(spotify, command)
+
+        def send(device_id=None, **kwargs):
+            # Everything up to here (device lookup, the playback fetch) can still lose to the fallback
+            if not claim():
+                raise CommandSuperseded()
+            return method(device_id=device_id, **kwargs)
+        widget.device_manager.run_command(send, **kwargs)
+        return result
+
+
+class MediaKeyBackend:
+    name = 'media_key'
+
+    def __init__(self, press_key, keys):
+        # keys maps a command to its virtual-key code; press_key raises on failure
+        self.press_key = press_key
+        self.keys = keys
+
+    def handles(self, command):
+        # A key can only repeat what the player already has, not start a picked track
+        return command in self.keys
+
+    def run(self, command, claim):
+        if not claim():
+            raise CommandSuperseded()
+        self.press_key(self.keys[command])
+
+
+class _Attempt:
+    def __init__(self, command, kwargs, fallback):
+        self.command = command
+        self.kwargs = kwargs
+        # None when there's no fallback or it can't perform this command
+        self.fallback = fallback
+        self.gate = ClaimGate()
+        self.started = time.perf_counter()
+        self.timer = None
+        self.fallback_reason = None
+        self.done = False
+
+
+class HedgedCommandExecutor(QObject):
+    # Emitted on the GUI thread with a CommandOutcome once a command has finished either way
+    command_finished = pyqtSignal(object)
+    # Internal: workers hand (attempt, backend name, result, error) back through a queued signal
+    _attempt_finished = pyqtSignal(object, str, object, object)
+
+    def __init__(self, primary, fallback=None, budget_ms=400, max_workers=2):
+        super().__init__()
+        self.primary = primary
+        self.fallback = fallback
+        self.budget_ms = budget_ms
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='Command')
+        self.wins = Counter()
+        self._attempt_finished.connect(self._on_attempt_finished)
+
+    def run_inline(self):
+        """Run commands on the calling thread without a budget (used by replays and soak runs)"""
+        self.executor.shutdown(wait=True)
+        self.executor = None
+
+    def execute(self, command, **kwargs):
+        """Start a command through the primary backend; the result arrives through command_finished
+
+        kwargs go to the primary. A command the fallback can't perform waits for the primary however long it takes.
+        """
+        fallback = self.fallback if self.fallback is not None and self.fallback.handles(command) else None
+        attempt = _Attempt(command, kwargs, fallback)
+        if self.executor is not None and fallback is not None:
+            attempt.timer = QTimer()
+            attempt.timer.setSingleShot(True)
+            attempt.timer.timeout.connect(lambda: self._on_budget_expired(attempt))
+            attempt.timer.start(self.budget_ms)
+        self._submit(self.primary, attempt)
+
+    def _submit(self, backend, attempt):
+        if self.executor is None:
+            self._run(backend, attempt)
+        else:
+            self.executor.submit(self._run, backend, attempt)
+
+    def _run(self, backend, attempt):
+        try:
+            result = backend.run(attempt.command, lambda: attempt.gate.claim(backend.name), **attempt.kwargs)
+            error = None
+        except Exception as e:
+            result, error = None, e
+        self._attempt_finished.emit(attempt, backend.name, result, error)
+
+    def _on_budget_expired(self, attempt):
+        if attempt.done or attempt.fallback_reason is not None:
+            return
+        if attempt.gate.claim(attempt.fallback.name):
+            # The API request hasn't gone out yet, so it can no longer take effect
+            self._start_fallback(attempt, 'budget')
+        else:
+            logging.info(f"{attempt.command}: Web API request already sent, waiting past the "
+                         f"{self.budget_ms} ms budget instead of risking a double command")
+
+    def _start_fallback(self, attempt, reason):
+        attempt.fallback_reason = reason
+        self._submit(attempt.fallback, attempt)
+
+    def _on_attempt_finished(self, attempt, name, result, error):
+        if attempt.done or isinstance(error, CommandSuperseded):
+            return
+        if name == self.primary.name and attempt.fallback_reason is not None:
+            # The media key owns the command, so only its completion decides how it went
+            if error is not None:
+                logging.info(f"{attempt.command}: Web API failed after the media key took over ({str(error)})")
+            return
+        if name == self.primary.name and error is not None and attempt.fallback is not None:
+            # An unclaimed gate means the API failed before sending anything, so any error is safe to fall back on
+            if attempt.gate.owner == name and never_performed(error):
+                attempt.gate.release(name)
+            if attempt.gate.claim(attempt.fallback.name):
+                logging.info(f"{attempt.command}: Web API failed ({str(error)}), using the media key")
+                self._start_fallback(attempt, 'api_error')
+                return
+        self._finish(attempt, name if error is None else None, result, error)
+
+    def _finish(self, attempt, winner, result, error):
+        attempt.done = True
+        if attempt.timer is not None:
+            attempt.timer.stop()
+            attempt.timer = None
+        elapsed_ms = (time.perf_counter() - attempt.started) * 1000
+        self.wins[winner or 'failed'] += 1
+        outcome = CommandOutcome(attempt.command, winner, attempt.fallback_reason, result, elapsed_ms, error)
+        if winner:
+            reason = f" ({attempt.fallback_reason})" if attempt.fallback_reason else ''
+            logging.info(f"{attempt.command} via {winner}{reason} in {elapsed_ms:.0f} ms")
+        else:
+            logging.error(f"{attempt.command} failed after {elapsed_ms:.0f} ms: {str(error)}")
+        self.command_finished.emit(outcome)
+
+    def shutdown(self):
+        """Stop the worker pool and log which path has been winning"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.wins:
+            logging.info(f"Command paths: {dict(self.wins)}")
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from PyQt5.QtCore import QObject, pyqtSignal
+from spotipy.exceptions import SpotifyException
+
+class DeviceManager(QObject):
+    # Emitted with the fresh device list whenever the cache is refilled, from whichever thread refilled it
+    devices_changed = pyqtSignal(list)
+
+    def __init__(self, widget, ttl=60, last_device_id=None):
+        super().__init__()
+        self.widget = widget
+        self.ttl = ttl
+        # Commands run on worker threads while the GUI thread observes polls and transfers, so the
+        # fields below are only read and replaced under the lock; the HTTP calls run outside it
+        self._lock = threading.Lock()
+        self.devices = []
+        self.device_id = None
+        # The device playback was last seen on, so a command with nothing active wakes that one
+        self.last_device_id = last_device_id
+        self.fetched_at = None
+
+    def reset(self, forget_last_device=False):
+        """Forget cached devices and the target device"""
+        with self._lock:
+            self.devices = []
+            self.device_id = None
+            self.fetched_at = None
+            if forget_last_device:
+                self.last_device_id = None
+
+    def invalidate(self):
+        """Mark the cached device list as stale"""
+        with self._lock:
+            self.fetched_at = None
+
+    def is_stale(self):
+        """Check if the cached device list has expired"""
+        fetched_at = self.fetched_at
+        return fetched_at is None or time.monotonic() - fetched_at > self.ttl
+
+    def get_devices(self, force=False):
+        """Return the device list, refreshing it when stale"""
+        if force or self.is_stale():
+            self.refresh()
+        return self.devices
+
+    def refresh(self):
+        """Fetch the device list from Spotify"""
+        spotify = self.widget.spotify
+        if not spotify:
+            return
+        try:
+            result = spotify.devices() or {}
+        except Exception as e:
+            logging.error(f"Error fetching Spotify devices: {str(e)}")
+            return
+        devices = result.get('devices', [])
+        active = next((d for d in devices if d.get('is_active')), None)
+        with self._lock:
+            self.devices = devices
+            self.fetched_at = time.monotonic()
+            if active:
+                self.device_id = self.last_device_id = active['id']
+            elif self.device_id not in [d['id'] for d in devices]:
+                self.device_id = None
+        logging.info(f"Fetched {len(devices)} Spotify devices")
+        self.devices_changed.emit(devices)
+
+    def observe_playback(self, current):
+        """Track the active device reported in a playback payload"""
+        device = current.get('device') if current else None
+        if not device or not device.get('id'):
+            return
+        with self._lock:
+            changed = device['id'] != self.device_id
+            self.device_id = self.last_device_id = device['id']
+            if changed:
+                self.fetched_at = None
+        if changed:
+            logging.info(f"Active device changed to {device.get('name')}")
+
+    def target_device_id(self):
+        """Return the device id commands should be sent to, or None to let Spotify pick the active one"""
+        if self.device_id is None:
+            self.get_devices()
+        with self._lock:
+            if self.device_id is None and self.last_device_id in [d['id'] for d in self.devices]:
+                # Nothing is active, so wake the device playback was last on rather than an arbitrary one
+                self.device_id = self.last_device_id
+            return self.device_id
+
+    def run_command(self, command, **kwargs):
+        """Run a playback command against the cached target device"""
+        device_id = self.target_device_id()
+        try:
+            return command(device_id=device_id, **kwargs)
+        except SpotifyException as e:
+            if e.http_status != 404:
+                raise
+            # The cached device went away, so refresh once and retry
+            logging.info("Target device not found, refreshing device list")
+            with self._lock:
+                if self.device_id == device_id:
+                    self.device_id = None
+            self.get_devices(force=True)
+            return command(device_id=self.target_device_id(), **kwargs)
+
+    def transfer(self, device_id, force_play=True):
+        """Transfer playback to another device"""
+        try:
+            self.widget.spotify.transfer_playback(device_id, force_play=force_play)
+        except Exception as e:
+            logging.error(f"Error transferring playback: {str(e)}")
+            return False
+        with self._lock:
+            self.device_id = self.last_device_id = device_id
+            self.fetched_at = None
+        logging.info(f"Transferred playback to device {device_id}")
+        return True
@@ -0,0 +1,100 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from PyQt5.QtCore import Qt, QObject, QTimer, pyqtSignal
+
+class LagWatchdog(QObject):
+    # Emitted on the GUI thread with the measured timer drift in milliseconds
+    lag_detected = pyqtSignal(float)
+
+    def __init__(self, interval_ms=250, threshold_ms=500):
+        super().__init__()
+        self.interval_ms = interval_ms
+        self.threshold_ms = threshold_ms
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self._tick)
+        self._main_thread_id = threading.main_thread().ident
+        self._last_tick = None
+        self._stall_sampled = False
+        self._stop_event = threading.Event()
+        self._monitor = None
+
+    def is_running(self):
+        return self.timer.isActive()
+
+    def start(self):
+        """Start measuring drift and watching for stalls"""
+        if self.is_running():
+            return
+        self._last_tick = time.monotonic()
+        self.timer.start(self.interval_ms)
+        # A fresh event per run, so a monitor that hasn't woken up since the last stop still exits
+        self._stop_event = threading.Event()
+        self._monitor = threading.Thread(target=self._watch, args=(self._stop_event,), name='LagWatchdog', daemon=True)
+        self._monitor.start()
+
+    def stop(self):
+        """Stop the timer and the monitor thread"""
+        self.timer.stop()
+        self._stop_event.set()
+
+    def _tick(self):
+        now = time.monotonic()
+        drift_ms = (now - self._last_tick) * 1000 - self.interval_ms
+        self._last_tick = now
+        self._stall_sampled = False
+        if drift_ms > self.threshold_ms:
+            logging.warning(f"Event loop lag: GUI thread was blocked for {drift_ms:.0f} ms")
+            self.lag_detected.emit(drift_ms)
+
+    def _watch(self, stop_event):
+        # The GUI thread can't report on itself while blocked, so sample it from here
+        while not stop_event.wait(self.interval_ms / 2000.0):
+            stalled_ms = (time.monotonic() - self._last_tick) * 1000 - self.interval_ms
+            if stalled_ms > self.threshold_ms and not self._stall_sampled:
+                self._stall_sampled = True
+                frame = sys._current_frames().get(self._main_thread_id)
+                if frame is not None:
+                    stack = ''.join(traceback.format_stack(frame))
+                    logging.warning(f"GUI thread blocked for {stalled_ms:.0f} ms, main thread stack:\n{stack}")
+
+class StartupProfiler:
+    def __init__(self, seconds, output_dir):
+        self.seconds = seconds
+        self.output_dir = output_dir
+        self.profile = cProfile.Profile()
+        self.report_path = None
+
+    def start(self):
+        """Profile the GUI thread for the configured window"""
+        logging.info(f"Profiling for {self.seconds} seconds")
+        self.profile.enable()
+        QTimer.singleShot(int(self.seconds * 1000), self.stop)
+
+    def stop(self):
+        """Stop profiling and write the report"""
+        if self.report_path:
+            return self.report_path
+        self.profile.disable()
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.report_path = os.path.join(self.output_dir, f"profile_{stamp}.txt")
+        try:
+            self.profile.dump_stats(os.path.join(self.output_dir, f"profile_{stamp}.prof"))
+            stream = io.StringIO()
+            stats = pstats.Stats(self.profile, stream=stream)
+            stats.sort_stats('cumulative').print_stats(50)
+            stats.sort_stats('tottime').print_stats(30)
+            with open(self.report_path, 'w', encoding='utf-8') as f:
+                f.write(stream.getvalue())
+            logging.info(f"Profile report written to {self.report_path}")
+        except Exception as e:
+            logging.error(f"Error writing profile report: {str(e)}")
+        return self.report_path
@@ -0,0 +1,100 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                             QPushButton, QListWidget)
+from PyQt5.QtCore import Qt, pyqtSignal
+from datetime import datetime
+import logging
+import sqlite3
+import time
+from history_store import WEEK_SECONDS
+
+def format_duration(ms):
+    """Format milliseconds as hours and minutes"""
+    minutes = int(ms // 60000)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m"
+
+class HistoryDialog(QDialog):
+    # Track details resolved on the cache's worker, handed to the GUI thread
+    tracks_resolved = pyqtSignal(object)
+
+    def __init__(self, history_store, track_cache=None, parent=None):
+        super().__init__(parent)
+        self.history_store = history_store
+        self.track_cache = track_cache
+        self.tracks_resolved.connect(self.show_albums)
+        self.setup_ui()
+        self.refresh()
+
+    def setup_ui(self):
+        """Setup the dialog UI"""
+        self.setWindowTitle("Listening History")
+        self.setMinimumWidth(400)
+
+        layout = QVBoxLayout()
+
+        self.total_label = QLabel()
+        layout.addWidget(self.total_label)
+
+        layout.addWidget(QLabel("Top artists this week"))
+        self.artist_list = QListWidget()
+        layout.addWidget(self.artist_list)
+
+        layout.addWidget(QLabel("Recently played"))
+        self.recent_list = QListWidget()
+        layout.addWidget(self.recent_list)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        button_layout.addWidget(close_btn)
+        layout.addLayout(button_layout)
+
+        self.setLayout(layout)
+
+    def refresh(self):
+        """Load aggregates and recent plays from the store"""
+        week_start = time.time() - WEEK_SECONDS
+        self.artist_list.clear()
+        self.recent_list.clear()
+        self.recent_ids = []
+        try:
+            total = self.history_store.total_listened_ms(week_start)
+            top_artists = self.history_store.top_artists(week_start)
+            recent_plays = self.history_store.recent_plays()
+        except sqlite3.Error as e:
+            # The schema is missing until the store has started, and stays missing if starting failed
+            logging.error(f"Error reading listening history: {str(e)}")
+            self.total_label.setText("Listening history isn't available yet")
+            return
+        self.total_label.setText(f"Listened this week: {format_duration(total)}")
+
+        for artist, plays, listened_ms in top_artists:
+            self.artist_list.addItem(f"{artist} — {plays} plays, {format_duration(listened_ms)}")
+
+        track_ids = []
+        for title, artist, started_at, listened_ms, track_id in recent_plays:
+            played = datetime.fromtimestamp(started_at).strftime('%a %H:%M')
+            self.recent_list.addItem(f"{played}  {title} - {artist}")
+            track_ids.append(track_id)
+        self.recent_ids = track_ids
+        if self.track_cache:
+            # All of the plays' albums in one or two requests, or none when they're cached
+            self.track_cache.resolve(track_ids).add_done_callback(self._on_tracks_resolved)
+
+    def _on_tracks_resolved(self, future):
+        """Hand resolved track details to the GUI thread (runs on the cache's worker)"""
+        try:
+            tracks = future.result()
+        except Exception as e:
+            logging.error(f"Error resolving track details: {str(e)}")
+            return
+        self.tracks_resolved.emit(tracks)
+
+    def show_albums(self, tracks):
+        """Add the album to each recent play whose track details are known"""
+        for row, track_id in enumerate(self.recent_ids):
+            info = tracks.get(track_id)
+            item = self.recent_list.item(row)
+            if info and info.album and item:
+                item.setText(f"{item.text()}  ·  {info.album}")
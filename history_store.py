@@ -0,0 +1,161 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plays (
+    id INTEGER PRIMARY KEY,
+    track_id TEXT,
+    title TEXT NOT NULL,
+    artist TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    listened_ms INTEGER NOT NULL,
+    device TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_plays_time ON plays(started_at, artist, listened_ms);
+CREATE INDEX IF NOT EXISTS idx_plays_artist ON plays(artist);
+"""
+
+INSERT_PLAY = """
+INSERT INTO plays (track_id, title, artist, started_at, listened_ms, device)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+WEEK_SECONDS = 7 * 24 * 3600
+
+
+class HistoryStore:
+    def __init__(self, path, batch_size=500, flush_interval=2.0, max_age_days=365, max_rows=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_age_days = max_age_days
+        self.max_rows = max_rows
+        self._queue = queue.Queue()
+        self._thread = None
+        self._read_lock = threading.Lock()
+        self._reader = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def start(self):
+        """Create the schema and start the background writer"""
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._thread = threading.Thread(target=self._write_loop, name='HistoryWriter', daemon=True)
+        self._thread.start()
+        return self
+
+    def add_play(self, track_id, title, artist, started_at, listened_ms, device=None):
+        """Queue a play for the background writer"""
+        self._queue.put((track_id, title, artist, started_at, int(listened_ms), device))
+
+    def flush(self):
+        """Block until every queued play has been written; returns at once when the writer isn't running"""
+        thread = self._thread
+        # Before start() finishes, or after it failed, nothing would ever answer the event
+        if thread is None or not thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        """Write pending plays and stop the writer"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        with self._read_lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def _write_loop(self):
+        conn = self._connect()
+        batch = []
+        waiters = []
+        deadline = None
+        # None rather than 0: monotonic time starts at boot, so 0 would skip the first prune on a fresh boot
+        last_prune = None
+        running = True
+        while running:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+            if item is None:
+                running = False
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not False:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(INSERT_PLAY, batch)
+                except Exception as e:
+                    logging.error(f"Error writing listening history: {str(e)}")
+                batch = []
+            deadline = None
+            if last_prune is None or time.monotonic() - last_prune > 3600:
+                self._prune(conn)
+                last_prune = time.monotonic()
+            for waiter in waiters:
+                waiter.set()
+            waiters = []
+        conn.close()
+
+    def _prune(self, conn):
+        """Apply the retention limits"""
+        try:
+            with conn:
+                if self.max_age_days:
+                    conn.execute("DELETE FROM plays WHERE started_at < ?",
+                                 (time.time() - self.max_age_days * 86400,))
+                if self.max_rows:
+                    conn.execute("DELETE FROM plays WHERE id <= "
+                                 "(SELECT id FROM plays ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                                 (self.max_rows,))
+        except Exception as e:
+            logging.error(f"Error pruning listening history: {str(e)}")
+
+    def _query(self, sql, params=()):
+        with self._read_lock:
+            if self._reader is None:
+                self._reader = self._connect()
+            return self._reader.execute(sql, params).fetchall()
+
+    def top_artists(self, since=None, limit=10):
+        """Return (artist, plays, listened_ms) ordered by listening time"""
+        since = time.time() - WEEK_SECONDS if since is None else since
+        # Without the hint SQLite walks the whole artist index to satisfy GROUP BY
+        return self._query(
+            "SELECT artist, COUNT(*), SUM(listened_ms) FROM plays INDEXED BY idx_plays_time WHERE started_at >= ? "
+            "GROUP BY artist ORDER BY SUM(listened_ms) DESC LIMIT ?",
+            (since, limit))
+
+    def total_listened_ms(self, since=None):
+        """Return the total listening time since a timestamp"""
+        since = 0 if since is None else since
+        row = self._query("SELECT COALESCE(SUM(listened_ms), 0) FROM plays WHERE started_at >= ?", (since,))
+        return row[0][0]
+
+    def recent_plays(self, limit=50):
+        """Return the latest plays as (title, artist, started_at, listened_ms, track_id)"""
+        return self._query(
+            "SELECT title, artist, started_at, listened_ms, track_id FROM plays ORDER BY started_at DESC LIMIT ?",
+            (limit,))
@@ -1,6 +1,8 @@
 import keyboard
 import logging
+import time
 from PyQt5.QtCore import QObject, pyqtSignal
+from hotkey_matcher import HotkeyMatcher
 
 class HotkeyManager(QObject):
     # Signals for hotkey events
@@ -14,6 +16,11 @@ class HotkeyManager(QObject):
         super().__init__()
         self.widget = widget
         self.hotkeys = {}
+        self.matcher = HotkeyMatcher()
+        self.hook = None
+        # Time spent in our hook, to keep an eye on the cost we add to every keystroke
+        self.event_count = 0
+        self.event_seconds = 0.0
         self.load_hotkey_settings()
         
     def load_hotkey_settings(self):
@@ -36,12 +43,9 @@ class HotkeyManager(QObject):
     def start(self):
         """Start listening for hotkeys"""
         try:
-            # Register hotkeys
-            keyboard.add_hotkey(self.hotkeys['play_pause'], self._on_play_pause)
-            keyboard.add_hotkey(self.hotkeys['next_track'], self._on_next_track)
-            keyboard.add_hotkey(self.hotkeys['prev_track'], self._on_prev_track)
-            keyboard.add_hotkey(self.hotkeys['volume_up'], self._on_volume_up)
-            keyboard.add_hotkey(self.hotkeys['volume_down'], self._on_volume_down)
+            # All hotkeys share one hook and one lookup table
+            self.matcher.compile(self.hotkeys)
+            self.hook = keyboard.hook(self._on_key_event)
             
             logging.info("Hotkeys registered successfully")
         except Exception as e:
@@ -51,10 +55,23 @@ class HotkeyManager(QObject):
         """Stop listening for hotkeys"""
         try:
             keyboard.unhook_all()
+            self.hook = None
+            if self.event_count:
+                logging.info(f"Hotkey hook: {self.event_count} key events, "
+                             f"{self.event_seconds / self.event_count * 1e6:.1f} us average")
             logging.info("Hotkeys unregistered successfully")
         except Exception as e:
             logging.error(f"Error unregistering hotkeys: {str(e)}")
             
+    def _on_key_event(self, event):
+        """Match one key event against the compiled hotkeys (runs on the keyboard thread)"""
+        started = time.perf_counter()
+        action = self.matcher.feed(event.event_type, event.scan_code)
+        self.event_count += 1
+        self.event_seconds += time.perf_counter() - started
+        if action:
+            getattr(self, f'_on_{action}')()
+            
     def _on_play_pause(self):
         """Handle play/pause hotkey"""
         logging.info("Play/Pause hotkey triggered")
@@ -83,13 +100,11 @@ class HotkeyManager(QObject):
     def update_hotkey(self, action, new_hotkey):
         """Update a specific hotkey"""
         try:
-            # Remove old hotkey
-            if action in self.hotkeys:
-                keyboard.remove_hotkey(self.hotkeys[action])
-            
-            # Add new hotkey
-            keyboard.add_hotkey(new_hotkey, getattr(self, f'_on_{action}'))
-            self.hotkeys[action] = new_hotkey
+            # Recompile the whole table; the hook itself stays in place
+            hotkeys = dict(self.hotkeys)
+            hotkeys[action] = new_hotkey
+            self.matcher.compile(hotkeys)
+            self.hotkeys = hotkeys
             self.save_hotkey_settings()
             
             logging.info(f"Updated hotkey for {action} to {new_hotkey}")
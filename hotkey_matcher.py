@@ -0,0 +1,110 @@
+KEY_DOWN = 'down'
+KEY_UP = 'up'
+
+# Each modifier gets one bit; both sides of the keyboard set the same bit
+MODIFIERS = {
+    'ctrl': (1, ('ctrl', 'right ctrl')),
+    'shift': (2, ('shift', 'right shift')),
+    'alt': (4, ('alt', 'right alt', 'alt gr')),
+    'windows': (8, ('left windows', 'right windows')),
+}
+
+MODIFIER_ALIASES = {
+    'control': 'ctrl',
+    'left ctrl': 'ctrl',
+    'right ctrl': 'ctrl',
+    'left shift': 'shift',
+    'right shift': 'shift',
+    'left alt': 'alt',
+    'right alt': 'alt',
+    'alt gr': 'alt',
+    'win': 'windows',
+    'left windows': 'windows',
+    'right windows': 'windows',
+    'cmd': 'windows',
+    'command': 'windows',
+}
+
+
+def _keyboard_scan_codes(name):
+    import keyboard
+    return keyboard.key_to_scan_codes(name)
+
+
+def parse_hotkey(hotkey):
+    """Split a hotkey like 'ctrl+alt+p' into its modifier names and its one main key"""
+    modifiers = set()
+    keys = []
+    for part in hotkey.lower().split('+'):
+        part = part.strip()
+        if part == 'plus':
+            part = '+'
+        part = MODIFIER_ALIASES.get(part, part)
+        if part in MODIFIERS:
+            modifiers.add(part)
+        elif part:
+            keys.append(part)
+    if len(keys) != 1:
+        raise ValueError(f"Hotkey '{hotkey}' must have exactly one non-modifier key")
+    return modifiers, keys[0]
+
+
+class HotkeyMatcher:
+    def __init__(self, resolve=_keyboard_scan_codes):
+        # resolve maps a key name to its scan codes (keyboard.key_to_scan_codes by default)
+        self.resolve = resolve
+        self.table = {}
+        self.modifier_bits = {}
+        self.held = {}
+        self.mask = 0
+
+    def _scan_codes(self, name):
+        try:
+            return tuple(self.resolve(name))
+        except ValueError:
+            return ()
+
+    def compile(self, bindings):
+        """Build the (modifier mask, scan code) -> action table; raises ValueError and keeps the old table on a bad binding"""
+        modifier_bits = {}
+        for bit, names in MODIFIERS.values():
+            for name in names:
+                for code in self._scan_codes(name):
+                    modifier_bits[code] = bit
+
+        table = {}
+        for action, hotkey in bindings.items():
+            modifiers, key = parse_hotkey(hotkey)
+            codes = self._scan_codes(key)
+            if not codes:
+                raise ValueError(f"Unknown key '{key}' in hotkey '{hotkey}'")
+            mask = 0
+            for modifier in modifiers:
+                mask |= MODIFIERS[modifier][0]
+            for code in codes:
+                if code in modifier_bits:
+                    raise ValueError(f"Hotkey '{hotkey}' has no key besides its modifiers")
+                if (mask, code) in table and table[(mask, code)] != action:
+                    raise ValueError(f"Hotkey '{hotkey}' is already used for {table[(mask, code)]}")
+                table[(mask, code)] = action
+
+        # Held modifiers carry over, so a recompile mid-chord doesn't drop them
+        self.table = table
+        self.modifier_bits = modifier_bits
+
+    def feed(self, event_type, scan_code):
+        """Update the held modifiers for one key event and return the action it triggers, if any"""
+        bit = self.modifier_bits.get(scan_code)
+        if bit is not None:
+            if event_type == KEY_DOWN:
+                self.held[scan_code] = bit
+            else:
+                self.held.pop(scan_code, None)
+            mask = 0
+            for held_bit in self.held.values():
+                mask |= held_bit
+            self.mask = mask
+            return None
+        if event_type != KEY_DOWN:
+            return None
+        return self.table.get((self.mask, scan_code))
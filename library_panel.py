@@ -0,0 +1,385 @@
+import json
+import logging
+import sqlite3
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QObject, pyqtSignal
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QComboBox, QListView)
+from playback_fetch import DEFAULT_API_PREFIX, api_error, decode_json, is_scope_error
+
+# version is the playlist's snapshot_id; saved tracks have none and are revalidated with an ETag instead
+LibraryCollection = namedtuple('LibraryCollection', 'key name uri path page_size version total')
+
+SAVED_TRACKS = LibraryCollection('saved', "Liked Songs", None, 'me/tracks', 50, None, None)
+
+# Ask the API for only the fields a row shows
+PLAYLIST_FIELDS = 'total,next,items(is_local,track(uri,name,duration_ms,artists(name)))'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS collections (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    total INTEGER
+);
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    rows TEXT NOT NULL,
+    PRIMARY KEY (key, start)
+);
+"""
+
+
+def playlist_collection(playlist):
+    """Describe a simplified playlist object from /me/playlists"""
+    return LibraryCollection(f"playlist:{playlist['id']}", playlist['name'], playlist['uri'],
+                             f"playlists/{playlist['id']}/tracks", 100, playlist['snapshot_id'],
+                             playlist['tracks']['total'])
+
+
+def compact_rows(items):
+    """Keep what a row shows: [uri, title, artist, duration_ms]"""
+    rows = []
+    for item in items:
+        track = item.get('track')
+        if not track:
+            # Keep the slot so row numbers stay equal to playlist positions
+            rows.append([None, "Unavailable track", '', 0])
+            continue
+        artists = track.get('artists') or []
+        rows.append([track.get('uri'), track.get('name') or '', artists[0].get('name', '') if artists else '',
+                     track.get('duration_ms') or 0])
+    return rows
+
+
+class LibraryClient:
+    def __init__(self, access_token, api_prefix=None, market='from_token', timeout=10, session=None):
+        self.access_token = access_token
+        self.api_prefix = api_prefix or DEFAULT_API_PREFIX
+        self.market = market
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.requests = 0
+
+    def get(self, path, params, etag=None):
+        """GET an API path; returns (data, etag), with data None when the server answers 304 Not Modified"""
+        headers = {'Authorization': f"Bearer {self.access_token}"}
+        if etag:
+            headers['If-None-Match'] = etag
+        response = self.session.get(f"{self.api_prefix}{path}", params=params, headers=headers, timeout=self.timeout)
+        self.requests += 1
+        if response.status_code == 304:
+            return None, response.headers.get('ETag', etag)
+        if response.status_code >= 400:
+            raise api_error(response)
+        return decode_json(response.content), response.headers.get('ETag')
+
+
+class LibraryCache:
+    """Fetched pages on disk, dropped whenever their collection's version changes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def version(self, key):
+        """Return the (version, total) the cached pages of a collection were fetched at"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT version, total FROM collections WHERE key = ?", (key,)).fetchone()
+        return row if row else (None, None)
+
+    def validate(self, key, version, total=None):
+        """Keep a collection's pages if they were fetched at this version, otherwise drop them"""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT version FROM collections WHERE key = ?", (key,)).fetchone()
+            if version and row and row[0] == version:
+                return True
+            with conn:
+                conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+                conn.execute("INSERT OR REPLACE INTO collections (key, version, total) VALUES (?, ?, ?)",
+                             (key, version or '', total))
+            return False
+
+    def page(self, key, start):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT rows FROM pages WHERE key = ? AND start = ?", (key, start)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_page(self, key, start, rows, total):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO pages (key, start, rows) VALUES (?, ?, ?)",
+                             (key, start, json.dumps(rows)))
+                conn.execute("UPDATE collections SET total = ? WHERE key = ?", (total, key))
+
+    def clear(self):
+        """Forget every cached page, e.g. when another account logs in"""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM pages")
+                conn.execute("DELETE FROM collections")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class LibraryLoader(QObject):
+    # Emitted on the GUI thread: (ticket, collection key, start row, rows, total)
+    page_loaded = pyqtSignal(int, str, int, object, int)
+    playlists_loaded = pyqtSignal(object)
+    load_failed = pyqtSignal(int, str)
+    # The token predates the library scopes; the user has to log in again
+    scope_missing = pyqtSignal()
+
+    def __init__(self, client, cache):
+        super().__init__()
+        self.client = client
+        self.cache = cache
+        # One worker keeps pages in request order, so a prefetch never races the request for the same page
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='Library')
+        self.ticket = 0
+
+    def next_ticket(self):
+        """Start a new load; pages requested under older tickets are still fetched but skip prefetching"""
+        self.ticket += 1
+        return self.ticket
+
+    def load_playlists(self):
+        self.executor.submit(self._run, 0, self._load_playlists)
+
+    def request_page(self, ticket, collection, start, revalidate=False):
+        """Load the page at a start row off the GUI thread; it arrives through page_loaded"""
+        self.executor.submit(self._run, ticket, self._load_page, ticket, collection, start, revalidate)
+
+    def _run(self, ticket, fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:
+            logging.error(f"Error loading library: {str(e)}")
+            if is_scope_error(e):
+                self.scope_missing.emit()
+            self.load_failed.emit(ticket, str(e))
+
+    def _load_playlists(self):
+        playlists = []
+        start = 0
+        while True:
+            data, _ = self.client.get('me/playlists', {'offset': start, 'limit': 50})
+            playlists.extend(playlist_collection(p) for p in data['items'] if p)
+            start += 50
+            if not data.get('next'):
+                break
+        self.playlists_loaded.emit(playlists)
+
+    def _revalidate(self, collection):
+        """Check cached pages against the collection's current version before reusing them"""
+        if collection.version is not None:
+            # The snapshot_id came with the playlist listing, so this needs no request
+            self.cache.validate(collection.key, collection.version, collection.total)
+            return
+        version, _ = self.cache.version(collection.key)
+        cached = version and self.cache.page(collection.key, 0) is not None
+        data, etag = self.client.get(collection.path, self._page_params(collection, 0),
+                                     etag=version if cached else None)
+        if data is None:
+            return
+        self.cache.validate(collection.key, etag, data['total'])
+        self.cache.put_page(collection.key, 0, compact_rows(data['items']), data['total'])
+
+    def _page_params(self, collection, start):
+        params = {'offset': start, 'limit': collection.page_size, 'market': self.client.market}
+        if collection.version is not None:
+            params['fields'] = PLAYLIST_FIELDS
+        return params
+
+    def _fetch_page(self, collection, start):
+        rows = self.cache.page(collection.key, start)
+        if rows is not None:
+            return rows, self.cache.version(collection.key)[1]
+        data, _ = self.client.get(collection.path, self._page_params(collection, start))
+        rows = compact_rows(data['items'])
+        self.cache.put_page(collection.key, start, rows, data['total'])
+        return rows, data['total']
+
+    def _load_page(self, ticket, collection, start, revalidate):
+        if revalidate:
+            self._revalidate(collection)
+        rows, total = self._fetch_page(collection, start)
+        self.page_loaded.emit(ticket, collection.key, start, rows, total)
+        # Fetch the next page while this one is read, so the next scroll is a cache hit
+        following = start + collection.page_size
+        if ticket == self.ticket and rows and following < total:
+            self._fetch_page(collection, following)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.cache.close()
+
+
+class TrackListModel(QAbstractListModel):
+    UriRole = Qt.UserRole + 1
+
+    def __init__(self, loader, parent=None):
+        super().__init__(parent)
+        self.loader = loader
+        self.collection = None
+        self.rows = []
+        self.total = None
+        self.loading = False
+        self.ticket = 0
+        loader.page_loaded.connect(self._on_page_loaded)
+        loader.load_failed.connect(self._on_load_failed)
+
+    def open(self, collection):
+        """Show a collection, starting again from its first page"""
+        self.beginResetModel()
+        self.ticket = self.loader.next_ticket()
+        self.collection = collection
+        self.rows = []
+        self.total = None
+        self.loading = True
+        self.endResetModel()
+        self.loader.request_page(self.ticket, collection, 0, revalidate=True)
+
+    def detach(self):
+        """Stop listening to the loader, which outlives the panel"""
+        self.loader.page_loaded.disconnect(self._on_page_loaded)
+        self.loader.load_failed.disconnect(self._on_load_failed)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        uri, title, artist, duration_ms = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{title} — {artist}" if artist else title
+        if role == Qt.ToolTipRole:
+            minutes, seconds = divmod(duration_ms // 1000, 60)
+            return f"{title}\n{artist}\n{minutes}:{seconds:02d}"
+        if role == TrackListModel.UriRole:
+            return uri
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.loading or self.total is None:
+            return False
+        return len(self.rows) < self.total
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Called by the view as it scrolls near the end of the loaded rows"""
+        if not self.canFetchMore(parent):
+            return
+        self.loading = True
+        self.loader.request_page(self.ticket, self.collection, len(self.rows))
+
+    def _on_page_loaded(self, ticket, key, start, rows, total):
+        if ticket != self.ticket or start != len(self.rows):
+            return
+        self.loading = False
+        # An empty page means the collection shrank under us; stop asking for more
+        self.total = total if rows else len(self.rows)
+        if rows:
+            self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+            self.rows.extend(rows)
+            self.endInsertRows()
+
+    def _on_load_failed(self, ticket, message):
+        if ticket == self.ticket:
+            # Scrolling again retries the page
+            self.loading = False
+
+
+class LibraryPanel(QDialog):
+    # (collection, row, track uri) for the row the user double-clicked
+    play_requested = pyqtSignal(object, int, object)
+
+    def __init__(self, loader, parent=None):
+        super().__init__(parent)
+        self.loader = loader
+        self.model = TrackListModel(loader, self)
+        self.collections = [SAVED_TRACKS]
+        self.setup_ui()
+        loader.playlists_loaded.connect(self._on_playlists_loaded)
+        self.model.open(SAVED_TRACKS)
+        loader.load_playlists()
+
+    def setup_ui(self):
+        """Setup the dialog UI"""
+        self.setWindowTitle("Library")
+        self.setMinimumSize(400, 500)
+
+        layout = QVBoxLayout()
+
+        self.collection_box = QComboBox()
+        self.collection_box.addItem(SAVED_TRACKS.name)
+        self.collection_box.currentIndexChanged.connect(self._on_collection_selected)
+        layout.addWidget(self.collection_box)
+
+        self.track_view = QListView()
+        # Uniform rows skip measuring each item; batched layout keeps relayouts after each page off the critical path
+        self.track_view.setUniformItemSizes(True)
+        self.track_view.setLayoutMode(QListView.Batched)
+        self.track_view.setModel(self.model)
+        self.track_view.doubleClicked.connect(self._on_track_activated)
+        layout.addWidget(self.track_view)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.model.rowsInserted.connect(self._update_status)
+        self.model.modelReset.connect(self._update_status)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        button_layout.addWidget(close_btn)
+        layout.addLayout(button_layout)
+
+        self.setLayout(layout)
+
+    def _on_playlists_loaded(self, playlists):
+        self.collections = [SAVED_TRACKS] + playlists
+        for playlist in playlists:
+            self.collection_box.addItem(f"{playlist.name} ({playlist.total})")
+
+    def _on_collection_selected(self, index):
+        if 0 <= index < len(self.collections):
+            self.model.open(self.collections[index])
+
+    def _on_track_activated(self, index):
+        self.play_requested.emit(self.model.collection, index.row(), self.model.data(index, TrackListModel.UriRole))
+
+    def _update_status(self, *args):
+        model = self.model
+        if model.total is None:
+            self.status_label.setText("Loading...")
+        else:
+            self.status_label.setText(f"Loaded {len(model.rows):,} of {model.total:,} tracks")
+
+    def done(self, result):
+        self.loader.playlists_loaded.disconnect(self._on_playlists_loaded)
+        self.model.detach()
+        super().done(result)
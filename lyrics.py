@@ -0,0 +1,174 @@
+import bisect
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from PyQt5.QtCore import QObject, pyqtSignal
+
+TIMESTAMP = re.compile(r'\[(\d+):(\d{1,2}(?:[.:]\d{1,3})?)\]')
+OFFSET_TAG = re.compile(r'^\[offset:\s*([+-]?\d+)\s*\]', re.IGNORECASE)
+
+
+def lyrics_key(artist, title):
+    """Normalise an artist/title pair for lookups"""
+    return ' '.join(f"{artist} - {title}".casefold().split())
+
+
+class Lyrics:
+    def __init__(self, times, lines):
+        # Parallel arrays sorted by time, so the current line is one bisect away
+        self.times = times
+        self.lines = lines
+
+    def line_at(self, position_ms):
+        """Return the line showing at a position and the time of the next change (None after the last line)"""
+        index = bisect.bisect_right(self.times, position_ms) - 1
+        next_change = self.times[index + 1] if index + 1 < len(self.times) else None
+        return (self.lines[index] if index >= 0 else ''), next_change
+
+
+def parse_lrc(text):
+    """Parse LRC text into a Lyrics object, or None when it has no timed lines"""
+    offset = 0
+    entries = []
+    for raw in text.splitlines():
+        line = raw.strip()
+        match = OFFSET_TAG.match(line)
+        if match:
+            # A positive offset shows lines earlier
+            offset = int(match.group(1))
+            continue
+        stamps = []
+        end = 0
+        for match in TIMESTAMP.finditer(line):
+            if match.start() != end:
+                break
+            minutes, seconds = match.groups()
+            stamps.append(int(minutes) * 60000 + int(float(seconds.replace(':', '.')) * 1000))
+            end = match.end()
+        if stamps:
+            lyric = line[end:].strip()
+            entries.extend((stamp, lyric) for stamp in stamps)
+    if not entries:
+        return None
+    entries.sort(key=lambda entry: entry[0])
+    return Lyrics([max(0, stamp - offset) for stamp, _ in entries], [lyric for _, lyric in entries])
+
+
+class LyricsLibrary(QObject):
+    # Emitted after a rescan changed the index, from the thread that ran it
+    index_changed = pyqtSignal()
+
+    def __init__(self, folder, cache_size=64, run=None):
+        super().__init__()
+        self.folder = folder
+        self.cache_size = cache_size
+        # Rescans go through run(fn), like SourceScheduler.run; without it they run on the caller's thread
+        self.run = run
+        # Replaced whole by a rescan, so the caller's thread always reads a complete index
+        self.index = {}
+        # key -> (path, lyrics), only used on the caller's thread
+        self.cache = OrderedDict()
+        # The mtime of every folder the last scan walked, subfolders included
+        self._scanned_mtimes = {}
+        self._lock = threading.Lock()
+        self._refresh_pending = False
+        # A miss during a check may be for a file that check already walked past, so it asks for another
+        self._refresh_again = False
+
+    def _scan(self):
+        """Index 'Artist - Title.lrc' files by normalised name"""
+        index = {}
+        mtimes = {}
+        for root, _, files in os.walk(self.folder):
+            try:
+                mtimes[root] = os.stat(root).st_mtime
+            except OSError:
+                continue
+            for name in files:
+                stem, extension = os.path.splitext(name)
+                if extension.lower() == '.lrc':
+                    index[' '.join(stem.casefold().split())] = os.path.join(root, name)
+        self._scanned_mtimes = mtimes
+        self.index = index
+        logging.info(f"Indexed {len(index)} lyric files in {len(mtimes)} folders of {self.folder}")
+
+    def _changed_since_scan(self):
+        # Adding, removing or renaming a file changes the mtime of the folder it's in
+        if not self._scanned_mtimes:
+            return True
+        for folder, mtime in self._scanned_mtimes.items():
+            try:
+                if os.stat(folder).st_mtime != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _refresh_index(self):
+        while True:
+            try:
+                if not os.path.isdir(self.folder):
+                    changed = bool(self.index)
+                    self._scanned_mtimes = {}
+                    self.index = {}
+                else:
+                    changed = self._changed_since_scan()
+                    if changed:
+                        self._scan()
+            except Exception as e:
+                logging.error(f"Error indexing lyrics in {self.folder}: {str(e)}")
+                changed = False
+            if changed:
+                self.index_changed.emit()
+            with self._lock:
+                if not self._refresh_again:
+                    self._refresh_pending = False
+                    return
+                self._refresh_again = False
+
+    def refresh(self):
+        """Check the folders for changes and rescan if needed; while a check runs, ask it for one more"""
+        with self._lock:
+            if self._refresh_pending:
+                self._refresh_again = True
+                return
+            self._refresh_pending = True
+        if self.run is None:
+            self._refresh_index()
+        else:
+            self.run(self._refresh_index)
+
+    def find(self, artist, title):
+        """Return parsed lyrics for a track, or None; each file is parsed once while it stays cached
+
+        Misses aren't cached: a track without a file starts a check of the folders' mtimes, so an .lrc
+        added while the widget runs is in the index once that check's rescan is done. With run set, find
+        doesn't wait for it and answers from the index it has.
+        """
+        key = lyrics_key(artist, title)
+        path = self.index.get(key)
+        cached = self.cache.get(key)
+        if cached and cached[0] == path:
+            self.cache.move_to_end(key)
+            return cached[1]
+        if cached:
+            # A rescan since then renamed or removed the file
+            del self.cache[key]
+        if not path:
+            self.refresh()
+            path = self.index.get(key)
+            if not path:
+                return None
+        lyrics = None
+        try:
+            with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+                lyrics = parse_lrc(f.read())
+        except OSError as e:
+            logging.error(f"Error reading lyrics {path}: {str(e)}")
+            return None
+        self.cache[key] = (path, lyrics)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return lyrics
@@ -0,0 +1,299 @@
+import logging
+import os
+import socket
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QObject, pyqtSignal
+from reachability import classify_error, OFFLINE, SERVER
+
+# What a source reports on each poll; raw keeps the source's own payload
+PlaybackState = namedtuple('PlaybackState', 'title artist is_playing progress_ms duration_ms raw')
+
+
+class MpdError(Exception):
+    pass
+
+
+class MediaSource:
+    """A player the widget can show and control"""
+    name = 'source'
+    display_name = 'Media player'
+
+    def __init__(self, priority=0):
+        self.priority = priority
+
+    def poll(self):
+        """Return the current PlaybackState, or None when nothing is loaded (runs on a worker thread)"""
+        raise NotImplementedError
+
+    def play(self):
+        raise NotImplementedError
+
+    def pause(self):
+        raise NotImplementedError
+
+    def next_track(self):
+        raise NotImplementedError
+
+    def previous_track(self):
+        raise NotImplementedError
+
+    def close(self):
+        """Release any connection the source holds"""
+
+    def keeps_state_on(self, error):
+        """Return whether a failed poll should leave the last state up instead of clearing it"""
+        return False
+
+
+def spotify_state(current):
+    """Convert a Web API playback object to a PlaybackState"""
+    if not current:
+        return None
+    track = current.get('item')
+    if not track:
+        return PlaybackState(None, None, current.get('is_playing', False), current.get('progress_ms'), None, current)
+    return PlaybackState(track['name'], track['artists'][0]['name'], current.get('is_playing', False),
+                         current.get('progress_ms'), track.get('duration_ms'), current)
+
+
+class SpotifySource(MediaSource):
+    name = 'spotify'
+    display_name = 'Spotify'
+
+    def __init__(self, widget, priority=1):
+        super().__init__(priority)
+        # The widget owns the Web API client, the token and the device handling
+        self.widget = widget
+        self.running = False
+
+    def poll(self):
+        widget = self.widget
+        self.running = widget.is_spotify_process_running()
+        spotify = widget.spotify
+        if not self.running or not (spotify and widget.is_spotify_connected):
+            return None
+        return spotify_state(widget.fetch_playback(spotify))
+
+    def play(self):
+        self.widget.device_manager.run_command(self.widget.spotify.start_playback)
+
+    def pause(self):
+        self.widget.device_manager.run_command(self.widget.spotify.pause_playback)
+
+    def next_track(self):
+        self.widget.device_manager.run_command(self.widget.spotify.next_track)
+
+    def previous_track(self):
+        self.widget.device_manager.run_command(self.widget.spotify.previous_track)
+
+    def keeps_state_on(self, error):
+        # An outage or a Spotify hiccup doesn't mean the track stopped
+        return classify_error(error) in (OFFLINE, SERVER)
+
+
+class MpdSource(MediaSource):
+    name = 'mpd'
+    display_name = 'MPD'
+
+    def __init__(self, host='127.0.0.1', port=6600, password=None, timeout=2, priority=0):
+        super().__init__(priority)
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock, self._file = sock, sock.makefile('rb')
+        greeting = self._file.readline()
+        if not greeting.startswith(b'OK MPD '):
+            self.close()
+            raise MpdError(f"Unexpected greeting from {self.host}:{self.port}: {greeting!r}")
+        if self.password:
+            escaped = self.password.replace('\\', '\\\\').replace('"', '\\"')
+            try:
+                self._request([f'password "{escaped}"'])
+            except MpdError:
+                self.close()
+                raise
+
+    def _request(self, commands):
+        if len(commands) > 1:
+            # One round trip for the whole list; each response ends with list_OK
+            payload = '\n'.join(['command_list_ok_begin', *commands, 'command_list_end'])
+        else:
+            payload = commands[0]
+        self._sock.sendall(payload.encode('utf-8') + b'\n')
+        responses = []
+        pairs = {}
+        while True:
+            line = self._file.readline()
+            if not line:
+                raise ConnectionError("MPD closed the connection")
+            line = line.decode('utf-8').rstrip('\n')
+            if line == 'list_OK':
+                responses.append(pairs)
+                pairs = {}
+            elif line == 'OK':
+                if len(commands) == 1:
+                    responses.append(pairs)
+                return responses
+            elif line.startswith('ACK '):
+                raise MpdError(line[4:])
+            else:
+                key, _, value = line.partition(': ')
+                pairs[key] = value
+
+    def command(self, *commands):
+        """Send commands over the kept-open connection, reconnecting once if it dropped"""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._request(list(commands))
+                except OSError:
+                    self.close()
+                    if attempt:
+                        raise
+
+    def poll(self):
+        status, song = self.command('status', 'currentsong')
+        if status.get('state', 'stop') == 'stop' or not song:
+            return None
+        title = song.get('Title') or os.path.basename(song.get('file', ''))
+        duration = status.get('duration') or song.get('duration') or song.get('Time')
+        return PlaybackState(
+            title,
+            song.get('Artist', ''),
+            status['state'] == 'play',
+            int(float(status.get('elapsed', 0)) * 1000),
+            int(float(duration) * 1000) if duration else None,
+            {'status': status, 'song': song}
+        )
+
+    def play(self):
+        self.command('play')
+
+    def pause(self):
+        self.command('pause 1')
+
+    def next_track(self):
+        self.command('next')
+
+    def previous_track(self):
+        self.command('previous')
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._file = None
+
+
+class SourceScheduler(QObject):
+    # Emitted on the GUI thread once a source's poll has finished
+    source_updated = pyqtSignal(str)
+    command_failed = pyqtSignal(str, str)
+    # Internal: worker threads hand results back through queued signals
+    _poll_finished = pyqtSignal(str, object, object)
+    _command_finished = pyqtSignal(str)
+
+    def __init__(self, sources, max_workers=4):
+        super().__init__()
+        self.sources = {source.name: source for source in sources}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='MediaSource')
+        self.states = {}
+        self.errors = {}
+        self.started_playing = {}
+        self.last_playing = {}
+        self._in_flight = set()
+        self._poll_finished.connect(self._on_poll_finished)
+        self._command_finished.connect(lambda name: self.poll([name]))
+
+    def run_inline(self):
+        """Poll on the calling thread from now on (used by replays and soak runs)"""
+        self.executor.shutdown(wait=True)
+        self.executor = None
+
+    def _submit(self, fn, *args):
+        if self.executor is None:
+            fn(*args)
+        else:
+            self.executor.submit(fn, *args)
+
+    def poll(self, names=None):
+        """Poll sources concurrently; each result arrives through source_updated"""
+        for name in list(self.sources) if names is None else names:
+            # A slow source keeps its one request in flight instead of piling up more
+            if name in self._in_flight:
+                continue
+            self._in_flight.add(name)
+            self._submit(self._run_poll, name)
+
+    def _run_poll(self, name):
+        try:
+            state, error = self.sources[name].poll(), None
+        except Exception as e:
+            state, error = None, e
+        self._poll_finished.emit(name, state, error)
+
+    def _on_poll_finished(self, name, state, error):
+        self._in_flight.discard(name)
+        now = time.monotonic()
+        previous = self.states.get(name)
+        if error is not None and self.sources[name].keeps_state_on(error):
+            state = previous
+        self.states[name] = state
+        if error is None:
+            self.errors.pop(name, None)
+        else:
+            self.errors[name] = error
+        if state and state.is_playing:
+            if not (previous and previous.is_playing):
+                self.started_playing[name] = now
+            self.last_playing[name] = now
+        self.source_updated.emit(name)
+
+    def active_source(self):
+        """Pick the source to show: playing beats paused, then priority, then whichever started last"""
+        playing = [name for name, state in self.states.items() if state and state.is_playing]
+        if playing:
+            return max(playing, key=lambda name: (self.sources[name].priority, self.started_playing[name]))
+        loaded = [name for name, state in self.states.items() if state]
+        if loaded:
+            return max(loaded, key=lambda name: (self.last_playing.get(name, 0), self.sources[name].priority))
+        return None
+
+    def run_command(self, name, command):
+        """Run a player command off the GUI thread, then poll that source again"""
+        self._submit(self._run_command, name, command)
+
+    def run(self, fn, *args):
+        """Run a one-off job on the poll workers; fn hands its result back through a signal of its own"""
+        self._submit(fn, *args)
+
+    def _run_command(self, name, command):
+        try:
+            getattr(self.sources[name], command)()
+            logging.info(f"Sent {command} to {self.sources[name].display_name}")
+        except Exception as e:
+            logging.error(f"Error sending {command} to {self.sources[name].display_name}: {str(e)}")
+            self.command_failed.emit(name, command)
+        self._command_finished.emit(name)
+
+    def shutdown(self):
+        """Stop the worker pool and close every source"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        for source in self.sources.values():
+            source.close()
@@ -1,4 +1,5 @@
 import sys
+import argparse
 import psutil
 import win32gui
 import win32process
@@ -6,14 +7,16 @@ import win32con
 import win32api
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QPushButton, QLabel, QHBoxLayout, QSlider, QFrame,
-                            QSizePolicy, QToolTip, QGraphicsDropShadowEffect, QMenu, QAction)
-from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, QPoint, QSize, QSettings
+                            QSizePolicy, QToolTip, QGraphicsDropShadowEffect, QMenu, QAction,
+                            QLineEdit, QListWidget, QListWidgetItem)
+from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QAbstractAnimation, QEasingCurve, QPoint, QSize, QSettings, pyqtSignal
 from PyQt5.QtGui import QFont, QColor, QPalette, QPainter, QPainterPath, QLinearGradient, QIcon, QPixmap
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 import json
 import os
 import logging
+from logging.handlers import RotatingFileHandler
 from datetime import datetime
 import winreg
 import warnings
@@ -24,9 +27,31 @@ import hashlib
 import secrets
 import requests
 from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
 import keyboard
 from hotkey_settings_dialog import HotkeySettingsDialog
 from hotkey_manager import HotkeyManager
+from device_manager import DeviceManager
+from playback_trace import TraceRecorder
+from history_store import HistoryStore
+from history_dialog import HistoryDialog
+from auth_listener import LoopbackAuthListener, is_loopback_uri
+from playback_fetch import LeanPlaybackFetcher, DEFAULT_API_PREFIX, is_scope_error
+from diagnostics import LagWatchdog, StartupProfiler
+from media_sources import SourceScheduler, SpotifySource, MpdSource
+from lyrics import LyricsLibrary
+from power_manager import PowerManager, PERFORMANCE, MODES, poll_interval
+from now_playing_publisher import NowPlayingPublisher, now_playing_payload
+from library_panel import LibraryPanel, LibraryLoader, LibraryClient, LibraryCache
+from track_cache import TrackCache
+from reachability import ReachabilityMonitor, probe_address, classify_error, OFFLINE, SERVER
+from state_store import StateStore, stored
+from quick_search import QuickSearch, normalize_query
+from command_executor import HedgedCommandExecutor, WebApiBackend, MediaKeyBackend
+from theme import apply_theme
+from state_snapshot import StateSnapshot
+from text_layout import ElidedLabel
+from volume_engine import VolumeEngine, PycawBackend
 
 # Suppress deprecation warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
@@ -36,35 +61,78 @@ appdata_path = os.path.join(os.environ['APPDATA'], 'MediaWidget')
 os.makedirs(appdata_path, exist_ok=True)
 log_file = os.path.join(appdata_path, 'media_widget.log')
 
+# Rotate the log so a widget left running for weeks doesn't grow it without bound
 logging.basicConfig(
-    filename=log_file,
+    handlers=[RotatingFileHandler(log_file, maxBytes=1024 * 1024, backupCount=3, encoding='utf-8')],
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-class FadeLabel(QLabel):
+# Allow pointing the Web API client at a local stub (see spotify_stub.py)
+api_prefix = os.environ.get('MEDIA_WIDGET_API_PREFIX')
+
+# Playback state and control, the lean currently-playing poll, Liked Songs and private and collaborative playlists
+SPOTIFY_SCOPES = ('user-read-playback-state user-modify-playback-state user-read-currently-playing '
+                  'user-library-read playlist-read-private playlist-read-collaborative')
+
+# Media keys used when a Web API command is too slow or not allowed
+MEDIA_KEYS = {
+    'play_pause': win32con.VK_MEDIA_PLAY_PAUSE,
+    'next_track': win32con.VK_MEDIA_NEXT_TRACK,
+    'previous_track': win32con.VK_MEDIA_PREV_TRACK
+}
+
+COMMAND_FAILED_MESSAGES = {
+    'play_pause': "Failed to control playback",
+    'next_track': "Failed to skip track",
+    'previous_track': "Failed to skip track",
+    'start_playback': "Failed to start playback"
+}
+
+class FadeLabel(ElidedLabel):
+    # Turned off by the battery saver profile
+    animations_enabled = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._opacity = 1.0
         self.animation = QPropertyAnimation(self, b"windowOpacity")
         self.animation.setDuration(300)
         self.animation.setEasingCurve(QEasingCurve.InOutQuad)
+        # Connected once; the text to show after the fade-out is kept in _pending_text
+        self._pending_text = None
+        self.animation.finished.connect(self._setTextAndFadeIn)
 
     def setText(self, text):
-        if self.text() != text:
+        if not FadeLabel.animations_enabled:
+            self.setTextImmediately(text)
+        elif self._pending_text is not None:
+            # A fade is already in flight, just show the latest text when it ends
+            self._pending_text = text
+        elif self.text() != text:
+            self._pending_text = text
             self.animation.setStartValue(1.0)
             self.animation.setEndValue(0.0)
-            self.animation.finished.connect(lambda: self._setTextAndFadeIn(text))
             self.animation.start()
 
-    def _setTextAndFadeIn(self, text):
+    def setTextImmediately(self, text):
+        self.animation.stop()
+        self._pending_text = None
         super().setText(text)
+
+    def _setTextAndFadeIn(self):
+        if self._pending_text is None:
+            return
+        super().setText(self._pending_text)
+        self._pending_text = None
         self.animation.setStartValue(0.0)
         self.animation.setEndValue(1.0)
-        self.animation.finished.disconnect()
         self.animation.start()
 
 class ModernButton(QPushButton):
+    # Turned off by the battery saver profile
+    animations_enabled = True
+
     def __init__(self, icon_path, parent=None, size=45):
         super().__init__(parent)
         self.setCursor(Qt.PointingHandCursor)
@@ -73,87 +141,91 @@ class ModernButton(QPushButton):
         self.animation = QPropertyAnimation(self, b"iconSize")
         self.animation.setDuration(200)
         self.animation.setEasingCurve(QEasingCurve.OutBack)
+        self._growing = False
+        self.animation.finished.connect(self._resetIconSize)
         if icon_path:
             self.setIcon(QIcon(icon_path))
-        self.setStyleSheet("""
-            ModernButton {
-                background-color: transparent;
-                border: none;
-                border-radius: 22px;
-            }
-            ModernButton:hover {
-                background-color: rgba(255, 255, 255, 0.1);
-            }
-            ModernButton:pressed {
-                background-color: rgba(255, 255, 255, 0.2);
-            }
-            ModernButton:disabled {
-                opacity: 0.5;
-            }
-        """)
 
     def setIcon(self, icon):
-        if self.icon() and self.icon().pixmap(32, 32).toImage() != icon.pixmap(32, 32).toImage():
+        # Only bounce from rest, so overlapping icon changes can't drift the icon size
+        if (ModernButton.animations_enabled and self.animation.state() == QAbstractAnimation.Stopped and self.icon()
+                and self.icon().pixmap(32, 32).toImage() != icon.pixmap(32, 32).toImage()):
+            self._growing = True
             current_size = self.iconSize()
             self.animation.setStartValue(current_size)
             self.animation.setEndValue(QSize(current_size.width() + 5, current_size.height() + 5))
-            self.animation.finished.connect(lambda: self._resetIconSize(icon))
             self.animation.start()
         super().setIcon(icon)
 
-    def _resetIconSize(self, icon):
-        super().setIcon(icon)
+    def _resetIconSize(self):
+        if not self._growing:
+            return
+        self._growing = False
         current_size = self.iconSize()
         self.animation.setStartValue(current_size)
         self.animation.setEndValue(QSize(current_size.width() - 5, current_size.height() - 5))
-        self.animation.finished.disconnect()
         self.animation.start()
 
 class CloseButton(ModernButton):
     def __init__(self, parent=None):
         super().__init__(None, parent, size=25)
         self.setText("×")
-        self.setStyleSheet("""
-            CloseButton {
-                background-color: transparent;
-                color: #888888;
-                border-radius: 12px;
-                font-size: 30px;
-                font-weight: bold;
-            }
-            CloseButton:hover {
-                background-color: #ff4444;
-                color: white;
-            }
-        """)
 
 class GlassFrame(QFrame):
+    # Styled by the application theme (see theme.py)
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setStyleSheet("""
-            GlassFrame {
-                background-color: rgba(255, 255, 255, 0.1);
-                border-radius: 15px;
-                border: 1px solid rgba(255, 255, 255, 0.2);
-            }
-        """)
 
 class MediaWidget(QMainWindow):
-    def __init__(self):
+    # Lets startup workers hand a callback back to the GUI thread
+    run_on_gui_thread = pyqtSignal(object)
+    # (track the queue was fetched for, queue) from a poll worker
+    queue_fetched = pyqtSignal(object, object)
+    # Read by poll workers and written from timers, hotkeys and auth callbacks, so kept in the state store
+    is_spotify_running = stored('is_spotify_running')
+    is_spotify_connected = stored('is_spotify_connected')
+    current_playback_state = stored('current_playback_state')
+    last_track_info = stored('last_track_info')
+
+    def __init__(self, trace_recorder=None, system_hooks=True):
         super().__init__()
+        self.run_on_gui_thread.connect(lambda callback: callback())
+        self.queue_fetched.connect(self.on_queue_fetched)
+        self.first_track_shown = False
         self.setWindowTitle("Media Controller")
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
         self.setAttribute(Qt.WA_TranslucentBackground)
         
+        # Optional recorder for playback traces (see playback_trace.py)
+        self.trace_recorder = trace_recorder
+        # The Windows startup entry and the global keyboard hook; off for startup measurements
+        self.system_hooks = system_hooks
+        # Called once when the window first paints (used by --measure-startup)
+        self.first_paint_callback = None
+        
         # Initialize state
-        self.is_spotify_running = False
-        self.is_spotify_connected = False
-        self.current_playback_state = None
-        self.last_track_info = None
+        self.state_store = StateStore()
+        self.state_store.changed.connect(self.on_state_changed)
+        # Set when the saved token lacks scopes added since it was granted
+        self.relogin_needed = False
+        self.up_next = None
+        self.skip_requested_at = None
+        self.current_play = None
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = 3
+        self.max_token_polls = 150  # 5 minutes at one poll every 2 seconds
         self.reconnect_timer = QTimer()
         self.reconnect_timer.timeout.connect(self.try_reconnect)
+        self.auth_listener = None
+        self.pending_auth = None
+        self.power_profile = PERFORMANCE
+        # Only the Spotify source's poll reads and writes this, and the scheduler never has two of those in flight
+        self.last_process_scan = None
+        
+        # Volume changes ease toward a target on one timer; the slider shows the target
+        self.volume_engine = VolumeEngine(PycawBackend())
+        self.volume_engine.target_changed.connect(self.sync_volume_slider)
+        self.volume_engine.write_failed.connect(lambda message: self.show_tooltip("Failed to set volume"))
         
         # Create UI elements first
         self._create_ui()
@@ -161,10 +233,95 @@ class MediaWidget(QMainWindow):
         # Load settings after UI is created
         self.settings = QSettings('MediaWidget', 'SpotifyController')
         self.load_settings()
+        self.volume_engine.ramp_ms = self.settings.value('volume_ramp_ms', 150, type=int)
+        self.volume_engine.fade_ms = self.settings.value('fade_playback_ms', 0, type=int)
+        
+        # One application stylesheet styles every widget; it's applied before the first show so widgets polish once
+        self.theme = apply_theme(QApplication.instance(), self.settings.value('theme', 'dark'))
+        
+        # Listening history is written off-thread to a local SQLite database (started with the startup tasks)
+        self.history_store = HistoryStore(
+            os.path.join(appdata_path, 'history.db'),
+            max_age_days=self.settings.value('history_retention_days', 365, type=int)
+        )
         
-        # Initialize Spotify client
+        # Initialize Spotify client. The client and fetcher are only replaced on the GUI thread (login, relogin,
+        # disconnect); workers read each of them once into a local, so a request started before a disconnect
+        # finishes on the old client instead of finding None half way through
         self.spotify = None
-        self.initialize_spotify()
+        self.playback_fetcher = None
+        self.access_token = None
+        # Never replaced after this; it guards its own device state with a lock
+        self.device_manager = DeviceManager(self, last_device_id=self.settings.value('last_device_id') or None)
+        self.device_manager.devices_changed.connect(self.on_devices_changed)
+        # Created the first time the library is opened; its page cache lives in the AppData folder
+        self.library_loader = None
+        
+        # Every media source is polled off the GUI thread by one scheduler
+        self.spotify_source = SpotifySource(self, priority=self.settings.value('spotify_priority', 1, type=int))
+        sources = [self.spotify_source]
+        mpd_host = self.settings.value('mpd_host', '')
+        if mpd_host:
+            sources.append(MpdSource(mpd_host, self.settings.value('mpd_port', 6600, type=int),
+                                     self.settings.value('mpd_password', '') or None,
+                                     priority=self.settings.value('mpd_priority', 0, type=int)))
+        self.active_source_name = None
+        self.source_scheduler = SourceScheduler(sources)
+        self.source_scheduler.source_updated.connect(self.on_source_updated)
+        self.source_scheduler.command_failed.connect(self.on_source_command_failed)
+        # While the API can't be reached, Spotify polls are parked and a cheap probe watches for the network
+        self.reachability = ReachabilityMonitor(probe_address(api_prefix or DEFAULT_API_PREFIX))
+        self.reachability.went_offline.connect(self.on_went_offline)
+        self.reachability.back_online.connect(self.on_back_online)
+        
+        # The last shown track is saved on change and on close, and shown right away at the next start,
+        # marked stale until a poll of its source has confirmed or replaced it
+        self.state_snapshot = StateSnapshot(os.path.join(appdata_path, 'last_state.json'))
+        # Track details by id, filled from polls and fetched in batches for the history dialog
+        self.track_cache = TrackCache(os.path.join(appdata_path, 'track_cache.json'))
+        self.stale_snapshot = None
+        snapshot = self.state_snapshot.load()
+        if snapshot:
+            self.show_snapshot(snapshot)
+        
+        # Spotify commands fall back to a media key if the Web API is slow to send or refuses them
+        self.command_executor = HedgedCommandExecutor(
+            WebApiBackend(self), MediaKeyBackend(self.press_media_key, MEDIA_KEYS),
+            budget_ms=self.settings.value('command_budget_ms', 400, type=int))
+        self.command_executor.command_finished.connect(self.on_command_finished)
+        
+        # Overlays and chat bots read now playing from here instead of polling Spotify themselves
+        self.now_playing_publisher = None
+        if self.settings.value('now_playing_publish', False, type=bool):
+            # Comma-separated web page origins allowed to read the server; local tools need none
+            origins = self.settings.value('now_playing_allowed_origins', '', type=str)
+            try:
+                self.now_playing_publisher = NowPlayingPublisher(
+                    appdata_path, self.settings.value('now_playing_port', 8974, type=int),
+                    [origin.strip() for origin in origins.split(',') if origin.strip()]).start()
+            except OSError as e:
+                logging.error(f"Error starting now playing publisher: {str(e)}")
+        
+        # Lyrics follow a position interpolated from the last poll; the timer fires once per line
+        # The folder is indexed on the poll workers; lookups on the GUI thread use the last finished index
+        self.lyrics_library = LyricsLibrary(self.settings.value('lyrics_folder', os.path.join(appdata_path, 'lyrics')),
+                                            run=self.source_scheduler.run)
+        self.lyrics_library.index_changed.connect(self.on_lyrics_index_changed)
+        self.lyrics_library.refresh()
+        self.lyrics = None
+        self.lyrics_track = None
+        self.lyrics_anchor = None
+        self.lyrics_timer = QTimer()
+        self.lyrics_timer.setSingleShot(True)
+        self.lyrics_timer.timeout.connect(self.update_lyrics_line)
+        
+        # Searches wait for typing to pause; cached and narrowed-down queries are answered right away
+        self.quick_search = QuickSearch(self.search_spotify, self.settings.value('search_debounce_ms', 250, type=int))
+        self.quick_search.results_ready.connect(self.show_search_results)
+        self.quick_search.search_failed.connect(lambda query, message: self.show_tooltip("Search failed"))
+        self.search_box.textEdited.connect(self.quick_search.set_text)
+        self.search_box.returnPressed.connect(self.play_first_search_result)
+        self.search_results.itemActivated.connect(self.play_search_result)
         
         # Setup timers
         self.timer = QTimer()
@@ -175,11 +332,24 @@ class MediaWidget(QMainWindow):
         self.idle_timer.timeout.connect(self.check_idle_state)
         self.idle_timer.start(5000)  # Check idle state every 5 seconds
         
+        # Log timer drift and sample the GUI thread's stack when a handler blocks it; the power profile starts it
+        self.lag_watchdog = LagWatchdog(threshold_ms=self.settings.value('lag_threshold_ms', 500, type=int))
+        
+        # Longer intervals, no animations, fewer process scans and no lag watchdog while on battery
+        self.power_manager = PowerManager(self.settings.value('power_profile', 'auto'))
+        self.power_manager.profile_changed.connect(self.apply_power_profile)
+        self.power_manager.start()
+        
         # Connect button signals
         self.prev_button.clicked.connect(self.previous_track)
         self.play_button.clicked.connect(self.toggle_playback)
         self.next_button.clicked.connect(self.next_track)
         
+        # Account menu is built on first open and reused afterwards
+        self.account_menu = None
+        self.device_menu = None
+        self.power_menu = None
+        
         # For window dragging
         self.oldPos = None
         self.drag_start_pos = None
@@ -187,13 +357,60 @@ class MediaWidget(QMainWindow):
         # Update button states
         self.update_button_states()
         
-        # Set startup with Windows
-        self.set_startup_with_windows()
-        
         # Initialize hotkey manager
         self.hotkey_manager = HotkeyManager(self)
         self._connect_hotkey_signals()
-        self.hotkey_manager.start()
+        
+        # File, registry, hook and network setup run concurrently while the window shows
+        self.start_background_tasks()
+
+    def start_background_tasks(self):
+        """Run the non-UI startup stages on a worker pool"""
+        pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='Startup')
+        pool.submit(self._startup_task, "connect to Spotify", self._prepare_spotify_client)
+        pool.submit(self._startup_task, "start listening history", self.history_store.start)
+        pool.submit(self._startup_task, "load track cache", self.track_cache.load)
+        if self.system_hooks:
+            pool.submit(self._startup_task, "set startup with Windows", self.set_startup_with_windows)
+            pool.submit(self._startup_task, "register hotkeys", self.hotkey_manager.start)
+        pool.shutdown(wait=False)
+
+    def _startup_task(self, name, task):
+        started = time.perf_counter()
+        try:
+            task()
+        except Exception as e:
+            logging.error(f"Startup task '{name}' failed: {str(e)}")
+        logging.info(f"Startup task '{name}' took {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def _prepare_spotify_client(self):
+        """Read the saved token and warm up the API connection (runs on a startup worker)"""
+        try:
+            access_token = self._read_saved_token()
+        except Exception as e:
+            logging.error(f"Error initializing Spotify client: {str(e)}")
+            access_token = None
+        session = None
+        if access_token:
+            # DNS, TCP and TLS are done here so the first poll reuses an open connection
+            session = requests.Session()
+            try:
+                session.head(api_prefix or 'https://api.spotify.com/v1/', timeout=5)
+            except requests.RequestException as e:
+                logging.error(f"Error pre-warming API connection: {str(e)}")
+        self.run_on_gui_thread.emit(lambda: self._finish_spotify_startup(access_token, session))
+
+    def _finish_spotify_startup(self, access_token, session):
+        """Create the client from the startup worker's results and poll right away"""
+        if self.spotify is not None:
+            # Already connected (a login finished first, or a replay/soak run installed its client)
+            return
+        self._apply_saved_token(access_token, session)
+        if self.is_spotify_connected:
+            self.check_media_players()
+        elif self.stale_snapshot and self.stale_snapshot['source'] == self.spotify_source.name:
+            # The login prompt has replaced it
+            self.stale_snapshot = None
 
     def _create_ui(self):
         """Create and setup all UI elements"""
@@ -210,16 +427,11 @@ class MediaWidget(QMainWindow):
         shadow.setColor(QColor(0, 0, 0, 100))
         shadow.setOffset(0, 2)
         central_widget.setGraphicsEffect(shadow)
+        self.shadow_effect = shadow
         
         # Create main content frame with improved styling
         content_frame = QFrame()
-        content_frame.setStyleSheet("""
-            QFrame {
-                background-color: rgba(30, 30, 30, 0.3);
-                border-radius: 15px;
-                border: 1px solid rgba(255, 255, 255, 0.3);
-            }
-        """)
+        content_frame.setObjectName('contentFrame')
         content_layout = QVBoxLayout(content_frame)
         content_layout.setContentsMargins(20, 20, 20, 20)
         content_layout.setSpacing(15)
@@ -233,17 +445,7 @@ class MediaWidget(QMainWindow):
         # Add account menu button with larger size
         self.account_button = QPushButton()
         self.account_button.setIcon(QIcon("icons/account.png"))
-        self.account_button.setStyleSheet("""
-            QPushButton {
-                background-color: rgba(255, 255, 255, 0.1);
-                border: none;
-                padding: 8px;
-                border-radius: 20px;
-            }
-            QPushButton:hover {
-                background-color: rgba(255, 255, 255, 0.2);
-            }
-        """)
+        self.account_button.setObjectName('accountButton')
         self.account_button.setFixedSize(40, 40)
         self.account_button.setIconSize(QSize(24, 24))
         self.account_button.setCursor(Qt.PointingHandCursor)
@@ -253,23 +455,29 @@ class MediaWidget(QMainWindow):
         # Add settings button
         self.settings_button = QPushButton()
         self.settings_button.setIcon(QIcon("icons/settings.png"))
-        self.settings_button.setStyleSheet("""
-            QPushButton {
-                background-color: rgba(255, 255, 255, 0.1);
-                border: none;
-                padding: 8px;
-                border-radius: 20px;
-            }
-            QPushButton:hover {
-                background-color: rgba(255, 255, 255, 0.2);
-            }
-        """)
+        self.settings_button.setObjectName('settingsButton')
         self.settings_button.setFixedSize(40, 40)
         self.settings_button.setIconSize(QSize(24, 24))
         self.settings_button.setCursor(Qt.PointingHandCursor)
         self.settings_button.clicked.connect(self.show_hotkey_settings)
         header_layout.addWidget(self.settings_button)
         
+        # Shown while the battery saver profile is active
+        self.power_label = QLabel("Battery saver")
+        self.power_label.setFont(QFont('Segoe UI', 8))
+        self.power_label.setObjectName('powerLabel')
+        self.power_label.hide()
+        header_layout.addWidget(self.power_label)
+        
+        # Quick search; results drop down under the header
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search")
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.setFont(QFont('Segoe UI', 9))
+        self.search_box.setFixedHeight(32)
+        self.search_box.setObjectName('searchBox')
+        header_layout.addWidget(self.search_box, 1)
+        
         # Add spacer
         header_layout.addStretch()
         
@@ -283,58 +491,47 @@ class MediaWidget(QMainWindow):
         # Add header to content layout
         content_layout.addWidget(header_container)
         
+        self.search_results = QListWidget()
+        self.search_results.setFont(QFont('Segoe UI', 10))
+        self.search_results.setObjectName('searchResults')
+        self.search_results.setFixedHeight(200)
+        self.search_results.hide()
+        content_layout.addWidget(self.search_results)
+        
         # Create UI elements with improved styling
         self.status_label = FadeLabel("No media player detected")
         self.status_label.setFont(QFont('Segoe UI', 9))
-        self.status_label.setStyleSheet("""
-            QLabel {
-                color: #888888;
-                background-color: transparent;
-                border: none;
-            }
-        """)
+        self.status_label.setObjectName('statusLabel')
         
-        # Song info container with auto-height
+        # Song info container; the labels are one line high and elide what doesn't fit,
+        # so a track change only repaints them and never resizes the window
         song_container = QWidget()
         song_container.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
-        song_container.setStyleSheet("""
-            QWidget {
-                background-color: transparent;
-                border: none;
-            }
-        """)
+        song_container.setObjectName('songContainer')
         song_layout = QVBoxLayout(song_container)
         song_layout.setContentsMargins(0, 0, 0, 0)
         song_layout.setSpacing(8)
         
         self.song_label = FadeLabel("")
         self.song_label.setFont(QFont('Segoe UI', 18, QFont.Bold))
-        self.song_label.setStyleSheet("""
-            QLabel {
-                color: white;
-                background-color: transparent;
-                border: none;
-            }
-        """)
-        self.song_label.setWordWrap(True)
-        self.song_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
+        self.song_label.setObjectName('songLabel')
         self.song_label.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         
         self.artist_label = FadeLabel("")
         self.artist_label.setFont(QFont('Segoe UI', 12))
-        self.artist_label.setStyleSheet("""
-            QLabel {
-                color: #BBBBBB;
-                background-color: transparent;
-                border: none;
-            }
-        """)
-        self.artist_label.setWordWrap(True)
-        self.artist_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
+        self.artist_label.setObjectName('artistLabel')
         self.artist_label.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         
+        # Synced lyrics line, only shown when the track has an .lrc file
+        self.lyrics_label = FadeLabel("")
+        self.lyrics_label.setFont(QFont('Segoe UI', 11))
+        self.lyrics_label.setObjectName('lyricsLabel')
+        self.lyrics_label.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
+        self.lyrics_label.hide()
+        
         song_layout.addWidget(self.song_label)
         song_layout.addWidget(self.artist_label)
+        song_layout.addWidget(self.lyrics_label)
         
         # Volume slider with modern styling
         volume_container = QWidget()
@@ -344,43 +541,13 @@ class MediaWidget(QMainWindow):
         
         volume_icon = QLabel("🔊")
         volume_icon.setFont(QFont('Segoe UI', 12))
-        volume_icon.setStyleSheet("color: #888888;")
+        volume_icon.setObjectName('volumeIcon')
         volume_icon.setFixedWidth(30)
         
         self.volume_slider = QSlider(Qt.Horizontal)
         self.volume_slider.setRange(0, 100)
         self.volume_slider.setValue(50)
-        self.volume_slider.setStyleSheet("""
-            QSlider::groove:horizontal {
-                border: none;
-                height: 4px;
-                background: rgba(255, 255, 255, 0.1);
-                margin: 2px 0;
-                border-radius: 2px;
-                opacity: 0.5;
-            }
-            QSlider::handle:horizontal {
-                background: rgba(255, 255, 255, 0.5);
-                border: none;
-                width: 12px;
-                height: 12px;
-                margin: -4px 0;
-                border-radius: 6px;
-                opacity: 0.5;
-            }
-            QSlider::handle:horizontal:hover {
-                background: rgba(0, 122, 255, 0.5);
-                width: 14px;
-                height: 14px;
-                margin: -5px 0;
-                opacity: 0.7;
-            }
-            QSlider::sub-page:horizontal {
-                background: rgba(0, 122, 255, 0.2);
-                border-radius: 2px;
-                opacity: 0.5;
-            }
-        """)
+        self.volume_slider.setObjectName('volumeSlider')
         self.volume_slider.valueChanged.connect(self.set_volume)
         
         volume_layout.addWidget(volume_icon)
@@ -424,26 +591,56 @@ class MediaWidget(QMainWindow):
         """Save current settings"""
         self.settings.setValue('position', self.pos())
         self.settings.setValue('volume', self.volume_slider.value())
+        if self.device_manager.last_device_id:
+            self.settings.setValue('last_device_id', self.device_manager.last_device_id)
 
     def set_startup_with_windows(self):
         """Set the application to start with Windows"""
         try:
+            command = sys.executable + " " + os.path.abspath(__file__)
             key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, 
                                 r"Software\Microsoft\Windows\CurrentVersion\Run",
-                                0, winreg.KEY_SET_VALUE)
-            winreg.SetValueEx(key, "MediaWidget", 0, winreg.REG_SZ, 
-                            sys.executable + " " + os.path.abspath(__file__))
+                                0, winreg.KEY_QUERY_VALUE | winreg.KEY_SET_VALUE)
+            try:
+                current, _ = winreg.QueryValueEx(key, "MediaWidget")
+            except FileNotFoundError:
+                current = None
+            # Only write when the entry is missing or points somewhere else
+            if current != command:
+                winreg.SetValueEx(key, "MediaWidget", 0, winreg.REG_SZ, command)
+                logging.info("Added to Windows startup")
             winreg.CloseKey(key)
-            logging.info("Added to Windows startup")
         except Exception as e:
             logging.error(f"Failed to set startup with Windows: {str(e)}")
 
     def check_idle_state(self):
         """Check if Spotify is idle and adjust refresh rate"""
-        if not self.is_spotify_running or not self.current_playback_state:
-            self.timer.setInterval(5000)  # Check every 5 seconds when idle
+        idle = not self.is_spotify_running or not self.current_playback_state
+        self.timer.setInterval(poll_interval(self.power_profile, idle))
+
+    def apply_power_profile(self, profile):
+        """Apply poll intervals and visual effects for a power profile"""
+        self.power_profile = profile
+        FadeLabel.animations_enabled = profile.animations
+        ModernButton.animations_enabled = profile.animations
+        self.shadow_effect.setEnabled(profile.animations)
+        self.power_label.setVisible(profile is not PERFORMANCE)
+        self.power_label.setText(profile.label)
+        if profile.lag_watchdog:
+            self.lag_watchdog.start()
         else:
-            self.timer.setInterval(2000)  # Check every 2 seconds when active
+            self.lag_watchdog.stop()
+        self.check_idle_state()
+
+    def set_power_mode(self, mode):
+        """Save the power profile mode chosen in the menu"""
+        self.settings.setValue('power_profile', mode)
+        self.power_manager.set_mode(mode)
+
+    def set_theme(self, name):
+        """Switch between the dark and light themes"""
+        self.settings.setValue('theme', name)
+        self.theme = apply_theme(QApplication.instance(), name)
 
     def try_reconnect(self):
         """Attempt to reconnect to Spotify"""
@@ -461,9 +658,14 @@ class MediaWidget(QMainWindow):
         """Show a tooltip message"""
         QToolTip.showText(self.mapToGlobal(self.rect().center()), message, self, self.rect(), duration)
 
+    def on_state_changed(self, keys, state):
+        """Follow connection changes made anywhere, e.g. by an auth callback"""
+        if keys & {'is_spotify_running', 'is_spotify_connected'}:
+            self.update_button_states()
+
     def update_button_states(self):
         """Update button states based on Spotify status"""
-        is_enabled = self.is_spotify_running and self.is_spotify_connected
+        is_enabled = (self.is_spotify_running and self.is_spotify_connected) or self.shown_source() is not None
         self.prev_button.setEnabled(is_enabled)
         self.play_button.setEnabled(is_enabled)
         self.next_button.setEnabled(is_enabled)
@@ -488,44 +690,94 @@ class MediaWidget(QMainWindow):
     def initialize_spotify(self):
         """Initialize Spotify client with PKCE"""
         try:
-            # Read client ID from file
-            if not os.path.exists('spotify_credentials.json'):
-                logging.error("Spotify credentials file not found")
-                self.show_spotify_login()
-                return
+            self._apply_saved_token(self._read_saved_token())
+        except Exception as e:
+            self.is_spotify_connected = False
+            logging.error(f"Error initializing Spotify client: {str(e)}")
+            self.show_spotify_login()
 
-            with open('spotify_credentials.json', 'r') as f:
-                credentials = json.load(f)
+    def _read_saved_token(self):
+        """Return the cached access token, or None if the user has to log in (no UI, safe on any thread)"""
+        # Read client ID from file
+        if not os.path.exists('spotify_credentials.json'):
+            logging.error("Spotify credentials file not found")
+            return None
 
-            if 'client_id' not in credentials:
-                logging.error("Client ID not found in credentials file")
-                self.show_spotify_login()
-                return
+        with open('spotify_credentials.json', 'r') as f:
+            credentials = json.load(f)
 
-            # Try to load existing token
-            cache_path = os.path.join(os.environ['APPDATA'], 'MediaWidget', '.spotify_cache')
-            if os.path.exists(cache_path):
-                try:
-                    with open(cache_path, 'r') as f:
-                        token_info = json.load(f)
-                    if token_info.get('access_token'):
-                        self.spotify = spotipy.Spotify(auth=token_info['access_token'])
-                        self.is_spotify_connected = True
-                        logging.info("Loaded existing token")
-                        return
-                except Exception as e:
-                    logging.error(f"Error loading token: {str(e)}")
+        if 'client_id' not in credentials:
+            logging.error("Client ID not found in credentials file")
+            return None
 
-            self.show_spotify_login()
-            
-        except Exception as e:
-            self.is_spotify_connected = False
-            logging.error(f"Error initializing Spotify client: {str(e)}")
+        # Try to load existing token
+        cache_path = os.path.join(os.environ['APPDATA'], 'MediaWidget', '.spotify_cache')
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r') as f:
+                    token_info = json.load(f)
+                granted = token_info.get('scope')
+                missing = set(SPOTIFY_SCOPES.split()) - set(granted.split()) if granted is not None else set()
+                if missing:
+                    # Logged in before the widget needed these; the token can't be used for them
+                    logging.info(f"Saved token lacks {', '.join(sorted(missing))}, asking to log in again")
+                    self.relogin_needed = True
+                    return None
+                if token_info.get('access_token'):
+                    return token_info['access_token']
+            except Exception as e:
+                logging.error(f"Error loading token: {str(e)}")
+        return None
+
+    def _apply_saved_token(self, access_token, session=None):
+        """Connect with a saved token or ask the user to log in"""
+        if access_token:
+            self._create_spotify_client(access_token, session)
+            self.is_spotify_connected = True
+            logging.info("Loaded existing token")
+        else:
             self.show_spotify_login()
 
+    def _create_spotify_client(self, access_token, session=None):
+        """Create the Spotify Web API client for an access token"""
+        self.spotify = spotipy.Spotify(auth=access_token, requests_session=session or True)
+        self.access_token = access_token
+        self.relogin_needed = False
+        self.track_cache.client = LibraryClient(access_token, api_prefix)
+        if api_prefix:
+            self.spotify.prefix = api_prefix
+        # Lean mode polls the lighter currently-playing endpoint instead of the full player
+        if self.settings.value('lean_playback_fetch', False, type=bool):
+            self.playback_fetcher = LeanPlaybackFetcher(access_token, api_prefix, session=session)
+        else:
+            self.playback_fetcher = None
+        if self.trace_recorder:
+            self.spotify = self.trace_recorder.wrap(self.spotify)
+            if self.playback_fetcher:
+                self.playback_fetcher = self.trace_recorder.wrap(self.playback_fetcher)
+        self.device_manager.reset()
+
+    def prompt_relogin(self):
+        """Drop a token missing scopes the widget needs and ask the user to log in again"""
+        cache_path = os.path.join(os.environ['APPDATA'], 'MediaWidget', '.spotify_cache')
+        try:
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+        except OSError as e:
+            logging.error(f"Error removing token: {str(e)}")
+        self.is_spotify_connected = False
+        self.spotify = None
+        self.playback_fetcher = None
+        self.access_token = None
+        self.track_cache.client = None
+        self.relogin_needed = True
+        self.show_spotify_login()
+        self.show_tooltip("Please log in to Spotify again")
+
     def show_spotify_login(self):
         """Show Spotify login dialog"""
-        self.status_label.setText("Spotify not connected")
+        self.status_label.setText("Log in to Spotify again to allow library access" if self.relogin_needed
+                                  else "Spotify not connected")
         self.song_label.setText("")
         self.artist_label.setText("")
         self.update_button_states()
@@ -553,8 +805,10 @@ class MediaWidget(QMainWindow):
 
             # Store code verifier in settings
             self.settings.setValue('code_verifier', code_verifier)
+            # Receive the code directly when the redirect points at this machine
+            use_loopback = is_loopback_uri(credentials['redirect_uri'])
             # Generate and store a unique ID for this auth attempt
-            code_id = str(int(time.time() * 1000))
+            code_id = secrets.token_urlsafe(16) if use_loopback else str(int(time.time() * 1000))
             self.settings.setValue('code_id', code_id)
 
             # Construct authorization URL
@@ -563,7 +817,7 @@ class MediaWidget(QMainWindow):
                 'client_id': credentials['client_id'],
                 'response_type': 'code',
                 'redirect_uri': credentials['redirect_uri'],
-                'scope': 'user-read-playback-state user-modify-playback-state',
+                'scope': SPOTIFY_SCOPES,
                 'code_challenge_method': 'S256',
                 'code_challenge': code_challenge,
                 'state': code_id  # Add the code_id as state parameter
@@ -571,19 +825,55 @@ class MediaWidget(QMainWindow):
             
             auth_url = f"{auth_url}?{urlencode(params)}"
             
+            if use_loopback:
+                self.start_auth_listener(code_id, code_verifier, credentials)
+            
             # Open browser for authorization
             import webbrowser
             webbrowser.open(auth_url)
             
-            # Start polling for the token
-            self.poll_for_token(code_verifier, credentials)
+            if not use_loopback:
+                # Start polling the remote callback server for the code
+                self.poll_for_token(code_verifier, credentials)
             
         except Exception as e:
             logging.error(f"Error during Spotify authentication: {str(e)}")
             self.show_tooltip("Failed to connect to Spotify. Please try again.")
 
-    def poll_for_token(self, code_verifier, credentials):
+    def start_auth_listener(self, state, code_verifier, credentials):
+        """Listen on the loopback redirect URI for the authorization code"""
+        if self.auth_listener:
+            self.auth_listener.stop()
+        self.pending_auth = (code_verifier, credentials)
+        self.auth_listener = LoopbackAuthListener(credentials['redirect_uri'], state)
+        self.auth_listener.code_received.connect(self._on_auth_code)
+        self.auth_listener.failed.connect(self._on_auth_failed)
+        self.auth_listener.start()
+
+    def _on_auth_code(self, code):
+        """Exchange a code received by the loopback listener"""
+        if not self.pending_auth:
+            return
+        code_verifier, credentials = self.pending_auth
+        self.pending_auth = None
+        self.auth_listener = None
+        self.exchange_code_for_token(code, code_verifier, credentials)
+
+    def _on_auth_failed(self, error):
+        """Handle a cancelled or timed out loopback authorization"""
+        self.pending_auth = None
+        self.auth_listener = None
+        if error == 'timeout':
+            self.show_tooltip("Spotify login timed out. Please try again.")
+        else:
+            self.show_tooltip("Spotify login was cancelled.")
+
+    def poll_for_token(self, code_verifier, credentials, attempt=0):
         """Poll for the authorization code from the callback server"""
+        if attempt >= self.max_token_polls:
+            logging.error("Gave up polling for authorization code")
+            self.show_tooltip("Spotify login timed out. Please try again.")
+            return
         try:
             code_id = self.settings.value('code_id')
             if not code_id:
@@ -593,12 +883,8 @@ class MediaWidget(QMainWindow):
             # Use the correct API endpoint from credentials
             base_url = credentials['redirect_uri'].rstrip('/')
             api_url = f"{base_url}/check-code"  # Remove /api/ prefix
-            logging.info(f"Polling URL: {api_url}")
             
-            response = requests.get(f"{api_url}?id={code_id}")
-            print(response)
-            logging.info(f"Response status: {response.status_code}")
-            logging.info(f"Response content: {response.text}")
+            response = requests.get(api_url, params={'id': code_id}, timeout=5)
             
             if response.status_code == 200:
                 data = response.json()
@@ -609,19 +895,15 @@ class MediaWidget(QMainWindow):
                     return
                 else:
                     logging.error("No code in response")
-            elif response.status_code == 404:
-                # Code not found yet, continue polling
-                logging.info("Code not found yet, continuing to poll...")
-            else:
+            elif response.status_code != 404:
+                # 404 just means the code hasn't arrived yet
                 logging.error(f"Error polling for code: {response.status_code}")
             
-            # If no code yet or error, retry after a delay
-            QTimer.singleShot(2000, lambda: self.poll_for_token(code_verifier, credentials))
-            
         except Exception as e:
             logging.error(f"Error polling for token: {str(e)}")
-            # Retry on error
-            QTimer.singleShot(2000, lambda: self.poll_for_token(code_verifier, credentials))
+        
+        # If no code yet or error, retry after a delay
+        QTimer.singleShot(2000, lambda: self.poll_for_token(code_verifier, credentials, attempt + 1))
 
     def exchange_code_for_token(self, code, code_verifier, credentials):
         """Exchange the authorization code for an access token"""
@@ -644,7 +926,7 @@ class MediaWidget(QMainWindow):
                 with open(cache_path, 'w') as f:
                     json.dump(token_info, f)
                 
-                self.spotify = spotipy.Spotify(auth=token_info['access_token'])
+                self._create_spotify_client(token_info['access_token'])
                 self.is_spotify_connected = True
                 self.reconnect_attempts = 0
                 logging.info("Spotify authentication successful")
@@ -658,12 +940,183 @@ class MediaWidget(QMainWindow):
             self.show_tooltip("Failed to connect to Spotify. Please try again.")
 
     def check_media_players(self):
-        """Check Spotify playback status using Web API"""
+        """Poll every media source; results arrive in on_source_updated"""
+        names = list(self.source_scheduler.sources)
+        if self.reachability.offline:
+            names.remove(self.spotify_source.name)
+        self.source_scheduler.poll(names)
+
+    def on_went_offline(self):
+        """Say that Spotify polling is parked, unless another player is on screen"""
+        if self.shown_source() is None:
+            self.status_label.setText("Offline, showing the last track")
+
+    def on_back_online(self):
+        """Resume with one Spotify poll instead of waiting for the next tick"""
+        self.status_label.setText("Reconnecting...")
+        self.source_scheduler.poll([self.spotify_source.name])
+
+    def on_source_updated(self, name):
+        """Apply a finished poll and show whichever source is active"""
+        scheduler = self.source_scheduler
+        if name == self.spotify_source.name:
+            # Whichever player is shown, a failing Spotify poll parks Spotify polling while offline
+            error = scheduler.errors.get(name)
+            if error is None:
+                self.reachability.report_success()
+            else:
+                self.reachability.report_error(error)
+        active = scheduler.active_source()
+        snapshot_current = self.revalidate_snapshot(name, active)
+        active_changed = active != self.active_source_name
+        if active_changed:
+            logging.info(f"Active media source: {active}")
+            self.active_source_name = active
+            self.last_track_info = None
+            if not snapshot_current:
+                self.song_label.setText("")
+                self.artist_label.setText("")
+        if active_changed or name == active:
+            state = scheduler.states.get(active)
+            player = scheduler.sources[active].display_name if active else None
+            self.sync_lyrics(state)
+            self.state_snapshot.update(active, player, state)
+            if self.now_playing_publisher:
+                self.now_playing_publisher.publish(now_playing_payload(active, player, state))
+
+        source = self.shown_source()
+        if source is None:
+            if name == self.spotify_source.name:
+                self.apply_spotify_poll(scheduler.states.get(name), scheduler.errors.get(name))
+            return
+        if name == self.spotify_source.name:
+            # Another player is shown; keep device and listening bookkeeping going
+            self.is_spotify_running = self.spotify_source.running
+            self.track_spotify_playback(scheduler.states.get(name))
+        elif name == source.name:
+            self.show_source_state(source, scheduler.states[name])
+        self.update_button_states()
+
+    def show_snapshot(self, snapshot):
+        """Show the last known track before the first poll, marked as stale"""
+        self.stale_snapshot = snapshot
+        device = f" ({snapshot['device']})" if snapshot['device'] else ""
+        # No fade: this is meant to be in the first paint
+        self.status_label.setTextImmediately(f"Last played on {snapshot['player']}{device}, updating...")
+        self.song_label.setTextImmediately(snapshot['title'])
+        self.artist_label.setTextImmediately(snapshot['artist'])
+        launched = psutil.Process().create_time()
+        logging.info(f"Time to last known track: {(time.time() - launched) * 1000:.0f} ms after launch "
+                     f"(saved {time.time() - snapshot['saved_at']:.0f} s ago)")
+
+    def revalidate_snapshot(self, name, active):
+        """Drop the startup snapshot once a poll shows what is playing; True if its track is still the shown one"""
+        snapshot = self.stale_snapshot
+        if snapshot is None:
+            return False
+        source = snapshot['source']
+        if name != source and active in (None, source):
+            return True
+        if name == self.spotify_source.name == source and self.spotify is None and self.spotify_source.running:
+            # Polled before the saved token was read; the startup worker polls again once it has been
+            return True
+        self.stale_snapshot = None
+        state = self.source_scheduler.states.get(source)
+        if active in (None, source) and state and (state.title, state.artist) == (snapshot['title'], snapshot['artist']):
+            return True
+        self.status_label.setText("No media player detected")
+        self.song_label.setText("")
+        self.artist_label.setText("")
+        return False
+
+    def sync_lyrics(self, state):
+        """Re-anchor the lyrics position on a fresh poll of the shown source"""
+        track = (state.artist, state.title) if state and state.title else None
+        if track != self.lyrics_track:
+            self.lyrics_track = track
+            self.lyrics = self.lyrics_library.find(*track) if track else None
+        if self.lyrics and state.progress_ms is not None:
+            self.lyrics_anchor = (state.progress_ms, time.monotonic(), state.is_playing)
+        else:
+            self.lyrics_anchor = None
+        self.update_lyrics_line()
+
+    def on_lyrics_index_changed(self):
+        """Look the shown track up again at the next poll if it had no lyrics before the rescan"""
+        if self.lyrics is None:
+            self.lyrics_track = None
+
+    def update_lyrics_line(self):
+        """Show the current lyrics line and wake up again when it changes"""
+        self.lyrics_timer.stop()
+        if not self.lyrics_anchor:
+            self.lyrics_label.setVisible(False)
+            return
+        progress_ms, polled_at, is_playing = self.lyrics_anchor
+        position = progress_ms + ((time.monotonic() - polled_at) * 1000 if is_playing else 0)
+        line, next_change = self.lyrics.line_at(position)
+        self.lyrics_label.setText(line)
+        self.lyrics_label.setVisible(True)
+        if is_playing and next_change is not None:
+            self.lyrics_timer.start(int(next_change - position) + 1)
+
+    def shown_source(self):
+        """Return the non-Spotify source being shown, or None"""
+        if self.active_source_name in (None, self.spotify_source.name):
+            return None
+        return self.source_scheduler.sources[self.active_source_name]
+
+    def show_source_state(self, source, state):
+        """Show the track of a non-Spotify source"""
+        info = f"{source.name}:{state.is_playing}:{state.title} - {state.artist}"
+        if info == self.last_track_info:
+            return
+        self.last_track_info = info
+        self._show_track(state.title, state.artist, source.display_name)
+        if state.is_playing:
+            self.play_button.setIcon(QIcon("icons/pause.png"))
+            logging.info(f"Now playing on {source.display_name}: {state.title} - {state.artist}")
+        else:
+            self.status_label.setText(f"{source.display_name} is paused")
+            self.play_button.setIcon(QIcon("icons/play.png"))
+
+    def on_source_command_failed(self, name, command):
+        self.show_tooltip(f"Failed to control {self.source_scheduler.sources[name].display_name}")
+
+    def run_source_command(self, source, command):
+        """Send a command to a non-Spotify source without blocking the GUI thread"""
+        self.source_scheduler.run_command(source.name, command)
+
+    def track_spotify_playback(self, state):
+        """Keep device and listening history up to date for a Spotify poll"""
+        current = state.raw if state else None
+        self.device_manager.observe_playback(current)
+        self.track_cache.add_from_playback(current)
+        if current and current['is_playing'] and current['item']:
+            self.record_listening(current)
+        return current
+
+    def apply_spotify_poll(self, state, error):
+        """Show the result of a Spotify poll"""
+        if error is not None and is_scope_error(error):
+            self.prompt_relogin()
+            return
+        if error is not None:
+            # on_source_updated has already reported it to the reachability monitor
+            kind = classify_error(error)
+            if kind in (OFFLINE, SERVER):
+                # The scheduler kept the last good state, so the track stays up; the next good poll redraws it
+                # Going offline already said so through on_went_offline
+                if kind == SERVER:
+                    logging.error(f"Spotify server error: {str(error)}")
+                    self.status_label.setText("Spotify is having problems, retrying")
+                self.last_track_info = None
+                self.update_button_states()
+                return
         try:
-            self.is_spotify_running = any(
-                proc.info['name'].lower() == 'spotify.exe'
-                for proc in psutil.process_iter(['name'])
-            )
+            if error is not None:
+                raise error
+            self.is_spotify_running = self.spotify_source.running
 
             if not self.is_spotify_running:
                 self.status_label.setText("Spotify is not running")
@@ -677,7 +1130,7 @@ class MediaWidget(QMainWindow):
                 return
 
             if self.spotify and self.is_spotify_connected:
-                current = self.spotify.current_playback()
+                current = self.track_spotify_playback(state)
                 if current and current['is_playing']:
                     track = current['item']
                     if track:
@@ -687,13 +1140,12 @@ class MediaWidget(QMainWindow):
                         
                         # Only update if track info has changed
                         if current_info != self.last_track_info:
-                            self.status_label.setText("Now playing on Spotify")
-                            self.song_label.setText(self.truncate_text(song, 25))
-                            self.artist_label.setText(self.truncate_text(artist, 30))
-                            self.current_playback_state = current
+                            self._show_track(song, artist)
+                            self.state_store.update(current_playback_state=current, last_track_info=current_info)
                             self.play_button.setIcon(QIcon("icons/pause.png"))
-                            self.last_track_info = current_info
+                            self._log_skip_latency("poll")
                             logging.info(f"Now playing: {current_info}")
+                            self.prefetch_up_next()
                         return
                     else:
                         self.status_label.setText("No track playing")
@@ -710,93 +1162,229 @@ class MediaWidget(QMainWindow):
             
         self.update_button_states()
 
-    def truncate_text(self, text, max_length=30):
-        """Truncate text with ellipsis if it's too long"""
-        if len(text) > max_length:
-            return text[:max_length-3] + "..."
-        return text
+    def fetch_playback(self, spotify=None):
+        """Fetch the current playback state, with the client a worker already took if it passes one"""
+        fetcher = self.playback_fetcher
+        if fetcher:
+            return fetcher.current_playback()
+        return (spotify or self.spotify).current_playback()
+
+    def is_spotify_process_running(self):
+        """Check if the Spotify desktop app is running"""
+        # Battery saver trusts a recent positive scan; a missing Spotify is rechecked every poll
+        rescan = self.power_profile.process_rescan_seconds
+        if rescan and self.last_process_scan and time.monotonic() - self.last_process_scan < rescan:
+            return True
+        running = any(
+            proc.info['name'].lower() == 'spotify.exe'
+            for proc in psutil.process_iter(['name'])
+        )
+        self.last_process_scan = time.monotonic() if running else None
+        return running
+
+    def call_later(self, msec, callback):
+        """Run a callback once after a delay"""
+        QTimer.singleShot(msec, callback)
+
+    def _show_track(self, song, artist, player="Spotify"):
+        """Show a track in the song and artist labels"""
+        if not self.first_track_shown:
+            self.first_track_shown = True
+            launched = psutil.Process().create_time()
+            logging.info(f"Time to first track: {(time.time() - launched) * 1000:.0f} ms after launch")
+        self.status_label.setText(f"Now playing on {player}")
+        self.song_label.setText(song)
+        self.artist_label.setText(artist)
+
+    def prefetch_up_next(self):
+        """Fetch the queue once per track change, on a poll worker, and keep the next track ready"""
+        self.up_next = None
+        self.source_scheduler.run(self._fetch_queue, self.spotify, self.last_track_info)
+
+    def _fetch_queue(self, spotify, track_info):
+        try:
+            queue = spotify.queue() or {}
+        except Exception as e:
+            logging.error(f"Error fetching playback queue: {str(e)}")
+            return
+        self.queue_fetched.emit(track_info, queue)
+
+    def on_queue_fetched(self, track_info, queue):
+        """Keep the next track from a fetched queue"""
+        upcoming = queue.get('queue') or []
+        self.track_cache.add_tracks(upcoming)
+        # The track changed again while the queue was on its way, so its first entry isn't next anymore
+        if track_info != self.last_track_info:
+            return
+        if upcoming and upcoming[0] and upcoming[0].get('artists'):
+            track = upcoming[0]
+            self.up_next = (track['name'], track['artists'][0]['name'])
+
+    def show_up_next(self):
+        """Switch the UI to the prefetched next track right away"""
+        if not self.up_next:
+            return
+        song, artist = self.up_next
+        self.up_next = None
+        self._show_track(song, artist)
+        self.play_button.setIcon(QIcon("icons/pause.png"))
+        self.last_track_info = f"{song} - {artist}"
+        self._log_skip_latency("prefetch")
+
+    def _log_skip_latency(self, source):
+        """Log how long a skip took to show up in the UI"""
+        if self.skip_requested_at is None:
+            return
+        latency = (time.perf_counter() - self.skip_requested_at) * 1000
+        self.skip_requested_at = None
+        logging.info(f"Skip-to-UI latency ({source}): {latency:.0f} ms")
+
+    def record_listening(self, current):
+        """Track listening time and store the previous play when the track changes"""
+        track = current['item']
+        track_key = track.get('id') or track.get('uri') or track['name']
+        progress = current.get('progress_ms') or 0
+        play = self.current_play
+        if play and play['key'] == track_key and progress >= play['first_progress']:
+            play['last_progress'] = max(play['last_progress'], progress)
+            return
+        self.finish_current_play()
+        device = current.get('device') or {}
+        self.current_play = {
+            'key': track_key,
+            'track_id': track.get('id'),
+            'title': track['name'],
+            'artist': track['artists'][0]['name'],
+            'started_at': time.time(),
+            'first_progress': progress,
+            'last_progress': progress,
+            'device': device.get('name')
+        }
+
+    def finish_current_play(self):
+        """Write the current play to the listening history"""
+        play = self.current_play
+        self.current_play = None
+        if not play:
+            return
+        listened_ms = play['last_progress'] - play['first_progress']
+        if listened_ms >= 1000:
+            self.history_store.add_play(play['track_id'], play['title'], play['artist'],
+                                        play['started_at'], listened_ms, play['device'])
 
     def previous_track(self):
         """Send previous track command"""
+        source = self.shown_source()
+        if source:
+            self.run_source_command(source, 'previous_track')
+            return
+
         if not self.is_spotify_running:
             self.show_tooltip("Spotify is not running")
             return
 
         if self.spotify and self.is_spotify_connected:
-            try:
-                self.spotify.previous_track()
-                logging.info("Skipped to previous track")
-            except Exception as e:
-                logging.error(f"Error skipping to previous track: {str(e)}")
-                self.show_tooltip("Failed to skip track")
+            self.command_executor.execute('previous_track')
         else:
             self.send_media_key(win32con.VK_MEDIA_PREV_TRACK)
 
     def toggle_playback(self):
         """Toggle play/pause"""
+        source = self.shown_source()
+        if source:
+            state = self.source_scheduler.states.get(source.name)
+            self.run_source_command(source, 'pause' if state and state.is_playing else 'play')
+            return
+
         if not self.is_spotify_running:
             self.show_tooltip("Spotify is not running")
             return
 
         if self.spotify and self.is_spotify_connected:
-            try:
-                current = self.spotify.current_playback()
-                if current and current['is_playing']:
-                    self.spotify.pause_playback()
-                    self.play_button.setIcon(QIcon("icons/play.png"))
-                    logging.info("Playback paused")
-                else:
-                    self.spotify.start_playback()
-                    self.play_button.setIcon(QIcon("icons/pause.png"))
-                    logging.info("Playback started")
-            except Exception as e:
-                logging.error(f"Error toggling playback: {str(e)}")
-                self.show_tooltip("Failed to control playback")
+            engine = self.volume_engine
+            if engine.fade_ms and not engine.fading:
+                # Fade out before a pause, or start silent and fade in once the play went through
+                state = self.source_scheduler.states.get(self.spotify_source.name)
+                if state and state.is_playing:
+                    engine.fade_out(lambda: self.command_executor.execute('play_pause'))
+                    return
+                engine.silence()
+            self.command_executor.execute('play_pause')
         else:
             self.send_media_key(win32con.VK_MEDIA_PLAY_PAUSE)
-            # Toggle icon
-            if self.play_button.icon().pixmap(32, 32).toImage() == QIcon("icons/play.png").pixmap(32, 32).toImage():
-                self.play_button.setIcon(QIcon("icons/pause.png"))
-            else:
-                self.play_button.setIcon(QIcon("icons/play.png"))
+            self.toggle_play_icon()
+
+    def toggle_play_icon(self):
+        """Flip the play button icon when the new state isn't known"""
+        if self.play_button.icon().pixmap(32, 32).toImage() == QIcon("icons/play.png").pixmap(32, 32).toImage():
+            self.play_button.setIcon(QIcon("icons/pause.png"))
+        else:
+            self.play_button.setIcon(QIcon("icons/play.png"))
 
     def next_track(self):
         """Send next track command"""
+        source = self.shown_source()
+        if source:
+            self.run_source_command(source, 'next_track')
+            return
+
         if not self.is_spotify_running:
             self.show_tooltip("Spotify is not running")
             return
 
         if self.spotify and self.is_spotify_connected:
-            try:
-                self.spotify.next_track()
-                logging.info("Skipped to next track")
-            except Exception as e:
-                logging.error(f"Error skipping to next track: {str(e)}")
-                self.show_tooltip("Failed to skip track")
+            self.skip_requested_at = time.perf_counter()
+            self.command_executor.execute('next_track')
         else:
             self.send_media_key(win32con.VK_MEDIA_NEXT_TRACK)
 
+    def on_command_finished(self, outcome):
+        """Update the UI once a Spotify command went through the Web API or a media key"""
+        if outcome.command == 'play_pause':
+            self.volume_engine.end_fade(fade_in=outcome.winner is not None and outcome.result == 'play')
+        if outcome.winner is None:
+            if outcome.command == 'next_track':
+                self.skip_requested_at = None
+            self.show_tooltip(COMMAND_FAILED_MESSAGES[outcome.command])
+            return
+        if outcome.command == 'play_pause':
+            if outcome.result == 'pause':
+                self.play_button.setIcon(QIcon("icons/play.png"))
+            elif outcome.result == 'play':
+                self.play_button.setIcon(QIcon("icons/pause.png"))
+            else:
+                self.toggle_play_icon()
+        elif outcome.command == 'next_track':
+            self.show_up_next()
+            # Confirm the new track with a single poll instead of waiting for the timer
+            self.call_later(800, self.check_media_players)
+        elif outcome.command == 'start_playback':
+            self.check_media_players()
+
     def set_volume(self, value):
         """Set system volume"""
-        try:
-            from ctypes import cast, POINTER
-            from comtypes import CLSCTX_ALL
-            from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-            
-            devices = AudioUtilities.GetSpeakers()
-            interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-            volume = cast(interface, POINTER(IAudioEndpointVolume))
-            volume.SetMasterVolumeLevelScalar(value / 100.0, None)
-            logging.info(f"Volume set to {value}%")
-        except Exception as e:
-            logging.error(f"Error setting volume: {str(e)}")
-            self.show_tooltip("Failed to set volume")
+        self.volume_engine.set_target(value)
+
+    def change_volume(self, delta):
+        """Step the volume from a hotkey; repeated presses add up"""
+        self.volume_engine.nudge(delta, self.volume_slider.value())
+
+    def sync_volume_slider(self, value):
+        """Move the slider to the engine's target without sending it back"""
+        if self.volume_slider.value() != value:
+            self.volume_slider.blockSignals(True)
+            self.volume_slider.setValue(value)
+            self.volume_slider.blockSignals(False)
+
+    def press_media_key(self, key):
+        """Press and release a media key (raises on failure)"""
+        win32api.keybd_event(key, 0, 0, 0)  # Key down
+        win32api.keybd_event(key, 0, win32con.KEYEVENTF_KEYUP, 0)  # Key up
 
     def send_media_key(self, key):
         """Send media key command to Windows"""
         try:
-            win32api.keybd_event(key, 0, 0, 0)  # Key down
-            win32api.keybd_event(key, 0, win32con.KEYEVENTF_KEYUP, 0)  # Key up
+            self.press_media_key(key)
             logging.info(f"Sent media key: {key}")
         except Exception as e:
             logging.error(f"Error sending media key: {str(e)}")
@@ -817,44 +1405,128 @@ class MediaWidget(QMainWindow):
         self.oldPos = None
         self.drag_start_pos = None
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.first_paint_callback:
+            callback = self.first_paint_callback
+            self.first_paint_callback = None
+            callback()
+
     def closeEvent(self, event):
         """Handle window close event"""
         self.hotkey_manager.stop()  # Clean up hotkeys
+        self.volume_engine.stop()
+        self.lag_watchdog.stop()
+        self.power_manager.stop()
+        self.reachability.stop()
+        self.source_scheduler.shutdown()
+        self.command_executor.shutdown()
+        self.quick_search.shutdown()
+        self.state_snapshot.close()
+        self.track_cache.close()
+        if self.library_loader:
+            self.library_loader.shutdown()
+        if self.now_playing_publisher:
+            self.now_playing_publisher.stop()
         self.save_settings()
+        self.finish_current_play()
+        self.history_store.close()
+        if self.auth_listener:
+            self.auth_listener.stop()
+        if self.trace_recorder:
+            self.trace_recorder.close()
         event.accept()
 
     def show_account_menu(self):
         """Show account menu with disconnect option"""
-        menu = QMenu(self)
-        menu.setStyleSheet("""
-            QMenu {
-                background-color: #2D2D2D;
-                border: none;
-                border-radius: 8px;
-                padding: 5px;
-            }
-            QMenu::item {
-                color: white;
-                padding: 8px 20px;
-                border: none;
-                border-radius: 4px;
-            }
-            QMenu::item:selected {
-                background-color: rgba(255, 255, 255, 0.1);
-            }
-        """)
+        menu = self._populate_account_menu()
+        
+        # Show menu below the account button
+        menu.exec_(self.account_button.mapToGlobal(
+            QPoint(0, self.account_button.height())
+        ))
+
+    def _populate_account_menu(self):
+        """Fill the account menu, reusing the same menu on every open"""
+        if self.account_menu is not None:
+            self.account_menu.clear()
+            self.device_menu.clear()
+            self.power_menu.clear()
+            return self._fill_account_menu(self.account_menu)
         
+        menu = QMenu(self)
+        self.account_menu = menu
+        self.device_menu = QMenu("Devices", menu)
+        self.power_menu = QMenu("Power profile", menu)
+        menu.setObjectName('accountMenu')
+        return self._fill_account_menu(menu)
+
+    def _fill_account_menu(self, menu):
+        """Add the actions for the current connection state"""
+        history_action = menu.addAction("Listening history")
+        history_action.triggered.connect(self.show_history)
+        self._add_power_menu(menu)
+        light_action = menu.addAction("Light theme")
+        light_action.setCheckable(True)
+        light_action.setChecked(self.theme == 'light')
+        light_action.triggered.connect(lambda checked: self.set_theme('light' if checked else 'dark'))
         if self.is_spotify_connected:
+            library_action = menu.addAction("Library")
+            library_action.triggered.connect(self.show_library)
+            self._add_device_menu(menu)
             disconnect_action = menu.addAction("Disconnect Spotify")
             disconnect_action.triggered.connect(self.disconnect_spotify)
         else:
             connect_action = menu.addAction("Connect to Spotify")
             connect_action.triggered.connect(self.start_spotify_auth)
-        
-        # Show menu below the account button
-        menu.exec_(self.account_button.mapToGlobal(
-            QPoint(0, self.account_button.height())
-        ))
+        return menu
+
+    def _add_device_menu(self, menu):
+        """Add a submenu for switching the playback device"""
+        menu.addMenu(self.device_menu)
+        self.fill_device_menu(self.device_manager.devices)
+        if self.device_manager.is_stale():
+            # Show the cached list now; the fresh one replaces it through devices_changed
+            self.source_scheduler.run(self.device_manager.refresh)
+        menu.addSeparator()
+
+    def on_devices_changed(self, devices):
+        """Rebuild the device submenu from a fresh device list, even while it's open"""
+        if self.device_menu is not None and self.is_spotify_connected:
+            self.fill_device_menu(devices)
+
+    def fill_device_menu(self, devices):
+        """List the devices in the device submenu"""
+        device_menu = self.device_menu
+        device_menu.clear()
+        if not devices:
+            empty_action = device_menu.addAction("No devices found" if self.device_manager.fetched_at else "Loading devices...")
+            empty_action.setEnabled(False)
+        for device in devices:
+            action = device_menu.addAction(f"{device['name']} ({device['type']})")
+            action.setCheckable(True)
+            action.setChecked(device['id'] == self.device_manager.device_id)
+            action.triggered.connect(lambda checked, d=device: self.switch_device(d))
+        device_menu.addSeparator()
+        refresh_action = device_menu.addAction("Refresh devices")
+        refresh_action.triggered.connect(lambda: self.source_scheduler.run(self.device_manager.refresh))
+
+    def _add_power_menu(self, menu):
+        """Add a submenu for choosing the power profile mode"""
+        menu.addMenu(self.power_menu)
+        for mode, label in MODES.items():
+            action = self.power_menu.addAction(label)
+            action.setCheckable(True)
+            action.setChecked(mode == self.power_manager.mode)
+            action.triggered.connect(lambda checked, m=mode: self.set_power_mode(m))
+
+    def switch_device(self, device):
+        """Transfer playback to the selected device"""
+        # Without force_play Spotify keeps the current play/pause state
+        if self.device_manager.transfer(device['id'], force_play=False):
+            self.show_tooltip(f"Playing on {device['name']}")
+        else:
+            self.show_tooltip("Failed to switch device")
 
     def disconnect_spotify(self):
         """Disconnect from Spotify and clear cache"""
@@ -865,10 +1537,20 @@ class MediaWidget(QMainWindow):
                 os.remove(cache_path)
             
             # Reset state
-            self.is_spotify_connected = False
+            self.finish_current_play()
+            self.state_store.update(is_spotify_connected=False, current_playback_state=None, last_track_info=None)
             self.spotify = None
-            self.current_playback_state = None
-            self.last_track_info = None
+            self.playback_fetcher = None
+            self.access_token = None
+            self.track_cache.client = None
+            # The next login may be another account, with other devices
+            self.device_manager.reset(forget_last_device=True)
+            self.settings.remove('last_device_id')
+            if self.library_loader:
+                self.library_loader.cache.clear()
+            self.state_snapshot.clear()
+            self.stale_snapshot = None
+            self.up_next = None
             
             # Clear UI
             self.status_label.setText("Spotify disconnected")
@@ -890,16 +1572,113 @@ class MediaWidget(QMainWindow):
         self.hotkey_manager.play_pause_triggered.connect(self.toggle_playback)
         self.hotkey_manager.next_track_triggered.connect(self.next_track)
         self.hotkey_manager.prev_track_triggered.connect(self.previous_track)
-        self.hotkey_manager.volume_up_triggered.connect(lambda: self.set_volume(min(100, self.volume_slider.value() + 5)))
-        self.hotkey_manager.volume_down_triggered.connect(lambda: self.set_volume(max(0, self.volume_slider.value() - 5)))
+        self.hotkey_manager.volume_up_triggered.connect(lambda: self.change_volume(5))
+        self.hotkey_manager.volume_down_triggered.connect(lambda: self.change_volume(-5))
+        
+        if self.trace_recorder:
+            recorder = self.trace_recorder
+            self.hotkey_manager.play_pause_triggered.connect(lambda: recorder.record('hotkey', action='play_pause'))
+            self.hotkey_manager.next_track_triggered.connect(lambda: recorder.record('hotkey', action='next_track'))
+            self.hotkey_manager.prev_track_triggered.connect(lambda: recorder.record('hotkey', action='prev_track'))
+            self.hotkey_manager.volume_up_triggered.connect(lambda: recorder.record('hotkey', action='volume_up'))
+            self.hotkey_manager.volume_down_triggered.connect(lambda: recorder.record('hotkey', action='volume_down'))
+            self.prev_button.clicked.connect(lambda: recorder.record('click', button='prev'))
+            self.play_button.clicked.connect(lambda: recorder.record('click', button='play'))
+            self.next_button.clicked.connect(lambda: recorder.record('click', button='next'))
         
+    def show_history(self):
+        """Show the listening history dialog"""
+        self.history_store.flush()
+        dialog = HistoryDialog(self.history_store, self.track_cache, self)
+        dialog.exec_()
+
+    def show_library(self):
+        """Show the playlist and saved track browser"""
+        if self.library_loader is None:
+            cache = LibraryCache(os.path.join(appdata_path, 'library_cache.db'))
+            self.library_loader = LibraryLoader(LibraryClient(self.access_token, api_prefix), cache)
+            self.library_loader.scope_missing.connect(self.prompt_relogin)
+        self.library_loader.client.access_token = self.access_token
+        dialog = LibraryPanel(self.library_loader, self)
+        dialog.play_requested.connect(self.play_from_library)
+        dialog.exec_()
+
+    def play_from_library(self, collection, row, uri):
+        """Start playback at a track picked in the library panel"""
+        if collection.uri:
+            # Playing in the playlist's context keeps the rest of it queued
+            self.command_executor.execute('start_playback', context_uri=collection.uri, offset={'position': row})
+        elif uri:
+            self.command_executor.execute('start_playback', uris=[uri])
+
+    def search_spotify(self, query, limit):
+        """Run a track search with the Web API client (called on a search worker thread)"""
+        if not self.spotify:
+            raise RuntimeError("Not connected to Spotify")
+        return self.spotify.search(q=query, type='track', limit=limit, market='from_token')
+
+    def show_search_results(self, query, rows):
+        """Fill the results list if they belong to what is in the search box now"""
+        if query != normalize_query(self.search_box.text()):
+            return
+        self.search_results.clear()
+        if not query:
+            self.search_results.hide()
+            return
+        for uri, title, artist, duration_ms in rows:
+            if uri:
+                item = QListWidgetItem(f"{title} — {artist}")
+                item.setData(Qt.UserRole, uri)
+                self.search_results.addItem(item)
+        if not self.search_results.count():
+            item = QListWidgetItem("No results")
+            item.setFlags(Qt.NoItemFlags)
+            self.search_results.addItem(item)
+        self.search_results.setCurrentRow(0)
+        self.search_results.show()
+
+    def play_first_search_result(self):
+        """Play the selected result when Enter is pressed in the search box"""
+        item = self.search_results.currentItem()
+        if item is not None and self.search_results.isVisible():
+            self.play_search_result(item)
+
+    def play_search_result(self, item):
+        """Start playback of a search result and close the search"""
+        uri = item.data(Qt.UserRole)
+        if not uri or not self.spotify:
+            return
+        self.command_executor.execute('start_playback', uris=[uri])
+        self.search_box.clear()
+        self.quick_search.set_text('')
+
     def show_hotkey_settings(self):
         """Show the hotkey settings dialog"""
         dialog = HotkeySettingsDialog(self.hotkey_manager, self)
         dialog.exec_()
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    widget = MediaWidget()
+    parser = argparse.ArgumentParser(description="Spotify Media Widget")
+    parser.add_argument('--record-trace', metavar='PATH', help="Record playback responses and input events to a trace file")
+    parser.add_argument('--profile', metavar='SECONDS', type=float, nargs='?', const=60,
+                        help="Profile the GUI thread for a number of seconds and write a report to the AppData folder")
+    parser.add_argument('--measure-startup', metavar='PATH',
+                        help="Write the time of the first paint to a file and exit (used by build.py)")
+    args, qt_args = parser.parse_known_args()
+    
+    app = QApplication(sys.argv[:1] + qt_args)
+    if args.profile:
+        profiler = StartupProfiler(args.profile, appdata_path)
+        profiler.start()
+        app.aboutToQuit.connect(profiler.stop)
+    trace_recorder = TraceRecorder(args.record_trace) if args.record_trace else None
+    # A measured run is a throwaway launch of a build; it mustn't point the Run key at it
+    widget = MediaWidget(trace_recorder, system_hooks=not args.measure_startup)
+    if args.measure_startup:
+        def record_first_paint():
+            with open(args.measure_startup, 'w') as f:
+                f.write(repr(time.time()))
+            QTimer.singleShot(0, widget.close)
+        widget.first_paint_callback = record_first_paint
     widget.show()
-    sys.exit(app.exec_()) 
\ No newline at end of file
+    sys.exit(app.exec_())
@@ -0,0 +1,181 @@
+import argparse
+import socketserver
+import threading
+import time
+
+# Local stand-in for an MPD server, speaking the parts of the protocol MpdSource uses.
+# Point the widget at it with the mpd_host/mpd_port settings.
+
+
+class MpdStubState:
+    def __init__(self, song_count=20, password=None):
+        self.lock = threading.Lock()
+        self.songs = [
+            {
+                'file': f"music/stub_artist_{i % 5}/stub_song_{i}.flac",
+                'Title': f"MPD Song {i}",
+                'Artist': f"MPD Artist {i % 5}",
+                'Album': f"MPD Album {i % 3}",
+                'duration': f"{200 + i:.3f}"
+            }
+            for i in range(song_count)
+        ]
+        self.password = password
+        self.position = 0
+        self.state = 'stop'
+        self.elapsed = 0.0
+        self.started_at = None
+        self.latency = 0.0
+        self.command_counts = {}
+
+    def current_elapsed(self):
+        """Return the playback position in seconds"""
+        if self.state == 'play' and self.started_at is not None:
+            return self.elapsed + time.time() - self.started_at
+        return self.elapsed
+
+    def set_state(self, state):
+        """Switch between play, pause and stop"""
+        self.elapsed = self.current_elapsed() if state != 'stop' else 0.0
+        self.state = state
+        self.started_at = time.time() if state == 'play' else None
+
+    def skip(self, step):
+        """Move to another song in the playlist"""
+        self.position = (self.position + step) % len(self.songs)
+        self.elapsed = 0.0
+        self.started_at = time.time() if self.state == 'play' else None
+
+    def status(self):
+        lines = [('volume', '50'), ('playlistlength', str(len(self.songs))), ('state', self.state)]
+        if self.state != 'stop':
+            song = self.songs[self.position]
+            lines += [('song', str(self.position)), ('elapsed', f"{self.current_elapsed():.3f}"),
+                      ('duration', song['duration'])]
+        return lines
+
+    def current_song(self):
+        if self.state == 'stop':
+            return []
+        return list(self.songs[self.position].items()) + [('Pos', str(self.position))]
+
+
+class MpdStubHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        state = self.server.state
+        self.authorized = state.password is None
+        self.wfile.write(b"OK MPD 0.23.5\n")
+        command_list = None
+        for raw in self.rfile:
+            line = raw.decode('utf-8').rstrip('\n')
+            if line in ('command_list_begin', 'command_list_ok_begin'):
+                command_list = []
+                list_ok = line == 'command_list_ok_begin'
+                continue
+            if command_list is not None and line != 'command_list_end':
+                command_list.append(line)
+                continue
+            commands = command_list if command_list is not None else [line]
+            command_list = None
+            if state.latency:
+                time.sleep(state.latency)
+            reply = []
+            for index, command in enumerate(commands):
+                try:
+                    reply += [f"{key}: {value}" for key, value in self._run(command)]
+                except ValueError as e:
+                    reply.append(f"ACK [5@{index}] {{{command.split(' ')[0]}}} {e}")
+                    break
+                if len(commands) > 1 and list_ok:
+                    reply.append('list_OK')
+            else:
+                reply.append('OK')
+            self.wfile.write(('\n'.join(reply) + '\n').encode('utf-8'))
+            if line == 'close':
+                return
+
+    def _run(self, command):
+        state = self.server.state
+        name, _, arg = command.partition(' ')
+        if arg.startswith('"') and arg.endswith('"'):
+            arg = arg[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+        with state.lock:
+            state.command_counts[name] = state.command_counts.get(name, 0) + 1
+            if name == 'password':
+                if arg != state.password:
+                    raise ValueError("incorrect password")
+                self.authorized = True
+                return []
+            if not self.authorized:
+                raise ValueError("you don't have permission")
+            if name == 'status':
+                return state.status()
+            if name == 'currentsong':
+                return state.current_song()
+            if name == 'play':
+                state.set_state('play')
+            elif name == 'pause':
+                if not arg:
+                    arg = '1' if state.state == 'play' else '0'
+                state.set_state('pause' if arg == '1' else 'play')
+            elif name == 'stop':
+                state.set_state('stop')
+            elif name == 'next':
+                state.skip(1)
+            elif name == 'previous':
+                state.skip(-1)
+            elif name not in ('ping', 'close'):
+                raise ValueError("unknown command")
+            return []
+
+
+class MpdStubServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, state=None):
+        super().__init__(('127.0.0.1', port), MpdStubHandler)
+        self.state = state or MpdStubState()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """Serve connections on a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the port"""
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local MPD protocol stub")
+    parser.add_argument('--port', type=int, default=6600)
+    parser.add_argument('--songs', type=int, default=20)
+    parser.add_argument('--password')
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds to delay every response")
+    parser.add_argument('--play', action='store_true', help="Start in the playing state")
+    args = parser.parse_args()
+
+    state = MpdStubState(song_count=args.songs, password=args.password)
+    state.latency = args.latency
+    if args.play:
+        state.set_state('play')
+    server = MpdStubServer(args.port, state)
+    print(f"MPD stub listening on 127.0.0.1:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds between keep-alive comments on idle event streams
+KEEPALIVE_SECONDS = 15
+
+# Host headers the server answers to; anything else is a DNS-rebound web page
+LOCAL_HOSTS = ('127.0.0.1', 'localhost', '')
+
+
+def now_playing_payload(source, player, state):
+    """Build the published now-playing object from a source's PlaybackState"""
+    return {
+        'source': source,
+        'player': player,
+        'title': state.title if state else None,
+        'artist': state.artist if state else None,
+        'is_playing': bool(state and state.is_playing),
+        'progress_ms': state.progress_ms if state else None,
+        'duration_ms': state.duration_ms if state else None,
+        'updated_at': time.time()
+    }
+
+
+def _changed_fields(payload):
+    # Progress moves on every poll; consumers interpolate it, so it alone is not a change
+    return (payload['source'], payload['title'], payload['artist'], payload['is_playing'])
+
+
+def replace_file(path, data):
+    """Write a file atomically, retrying while a reader holds the old one open"""
+    # A unique name next to the target, so concurrent writers never rename each other's half-written file
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(path),
+                                     prefix=os.path.basename(path) + '.', suffix='.tmp', delete=False) as f:
+        f.write(data)
+    try:
+        for attempt in range(5):
+            try:
+                os.replace(f.name, path)
+                return
+            except PermissionError:
+                if attempt == 4:
+                    raise
+                time.sleep(0.05)
+    except OSError:
+        try:
+            os.remove(f.name)
+        except OSError:
+            pass
+        raise
+
+
+class _NowPlayingHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logging.debug("Now playing server: " + format % args)
+
+    def _send(self, status, content_type, body, origin=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self._send_cors(origin)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_cors(self, origin):
+        if origin is not None:
+            self.send_header('Access-Control-Allow-Origin', origin)
+            self.send_header('Vary', 'Origin')
+
+    def _allowed(self, publisher):
+        """Whether a request may read the state: local tools send no Origin, web pages need to be allowed"""
+        host = (self.headers.get('Host') or '').rsplit(':', 1)[0]
+        origin = self.headers.get('Origin')
+        return host in LOCAL_HOSTS and (origin is None or origin in publisher.allowed_origins)
+
+    def do_GET(self):
+        publisher = self.server.publisher
+        if not self._allowed(publisher):
+            # Otherwise any page open in a browser could read what the user is listening to
+            self._send(403, 'text/plain', b"Forbidden")
+            return
+        origin = self.headers.get('Origin')
+        path = self.path.split('?')[0]
+        if path == '/events':
+            self._stream(publisher, origin)
+            return
+        version, payload = publisher.snapshot()
+        if path == '/now-playing':
+            self._send(200, 'application/json', json.dumps(payload).encode('utf-8'), origin)
+        elif path == '/now-playing.txt':
+            self._send(200, 'text/plain; charset=utf-8', publisher.format_text(payload).encode('utf-8'), origin)
+        else:
+            self._send(404, 'text/plain', b"Not found", origin)
+
+    def _stream(self, publisher, origin):
+        """Server-sent events: the current state right away, then every change"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self._send_cors(origin)
+        self.end_headers()
+        seen = -1
+        try:
+            while True:
+                # Each stream waits on its own thread, so a slow reader only delays itself
+                version, payload = publisher.wait_for_change(seen, KEEPALIVE_SECONDS)
+                if publisher.closed:
+                    return
+                if version == seen:
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    seen = version
+                    self.wfile.write(f"id: {version}\ndata: {json.dumps(payload)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            pass
+
+
+class _NowPlayingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Overlays and bots tend to reconnect together when the widget starts
+    request_queue_size = 128
+
+
+class NowPlayingPublisher:
+    def __init__(self, output_dir, port=8974, allowed_origins=()):
+        self.json_path = os.path.join(output_dir, 'now_playing.json')
+        self.text_path = os.path.join(output_dir, 'now_playing.txt')
+        self.port = port
+        # Web page origins (like https://overlay.example or null for a local file) that may read the server
+        self.allowed_origins = frozenset(allowed_origins)
+        self.condition = threading.Condition()
+        self.version = 0
+        self.payload = now_playing_payload(None, None, None)
+        self.closed = False
+        self._last_fields = None
+        self._pending = None
+        self._wake = threading.Event()
+        self._server = None
+
+    def start(self):
+        """Start the file writer and the localhost event stream"""
+        if self.port is not None:
+            self._server = _NowPlayingServer(('127.0.0.1', self.port), _NowPlayingHandler)
+            self._server.publisher = self
+            threading.Thread(target=self._server.serve_forever, name='NowPlayingServer', daemon=True).start()
+            logging.info(f"Publishing now playing on http://127.0.0.1:{self._server.server_address[1]}/events")
+        threading.Thread(target=self._dispatch, name='NowPlayingDispatcher', daemon=True).start()
+        return self
+
+    @property
+    def server_port(self):
+        return self._server.server_address[1] if self._server else None
+
+    def publish(self, payload):
+        """Hand a new state to the dispatcher if it changed; never waits on subscribers or disk"""
+        fields = _changed_fields(payload)
+        if fields == self._last_fields:
+            return False
+        self._last_fields = fields
+        self._pending = payload
+        self._wake.set()
+        return True
+
+    def snapshot(self):
+        with self.condition:
+            return self.version, self.payload
+
+    def wait_for_change(self, seen, timeout):
+        """Block until a version newer than seen is published, the timeout passes or the publisher closes"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != seen or self.closed, timeout)
+            return self.version, self.payload
+
+    @staticmethod
+    def format_text(payload):
+        if not payload['title']:
+            return ''
+        return f"{payload['title']} - {payload['artist']}"
+
+    def _dispatch(self):
+        # Waking every stream and writing the files happens here, off the poll path
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self.closed:
+                return
+            payload = self._pending
+            with self.condition:
+                self.version += 1
+                self.payload = payload
+                self.condition.notify_all()
+            try:
+                replace_file(self.json_path, json.dumps(payload, indent=2))
+                replace_file(self.text_path, self.format_text(payload))
+            except OSError as e:
+                logging.error(f"Error writing now playing files: {str(e)}")
+
+    def stop(self):
+        """Stop the writer, close every event stream and release the port"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self._wake.set()
+        server = self._server
+        self._server = None
+        if server:
+            threading.Thread(target=lambda: (server.shutdown(), server.server_close()), daemon=True).start()
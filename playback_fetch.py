@@ -0,0 +1,95 @@
+import json
+import logging
+import time
+import requests
+from spotipy.exceptions import SpotifyException
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_API_PREFIX = 'https://api.spotify.com/v1/'
+
+
+def decode_json(content):
+    """Decode a JSON body, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def parse_playback(content, decode=decode_json):
+    """Keep only the playback fields the widget reads"""
+    data = decode(content)
+    item = data.get('item')
+    if item:
+        artists = item.get('artists') or []
+        album = item.get('album') or {}
+        images = album.get('images') or []
+        item = {
+            'id': item.get('id'),
+            'uri': item.get('uri'),
+            'name': item.get('name'),
+            'duration_ms': item.get('duration_ms'),
+            'artists': [{'name': artists[0].get('name')}] if artists else [{'name': ''}],
+            # Just the smallest cover, for the startup snapshot and the track cache
+            'album': {'name': album.get('name'), 'images': images[-1:]}
+        }
+    return {
+        'is_playing': data.get('is_playing', False),
+        'progress_ms': data.get('progress_ms'),
+        'currently_playing_type': data.get('currently_playing_type'),
+        'item': item
+    }
+
+
+def is_scope_error(error):
+    """Return whether an API error means the token wasn't granted a scope the call needs"""
+    return (isinstance(error, SpotifyException) and error.http_status == 403
+            and 'insufficient client scope' in str(error.msg).lower())
+
+
+def api_error(response):
+    """Build the SpotifyException spotipy would raise for an error response"""
+    try:
+        error = decode_json(response.content).get('error', {})
+    except ValueError:
+        error = {}
+    return SpotifyException(response.status_code, -1, f"{response.url}:\n {error.get('message') or response.text}",
+                            reason=error.get('reason'), headers=response.headers)
+
+
+class LeanPlaybackFetcher:
+    def __init__(self, access_token, api_prefix=None, market='from_token', timeout=5, decode=decode_json, session=None):
+        self.access_token = access_token
+        self.decode = decode
+        self.api_prefix = api_prefix or DEFAULT_API_PREFIX
+        self.market = market
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.polls = 0
+        self.bytes_received = 0
+        self.parse_seconds = 0.0
+
+    def current_playback(self):
+        """Fetch the currently playing track with the smallest payload the API offers"""
+        response = self.session.get(
+            f"{self.api_prefix}me/player/currently-playing",
+            params={'market': self.market},
+            headers={'Authorization': f"Bearer {self.access_token}"},
+            timeout=self.timeout
+        )
+        self.polls += 1
+        self.bytes_received += len(response.content)
+        if response.status_code == 204 or not response.content:
+            return None
+        if response.status_code >= 400:
+            raise api_error(response)
+        started = time.perf_counter()
+        playback = parse_playback(response.content, self.decode)
+        self.parse_seconds += time.perf_counter() - started
+        if self.polls % 500 == 0:
+            logging.info(f"Lean playback fetch: {self.bytes_received / self.polls:.0f} bytes and "
+                         f"{self.parse_seconds / self.polls * 1000:.3f} ms parse per poll")
+        return playback
@@ -0,0 +1,299 @@
+import argparse
+import bisect
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from spotipy.exceptions import SpotifyException
+
+# Fields that change on every poll without the playback state really changing
+VOLATILE_FIELDS = ('progress_ms', 'timestamp')
+
+# Widget handlers replayed for recorded hotkey and button events
+HOTKEY_HANDLERS = {
+    'play_pause': 'toggle_playback',
+    'next_track': 'next_track',
+    'prev_track': 'previous_track',
+}
+BUTTON_HANDLERS = {
+    'prev': 'previous_track',
+    'play': 'toggle_playback',
+    'next': 'next_track',
+}
+
+
+def compact_result(value):
+    """Drop bulky fields the widget never reads from a response"""
+    if isinstance(value, dict):
+        return {k: compact_result(v) for k, v in value.items() if k != 'available_markets'}
+    if isinstance(value, list):
+        return [compact_result(v) for v in value]
+    return value
+
+
+def _stable_part(result):
+    if isinstance(result, dict):
+        return {k: v for k, v in result.items() if k not in VOLATILE_FIELDS}
+    return result
+
+
+class TraceRecorder:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'w', encoding='utf-8')
+        self.start = time.monotonic()
+        self.lock = threading.RLock()
+        self.last_results = {}
+        logging.info(f"Recording playback trace to {path}")
+
+    def record(self, kind, **data):
+        """Append one event to the trace"""
+        with self.lock:
+            if self.file is None:
+                return
+            event = {'t': round(time.monotonic() - self.start, 3), 'kind': kind}
+            event.update(data)
+            self.file.write(json.dumps(event, separators=(',', ':')) + '\n')
+            self.file.flush()
+
+    def record_call(self, method, kwargs, result=None, error=None):
+        """Record an API call, writing only what changed since the last one"""
+        # Polls run on a worker thread while commands run on the GUI thread
+        with self.lock:
+            self._record_call(method, kwargs, result, error)
+
+    def _record_call(self, method, kwargs, result, error):
+        if error is not None:
+            self.record('call', method=method, kwargs=kwargs, error={
+                'status': getattr(error, 'http_status', None),
+                'reason': getattr(error, 'reason', None),
+                'message': str(error)
+            })
+            self.last_results.pop(method, None)
+            return
+        result = compact_result(result)
+        stable = _stable_part(result)
+        if method in self.last_results and self.last_results[method] == stable:
+            if isinstance(result, dict) and 'progress_ms' in result:
+                self.record('progress', method=method, progress_ms=result['progress_ms'])
+            return
+        self.last_results[method] = stable
+        self.record('call', method=method, kwargs=kwargs, result=result)
+
+    def wrap(self, client):
+        """Wrap a Spotify client so its calls are recorded"""
+        return RecordingClient(client, self)
+
+    def close(self):
+        """Close the trace file"""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class RecordingClient:
+    def __init__(self, client, recorder):
+        self._client = client
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+
+        def call(*args, **kwargs):
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                self._recorder.record_call(name, kwargs, error=e)
+                raise
+            self._recorder.record_call(name, kwargs, result=result)
+            return result
+        return call
+
+
+def load_trace(path):
+    """Load trace events from a JSON lines file"""
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                events.append(json.loads(line))
+    return events
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+        self._queue = []
+        self._seq = 0
+
+    def call_later(self, msec, callback):
+        """Schedule a callback at a virtual time"""
+        self._seq += 1
+        heapq.heappush(self._queue, (self.now + msec / 1000.0, self._seq, callback))
+
+    def run_until(self, end):
+        """Run scheduled callbacks in time order up to the end time"""
+        while self._queue and self._queue[0][0] <= end:
+            when, _, callback = heapq.heappop(self._queue)
+            self.now = max(self.now, when)
+            callback()
+        self.now = max(self.now, end)
+
+
+class ReplayClient:
+    def __init__(self, events, clock):
+        self.clock = clock
+        self.responses = {}
+        current = {}
+        for event in events:
+            if event['kind'] == 'call':
+                entry = [event['t'], event.get('result'), event.get('error')]
+                self.responses.setdefault(event['method'], []).append(entry)
+                current[event['method']] = entry
+            elif event['kind'] == 'progress' and event['method'] in current:
+                entry = current[event['method']]
+                if isinstance(entry[1], dict):
+                    result = dict(entry[1], progress_ms=event['progress_ms'])
+                    entry = [event['t'], result, None]
+                    self.responses[event['method']].append(entry)
+                    current[event['method']] = entry
+        self._times = {m: [r[0] for r in rs] for m, rs in self.responses.items()}
+        self.call_counts = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            self.call_counts[name] = self.call_counts.get(name, 0) + 1
+            return self._respond(name)
+        return call
+
+    def _respond(self, method):
+        """Return the recorded response in effect at the current virtual time"""
+        entries = self.responses.get(method)
+        if not entries:
+            return None
+        index = bisect.bisect_right(self._times[method], self.clock.now) - 1
+        _, result, error = entries[max(index, 0)]
+        if error:
+            raise SpotifyException(error.get('status') or 500, -1, error.get('message'), reason=error.get('reason'))
+        return result
+
+
+class TraceReplayer:
+    def __init__(self, events, poll_interval=2000):
+        self.events = events
+        self.poll_interval = poll_interval
+        self.clock = VirtualClock()
+        self.poll_times = []
+        self.duration = events[-1]['t'] if events else 0.0
+
+    def replay(self, widget, speed=0):
+        """Replay the trace against a widget, optionally paced at a speed factor"""
+        widget.timer.stop()
+        widget.idle_timer.stop()
+        widget.spotify = ReplayClient(self.events, self.clock)
+        widget.playback_fetcher = None
+        widget.is_spotify_connected = True
+        widget.is_spotify_process_running = lambda: True
+        widget.call_later = self.clock.call_later
+        widget.source_scheduler.run_inline()
+        widget.command_executor.run_inline()
+        # The media key fallback must not press real keys while replaying
+        widget.command_executor.fallback.press_key = lambda key: None
+
+        for event in self.events:
+            handler = None
+            if event['kind'] == 'hotkey':
+                handler = HOTKEY_HANDLERS.get(event['action'])
+            elif event['kind'] == 'click':
+                handler = BUTTON_HANDLERS.get(event['button'])
+            if handler:
+                self._schedule_at(event['t'], getattr(widget, handler))
+        self._schedule_poll(widget)
+
+        step = 0.1
+        started = time.monotonic()
+        while self.clock.now < self.duration:
+            self.clock.run_until(min(self.clock.now + step, self.duration))
+            if speed:
+                delay = started + self.clock.now / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            process_events = getattr(widget, 'process_events', None)
+            if process_events:
+                process_events()
+        return self.report(widget.spotify)
+
+    def _schedule_at(self, t, callback):
+        self.clock.call_later(max(0.0, t - self.clock.now) * 1000, callback)
+
+    def _schedule_poll(self, widget):
+        def poll():
+            started = time.perf_counter()
+            widget.check_media_players()
+            self.poll_times.append(time.perf_counter() - started)
+            widget.check_idle_state()
+            self.clock.call_later(widget.timer.interval() or self.poll_interval, poll)
+        self.clock.call_later(0, poll)
+
+    def report(self, client):
+        """Summarize the replay"""
+        times = sorted(self.poll_times)
+        if not times:
+            return {'polls': 0}
+        return {
+            'virtual_seconds': round(self.duration, 1),
+            'polls': len(times),
+            'poll_mean_ms': round(sum(times) / len(times) * 1000, 3),
+            'poll_p95_ms': round(times[min(len(times) - 1, int(len(times) * 0.95))] * 1000, 3),
+            'poll_max_ms': round(times[-1] * 1000, 3),
+            'api_calls': dict(client.call_counts)
+        }
+
+
+def import_isolated_widget(appdata):
+    """Import media_widget with its data under appdata, without the keyboard hook or the Windows Run key
+
+    For harnesses that build a real MediaWidget: history.db, last_state.json, track_cache.json and the
+    token cache go to the temporary folder instead of the user's, and the user's hotkeys and startup
+    entry are left alone.
+    """
+    # media_widget reads APPDATA when it's imported
+    os.environ['APPDATA'] = appdata
+    import media_widget
+    media_widget.MediaWidget.set_startup_with_windows = lambda self: None
+    media_widget.HotkeyManager.start = lambda self: None
+    return media_widget
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded playback trace against the widget")
+    parser.add_argument('trace', help="Trace file written with --record-trace")
+    parser.add_argument('--speed', type=float, default=0, help="Virtual seconds per real second (0 = as fast as possible)")
+    args = parser.parse_args()
+
+    import tempfile
+    from PyQt5.QtWidgets import QApplication
+
+    trace = load_trace(args.trace)
+    app = QApplication(['replay'])
+    with tempfile.TemporaryDirectory() as appdata:
+        media_widget = import_isolated_widget(appdata)
+        widget = media_widget.MediaWidget()
+        widget.process_events = app.processEvents
+        report = TraceReplayer(trace).replay(widget, speed=args.speed)
+        widget.close()
+        logging.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
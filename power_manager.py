@@ -0,0 +1,76 @@
+import logging
+from collections import namedtuple
+import psutil
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+# Poll intervals in milliseconds; process_rescan_seconds=0 checks for Spotify on every poll;
+# lag_watchdog runs the 250 ms drift timer and its monitor thread
+PowerProfile = namedtuple('PowerProfile',
+                          'name label active_interval idle_interval animations process_rescan_seconds lag_watchdog')
+
+PERFORMANCE = PowerProfile('performance', "Performance", 2000, 5000, True, 0, True)
+BATTERY_SAVER = PowerProfile('saver', "Battery saver", 6000, 15000, False, 60, False)
+PROFILES = {profile.name: profile for profile in (PERFORMANCE, BATTERY_SAVER)}
+
+# Values of the power_profile setting and their menu labels
+MODES = {'auto': "Automatic", 'performance': "Performance", 'saver': "Battery saver"}
+
+
+def decide_profile(battery, mode='auto', previous=None):
+    """Pick a profile from a battery reading (psutil.sensors_battery() or None) and the user's mode"""
+    if mode in PROFILES:
+        return PROFILES[mode]
+    if battery is None:
+        # No battery, so this is a desktop
+        return PERFORMANCE
+    if battery.power_plugged is None:
+        # Some drivers can't tell; don't flip-flop on a missing reading
+        return previous or PERFORMANCE
+    return PERFORMANCE if battery.power_plugged else BATTERY_SAVER
+
+
+def poll_interval(profile, idle):
+    """Return the poll interval for a profile while playing or idle"""
+    return profile.idle_interval if idle else profile.active_interval
+
+
+class PowerManager(QObject):
+    profile_changed = pyqtSignal(object)
+
+    def __init__(self, mode='auto', read_battery=psutil.sensors_battery, check_interval=30000):
+        super().__init__()
+        self.mode = mode if mode in MODES else 'auto'
+        self.read_battery = read_battery
+        self.profile = None
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.check)
+        self.check_interval = check_interval
+
+    def start(self):
+        """Pick the initial profile and keep watching the power source"""
+        self.check()
+        self.timer.start(self.check_interval)
+        return self
+
+    def stop(self):
+        self.timer.stop()
+
+    def set_mode(self, mode):
+        """Switch between automatic and a fixed profile"""
+        self.mode = mode
+        self.check()
+
+    def check(self):
+        """Read the battery and switch profiles if the power source changed"""
+        try:
+            battery = self.read_battery()
+        except Exception as e:
+            logging.error(f"Error reading battery status: {str(e)}")
+            battery = None
+        profile = decide_profile(battery, self.mode, self.profile)
+        if profile != self.profile:
+            self.profile = profile
+            logging.info(f"Power profile: {profile.label} (mode {self.mode})")
+            self.profile_changed.emit(profile)
+        return profile
+
@@ -0,0 +1,138 @@
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from library_panel import compact_rows
+
+# The API returns at most 50 tracks per search; asking for all of them makes more results complete
+SEARCH_LIMIT = 50
+
+
+def normalize_query(text):
+    """Casefold and collapse whitespace, so 'Midnight  River' and 'midnight river' share a cache entry"""
+    return ' '.join(text.casefold().split())
+
+
+def row_matches(words, row):
+    """Whether every query word starts a word of the row's title or artist"""
+    row_words = f"{row[1]} {row[2]}".casefold().split()
+    return all(any(word.startswith(w) for word in row_words) for w in words)
+
+
+class SearchCache:
+    """LRU of search results keyed by normalized query"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def put(self, query, rows, total):
+        if self.max_entries <= 0:
+            return
+        self.entries[query] = (rows, total)
+        self.entries.move_to_end(query)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def answer(self, query):
+        """Return rows for a query from the cache, or None when it has to go to the API"""
+        if query in self.entries:
+            self.entries.move_to_end(query)
+            return self.entries[query][0]
+        # Typing on from a query whose results were complete can only narrow them down
+        words = query.split()
+        best = None
+        for cached, (rows, total) in self.entries.items():
+            if total <= len(rows) and query.startswith(cached) and (best is None or len(cached) > len(best)):
+                best = cached
+        if best is None:
+            return None
+        self.entries.move_to_end(best)
+        rows = [row for row in self.entries[best][0] if row_matches(words, row)]
+        self.put(query, rows, len(rows))
+        return rows
+
+
+class QuickSearch(QObject):
+    # Emitted on the GUI thread with the query the rows belong to
+    results_ready = pyqtSignal(str, object)
+    search_failed = pyqtSignal(str, str)
+    # Internal: the worker hands (generation, query, rows, total, error) back through a queued signal
+    _finished = pyqtSignal(int, str, object, int, object)
+
+    def __init__(self, search_fn, debounce_ms=250, cache_size=64):
+        super().__init__()
+        # search_fn(query, limit) returns the Web API search response; it runs on a worker thread
+        self.search_fn = search_fn
+        self.cache = SearchCache(cache_size)
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='Search')
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self._start_search)
+        self.query = ''
+        self.generation = 0
+        self.requests = 0
+        self.local_answers = 0
+        self.superseded = 0
+        self._finished.connect(self._on_finished)
+
+    def set_text(self, text):
+        """Called on every keystroke; the search starts once typing pauses"""
+        query = normalize_query(text)
+        if query == self.query:
+            return
+        self.query = query
+        # Anything started for an older query is now stale
+        self.generation += 1
+        if not query:
+            self.timer.stop()
+            self.results_ready.emit('', [])
+            return
+        # Answers from the cache cost nothing, so they don't wait for typing to pause
+        if not self._answer_locally(query):
+            self.timer.start()
+
+    def _answer_locally(self, query):
+        rows = self.cache.answer(query)
+        if rows is None:
+            return False
+        self.timer.stop()
+        self.local_answers += 1
+        self.results_ready.emit(query, rows)
+        return True
+
+    def _start_search(self):
+        # A late response may have filled the cache since the last keystroke
+        if not self._answer_locally(self.query):
+            self.executor.submit(self._run_search, self.generation, self.query)
+
+    def _run_search(self, generation, query):
+        if generation != self.generation:
+            # Superseded while it waited for a worker; don't spend a request on it
+            self.superseded += 1
+            return
+        self.requests += 1
+        try:
+            tracks = self.search_fn(query, SEARCH_LIMIT)['tracks']
+            rows, total, error = compact_rows({'track': track} for track in tracks['items']), tracks['total'], None
+        except Exception as e:
+            rows, total, error = None, 0, e
+        self._finished.emit(generation, query, rows, total, error)
+
+    def _on_finished(self, generation, query, rows, total, error):
+        if error is not None:
+            logging.error(f"Error searching for '{query}': {str(error)}")
+            if generation == self.generation:
+                self.search_failed.emit(query, str(error))
+            return
+        # Late results still go in the cache; only the current query's results are shown
+        self.cache.put(query, rows, total)
+        if generation == self.generation:
+            self.results_ready.emit(query, rows)
+        else:
+            self.superseded += 1
+
+    def shutdown(self):
+        self.timer.stop()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,139 @@
+import logging
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import psutil
+import requests
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from spotipy.exceptions import SpotifyException
+
+# What a failed request says about the connection
+OFFLINE = 'offline'
+AUTH = 'auth'
+SERVER = 'server'
+OTHER = 'other'
+
+
+def classify_error(error):
+    """Sort a failed API call into offline, auth, server or other"""
+    if isinstance(error, SpotifyException):
+        if error.http_status == 401:
+            return AUTH
+        # spotipy reports exhausted retries on 5xx answers as 429
+        if error.http_status == 429 or error.http_status >= 500:
+            return SERVER
+        return OTHER
+    # Refused, reset, unreachable, DNS failures and timeouts all mean the API can't be reached
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return OFFLINE
+    # Every requests exception is an OSError, but a bad or undecodable response came over a working network
+    if isinstance(error, OSError) and not isinstance(error, requests.exceptions.RequestException):
+        return OFFLINE
+    return OTHER
+
+
+def interfaces_up(stats=None):
+    """Return whether any network interface besides loopback is up"""
+    try:
+        stats = psutil.net_if_stats() if stats is None else stats
+    except Exception as e:
+        logging.error(f"Error reading network interfaces: {str(e)}")
+        # Can't tell, so let the probe decide
+        return True
+    return any(stat.isup and not name.lower().startswith(('lo', 'loopback')) for name, stat in stats.items())
+
+
+def probe_address(api_prefix):
+    """The (host, port) a probe connects to for an API prefix"""
+    url = urlparse(api_prefix)
+    return url.hostname, url.port or (443 if url.scheme == 'https' else 80)
+
+
+class ReachabilityMonitor(QObject):
+    """Parks API polling while the network is down, probing cheaply with backoff until it's back"""
+    went_offline = pyqtSignal()
+    back_online = pyqtSignal()
+    # Internal: the probe worker hands its result back through a queued signal
+    _probe_finished = pyqtSignal(bool)
+
+    def __init__(self, address, first_delay=2000, max_delay=60000, timeout=3, check_interfaces=None):
+        super().__init__()
+        self.address = address
+        self.first_delay = first_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        # A loopback address (the stub) doesn't need a network interface
+        self.check_interfaces = (address[0] not in ('127.0.0.1', 'localhost', '::1')
+                                 if check_interfaces is None else check_interfaces)
+        self.offline = False
+        self.delay = first_delay
+        self.probes = 0
+        self.offline_since = None
+        self._probing = False
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.check)
+        self._probe_finished.connect(self._on_probe_finished)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='Reachability')
+
+    def report_error(self, error):
+        """Classify a failed API call; returns the classification and parks polling when it's offline"""
+        kind = classify_error(error)
+        if kind == OFFLINE and not self.offline:
+            self.offline = True
+            self.offline_since = time.monotonic()
+            self.delay = self.first_delay
+            logging.info(f"Network offline ({type(error).__name__}), polling parked")
+            self.timer.start(self.delay)
+            self.went_offline.emit()
+        return kind
+
+    def report_success(self):
+        """An API call went through, so the network is back if it was down"""
+        if self.offline:
+            self._set_online()
+
+    def check(self):
+        """Look at the interfaces, then probe the API host once if one is up"""
+        if not self.offline or self._probing:
+            return
+        if self.check_interfaces and not interfaces_up():
+            self._schedule_next()
+            return
+        self._probing = True
+        self.probes += 1
+        self.executor.submit(self._probe)
+
+    def _probe(self):
+        try:
+            # DNS and a TCP handshake, no request or token
+            socket.create_connection(self.address, timeout=self.timeout).close()
+            reachable = True
+        except OSError:
+            reachable = False
+        self._probe_finished.emit(reachable)
+
+    def _on_probe_finished(self, reachable):
+        self._probing = False
+        if not self.offline:
+            return
+        if reachable:
+            self._set_online()
+        else:
+            self._schedule_next()
+
+    def _schedule_next(self):
+        self.delay = min(self.delay * 2, self.max_delay)
+        self.timer.start(self.delay)
+
+    def _set_online(self):
+        self.offline = False
+        self.timer.stop()
+        logging.info(f"Network back after {time.monotonic() - self.offline_since:.0f} s and {self.probes} probes")
+        self.probes = 0
+        self.back_online.emit()
+
+    def stop(self):
+        self.timer.stop()
+        self.executor.shutdown(wait=False, cancel_futures=True)
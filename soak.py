@@ -0,0 +1,233 @@
+import argparse
+import gc
+import logging
+import random
+import sys
+import tempfile
+import tracemalloc
+import psutil
+from PyQt5.QtCore import QObject
+from PyQt5.QtWidgets import QApplication
+from playback_trace import VirtualClock, import_isolated_widget
+
+
+class SimulatedSpotify:
+    def __init__(self, clock, seed=0):
+        self.clock = clock
+        self.random = random.Random(seed)
+        self.position = 0
+        self.is_playing = True
+        self.track_started = 0.0
+        self.progress_at_pause = 0
+        self.device = {'id': 'soakdevice', 'name': 'Soak Device', 'type': 'Computer', 'is_active': True, 'volume_percent': 50}
+
+    def _track(self, index):
+        track_id = f"soaktrack{index:08d}"
+        return {
+            'id': track_id,
+            'uri': f"spotify:track:{track_id}",
+            'name': f"Soak Song {index} " + "x" * (index % 40),
+            'duration_ms': 120000 + (index % 7) * 30000,
+            'artists': [{'id': f"soakartist{index % 97}", 'name': f"Soak Artist {index % 97}"}],
+            'album': {'id': f"soakalbum{index % 301}", 'name': f"Soak Album {index % 301}", 'images': []}
+        }
+
+    def _progress_ms(self):
+        if not self.is_playing:
+            return self.progress_at_pause
+        return int((self.clock.now - self.track_started) * 1000)
+
+    def _advance(self):
+        """Move to the next track when the current one has finished"""
+        while self.is_playing and self._progress_ms() >= self._track(self.position)['duration_ms']:
+            self.track_started += self._track(self.position)['duration_ms'] / 1000.0
+            self.position += 1
+
+    def _skip(self, step):
+        self.position = max(0, self.position + step)
+        self.track_started = self.clock.now
+        self.progress_at_pause = 0
+
+    def current_playback(self, *args, **kwargs):
+        self._advance()
+        return {
+            'device': dict(self.device),
+            'progress_ms': self._progress_ms(),
+            'is_playing': self.is_playing,
+            'item': self._track(self.position),
+            'currently_playing_type': 'track'
+        }
+
+    def queue(self):
+        return {
+            'currently_playing': self._track(self.position),
+            'queue': [self._track(self.position + i) for i in range(1, 4)]
+        }
+
+    def devices(self):
+        return {'devices': [dict(self.device)]}
+
+    def next_track(self, device_id=None):
+        self._skip(1)
+
+    def previous_track(self, device_id=None):
+        self._skip(-1)
+
+    def start_playback(self, device_id=None, **kwargs):
+        if not self.is_playing:
+            self.track_started = self.clock.now - self.progress_at_pause / 1000.0
+            self.is_playing = True
+
+    def pause_playback(self, device_id=None):
+        if self.is_playing:
+            self.progress_at_pause = self._progress_ms()
+            self.is_playing = False
+
+    def transfer_playback(self, device_id, force_play=True):
+        pass
+
+
+class SoakRunner:
+    def __init__(self, widget, app, seed=0):
+        self.widget = widget
+        self.app = app
+        self.clock = VirtualClock()
+        self.random = random.Random(seed)
+        self.spotify = SimulatedSpotify(self.clock, seed)
+        self.spotify_running = True
+        self.samples = []
+        self.snapshots = []
+
+    def _fake_io(self):
+        """Replace timers, the API client and process checks with simulated ones"""
+        widget = self.widget
+        widget.timer.stop()
+        widget.idle_timer.stop()
+        widget.reconnect_timer.stop()
+        widget.spotify = self.spotify
+        widget.playback_fetcher = None
+        widget.is_spotify_connected = True
+        widget.is_spotify_process_running = lambda: self.spotify_running
+        widget.call_later = self.clock.call_later
+        widget.source_scheduler.run_inline()
+        widget.command_executor.run_inline()
+        # The media key fallback must not press real keys while replaying
+        widget.command_executor.fallback.press_key = lambda key: None
+        widget.show_tooltip = lambda *args, **kwargs: None
+
+    def _poll(self):
+        self.widget.check_media_players()
+        self.app.processEvents()
+        self.clock.call_later(self.widget.timer.interval() or 2000, self._poll)
+
+    def _idle_check(self):
+        self.widget.check_idle_state()
+        self.clock.call_later(5000, self._idle_check)
+
+    def _random_action(self):
+        actions = [
+            self.widget.next_track,
+            self.widget.previous_track,
+            self.widget.toggle_playback,
+            self.widget._populate_account_menu,
+            self._toggle_spotify_process,
+        ]
+        self.random.choice(actions)()
+        self.app.processEvents()
+        self.clock.call_later(self.random.randint(5, 60) * 1000, self._random_action)
+
+    def _toggle_spotify_process(self):
+        # Simulate Spotify being closed now and then, and reopened on the next pick
+        self.spotify_running = not self.spotify_running and self.random.random() >= 0.2
+
+    def _qt_object_count(self):
+        return len(self.widget.findChildren(QObject)) + len(QApplication.allWidgets())
+
+    def sample(self):
+        """Record memory and Qt object counts at the current virtual time"""
+        self.app.processEvents()
+        gc.collect()
+        traced, _ = tracemalloc.get_traced_memory()
+        sample = {
+            'virtual_minutes': round(self.clock.now / 60, 1),
+            'rss_mb': psutil.Process().memory_info().rss / (1024 * 1024),
+            'heap_mb': traced / (1024 * 1024),
+            'qt_objects': self._qt_object_count()
+        }
+        self.samples.append(sample)
+        self.snapshots.append(tracemalloc.take_snapshot())
+        print(f"[{sample['virtual_minutes']:>7} min] rss={sample['rss_mb']:.1f} MB "
+              f"heap={sample['heap_mb']:.2f} MB qt_objects={sample['qt_objects']}")
+        return sample
+
+    def run(self, hours, sample_minutes=30, warmup_minutes=10):
+        """Drive simulated playback for the given number of virtual hours"""
+        tracemalloc.start()
+        self._fake_io()
+        self.clock.call_later(0, self._poll)
+        self.clock.call_later(5000, self._idle_check)
+        self.clock.call_later(1000, self._random_action)
+
+        self.clock.run_until(warmup_minutes * 60)
+        self.sample()
+        end = hours * 3600
+        while self.clock.now < end:
+            self.clock.run_until(min(self.clock.now + sample_minutes * 60, end))
+            self.sample()
+        return self.samples
+
+    def check_budget(self, rss_budget_mb, heap_budget_mb, object_budget):
+        """Compare the final sample against the baseline taken after warmup"""
+        baseline, final = self.samples[0], self.samples[-1]
+        failures = []
+        if final['rss_mb'] - baseline['rss_mb'] > rss_budget_mb:
+            failures.append(f"RSS grew by {final['rss_mb'] - baseline['rss_mb']:.1f} MB (budget {rss_budget_mb} MB)")
+        if final['heap_mb'] - baseline['heap_mb'] > heap_budget_mb:
+            failures.append(f"Python heap grew by {final['heap_mb'] - baseline['heap_mb']:.2f} MB (budget {heap_budget_mb} MB)")
+        if final['qt_objects'] - baseline['qt_objects'] > object_budget:
+            failures.append(f"Qt objects grew by {final['qt_objects'] - baseline['qt_objects']} (budget {object_budget})")
+        return failures
+
+    def top_growth(self, limit=10):
+        """Return the allocation sites that grew the most since the baseline"""
+        stats = self.snapshots[-1].compare_to(self.snapshots[0], 'lineno')
+        return [str(stat) for stat in stats[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive hours of simulated playback and check for memory growth")
+    parser.add_argument('--hours', type=float, default=8, help="Virtual hours of playback to simulate")
+    parser.add_argument('--sample-minutes', type=float, default=30, help="Virtual minutes between samples")
+    parser.add_argument('--rss-budget-mb', type=float, default=20)
+    parser.add_argument('--heap-budget-mb', type=float, default=2)
+    parser.add_argument('--object-budget', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    app = QApplication(['soak'])
+    with tempfile.TemporaryDirectory() as appdata:
+        media_widget = import_isolated_widget(appdata)
+        widget = media_widget.MediaWidget()
+        widget.show()
+        logging.info(f"Starting soak run for {args.hours} virtual hours")
+
+        runner = SoakRunner(widget, app, seed=args.seed)
+        runner.run(args.hours, sample_minutes=args.sample_minutes)
+        failures = runner.check_budget(args.rss_budget_mb, args.heap_budget_mb, args.object_budget)
+        widget.close()
+        # The log file is in appdata and has to be closed before the folder goes
+        logging.shutdown()
+
+    if failures:
+        print("\nSoak run FAILED:")
+        for failure in failures:
+            print(f"  - {failure}")
+        print("\nTop allocation growth:")
+        for line in runner.top_growth():
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nSoak run passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,540 @@
+import argparse
+import json
+import logging
+import random
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Local stand-in for the parts of the Spotify Web API the widget uses.
+# Point the widget at it with MEDIA_WIDGET_API_PREFIX=http://127.0.0.1:<port>/v1/
+
+
+# Roughly the number of markets a typical track is available in
+MARKETS = [f"{chr(65 + i // 26)}{chr(65 + i % 26)}" for i in range(185)]
+
+
+def make_artist(index):
+    """Build a fake simplified artist object"""
+    artist_id = f"stubartist{index:04d}"
+    return {
+        'id': artist_id,
+        'name': f"Stub Artist {index}",
+        'type': 'artist',
+        'uri': f"spotify:artist:{artist_id}",
+        'href': f"https://api.spotify.com/v1/artists/{artist_id}",
+        'external_urls': {'spotify': f"https://open.spotify.com/artist/{artist_id}"}
+    }
+
+
+def make_track(index):
+    """Build a fake track object shaped like the real API's"""
+    track_id = f"stubtrack{index:06d}"
+    album_id = f"stubalbum{index % 200:04d}"
+    return {
+        'id': track_id,
+        'uri': f"spotify:track:{track_id}",
+        'name': f"Stub Song {index}",
+        'type': 'track',
+        'duration_ms': 180000 + (index % 60) * 1000,
+        'explicit': False,
+        'popularity': index % 100,
+        'track_number': index % 12 + 1,
+        'disc_number': 1,
+        'is_local': False,
+        'preview_url': f"https://p.scdn.co/mp3-preview/{track_id}",
+        'href': f"https://api.spotify.com/v1/tracks/{track_id}",
+        'external_ids': {'isrc': f"STUB{index:08d}"},
+        'external_urls': {'spotify': f"https://open.spotify.com/track/{track_id}"},
+        'available_markets': MARKETS,
+        'artists': [make_artist(index % 50), make_artist((index + 7) % 50)],
+        'album': {
+            'id': album_id,
+            'name': f"Stub Album {index % 200}",
+            'type': 'album',
+            'album_type': 'album',
+            'uri': f"spotify:album:{album_id}",
+            'href': f"https://api.spotify.com/v1/albums/{album_id}",
+            'release_date': '2020-01-01',
+            'release_date_precision': 'day',
+            'total_tracks': 12,
+            'available_markets': MARKETS,
+            'external_urls': {'spotify': f"https://open.spotify.com/album/{album_id}"},
+            'artists': [make_artist(index % 50)],
+            'images': [
+                {'url': f"https://i.scdn.co/image/{album_id}{size}", 'height': size, 'width': size}
+                for size in (640, 300, 64)
+            ]
+        }
+    }
+
+
+# Words the searchable catalog's titles are made of
+SEARCH_WORDS = [
+    'midnight', 'river', 'golden', 'echo', 'paper', 'neon', 'summer', 'ghost', 'electric', 'velvet',
+    'silver', 'highway', 'ocean', 'fire', 'dream', 'city', 'honey', 'thunder', 'glass', 'wild',
+    'morning', 'shadow', 'crystal', 'desert', 'winter', 'rain', 'satellite', 'heart', 'lonely', 'diamond',
+    'atlantic', 'broken', 'cherry', 'dancing', 'empire', 'falling', 'garden', 'harbor', 'island', 'jungle',
+    'kingdom', 'lights', 'machine', 'northern', 'orange', 'paradise', 'quiet', 'runaway', 'starlight', 'tokyo',
+    'under', 'violet', 'waves', 'young', 'zero', 'amber', 'blue', 'coastal', 'daylight', 'forever'
+]
+
+
+def make_search_track(index):
+    """Build a catalog track with a searchable made-up title"""
+    rng = random.Random(index)
+    track = make_track(100000 + index)
+    track['name'] = ' '.join(rng.sample(SEARCH_WORDS, rng.randint(2, 3))).title()
+    return track
+
+
+def strip_markets(value):
+    """Drop available_markets the way the API does when a market is given"""
+    if isinstance(value, dict):
+        return {k: strip_markets(v) for k, v in value.items() if k != 'available_markets'}
+    if isinstance(value, list):
+        return [strip_markets(v) for v in value]
+    return value
+
+
+class StubState:
+    def __init__(self, device_count=3, track_count=100, playlist_sizes=(25, 300, 10000), saved_count=500,
+                 search_catalog=5000):
+        self.lock = threading.Lock()
+        self.devices = [
+            {
+                'id': f"stubdevice{i}",
+                'name': f"Stub Device {i}",
+                'type': 'Computer' if i == 0 else 'Speaker',
+                'is_active': False,
+                'volume_percent': 50
+            }
+            for i in range(device_count)
+        ]
+        self.tracks = [make_track(i) for i in range(track_count)]
+        self.position = 0
+        self.is_playing = False
+        self.progress_ms = 0
+        self.started_at = None
+        self.latency = 0.0
+        self.request_counts = {}
+        # Library tracks are built per page, so huge playlists cost nothing until they are read
+        self.playlists = [
+            {'id': f"stubplaylist{i}", 'name': f"Stub Playlist {i} ({size} tracks)", 'size': size, 'revision': 0}
+            for i, size in enumerate(playlist_sizes)
+        ]
+        self.saved_count = saved_count
+        self.saved_revision = 0
+        self.search_catalog = search_catalog
+        self._search_index = None
+
+    def active_device(self):
+        """Return the active device or None"""
+        return next((d for d in self.devices if d['is_active']), None)
+
+    def find_device(self, device_id):
+        """Return the device with the given id or None"""
+        return next((d for d in self.devices if d['id'] == device_id), None)
+
+    def activate(self, device_id):
+        """Make the given device the active one"""
+        for device in self.devices:
+            device['is_active'] = device['id'] == device_id
+
+    def current_progress(self):
+        """Return the playback position in milliseconds"""
+        if self.is_playing and self.started_at is not None:
+            return self.progress_ms + int((time.time() - self.started_at) * 1000)
+        return self.progress_ms
+
+    def set_playing(self, playing):
+        """Start or stop the playback clock"""
+        self.progress_ms = self.current_progress()
+        self.is_playing = playing
+        self.started_at = time.time() if playing else None
+
+    def skip(self, step):
+        """Move to another track in the list"""
+        self.position = (self.position + step) % len(self.tracks)
+        self.progress_ms = 0
+        self.started_at = time.time() if self.is_playing else None
+
+    def find_playlist(self, playlist_id):
+        """Return the playlist with the given id or None"""
+        return next((p for p in self.playlists if p['id'] == playlist_id), None)
+
+    def edit_playlist(self, playlist_id):
+        """Change a playlist so its snapshot_id moves on"""
+        self.find_playlist(playlist_id)['revision'] += 1
+
+    def save_track(self):
+        """Add a track to the saved tracks so their ETags change"""
+        self.saved_count += 1
+        self.saved_revision += 1
+
+    def find_track(self, track_id):
+        """Return the track object for a stub track id, or None"""
+        match = re.match(r'^stubtrack(\d{6})$', track_id)
+        return make_track(int(match.group(1))) if match else None
+
+    def search_index(self):
+        """Return the words of each catalog track's title and first artist, built on first use"""
+        if self._search_index is None:
+            self._search_index = []
+            for index in range(self.search_catalog):
+                track = make_search_track(index)
+                self._search_index.append(f"{track['name']} {track['artists'][0]['name']}".casefold().split())
+        return self._search_index
+
+    def playlist_object(self, playlist):
+        """Build a simplified playlist object"""
+        playlist_id = playlist['id']
+        return {
+            'id': playlist_id,
+            'name': playlist['name'],
+            'type': 'playlist',
+            'uri': f"spotify:playlist:{playlist_id}",
+            'href': f"https://api.spotify.com/v1/playlists/{playlist_id}",
+            'snapshot_id': f"{playlist_id}-r{playlist['revision']}",
+            'owner': {'id': 'stubuser', 'display_name': 'Stub User'},
+            'tracks': {'href': f"https://api.spotify.com/v1/playlists/{playlist_id}/tracks", 'total': playlist['size']}
+        }
+
+    def player(self):
+        """Build the full player object"""
+        device = self.active_device()
+        if device is None:
+            return None
+        return {
+            'device': dict(device),
+            'shuffle_state': False,
+            'repeat_state': 'off',
+            'timestamp': int(time.time() * 1000),
+            'context': {
+                'type': 'playlist',
+                'uri': 'spotify:playlist:stubplaylist',
+                'href': 'https://api.spotify.com/v1/playlists/stubplaylist',
+                'external_urls': {'spotify': 'https://open.spotify.com/playlist/stubplaylist'}
+            },
+            'actions': {'disallows': {'resuming': True}},
+            'progress_ms': self.current_progress(),
+            'item': self.tracks[self.position],
+            'currently_playing_type': 'track',
+            'is_playing': self.is_playing
+        }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        logging.debug("Stub: " + format % args)
+
+    def _send_json(self, status, body=None, headers=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        if data:
+            self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def _send_error(self, status, message, reason=None):
+        error = {'status': status, 'message': message}
+        if reason:
+            error['reason'] = reason
+        self._send_json(status, {'error': error})
+
+    def _route(self, method):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        with self.state.lock:
+            key = f"{method} {url.path}"
+            self.state.request_counts[key] = self.state.request_counts.get(key, 0) + 1
+            handler = ROUTES.get((method, url.path))
+            if handler is None:
+                handler = _match_pattern_route(method, url.path, query)
+            if handler is None:
+                self._send_error(404, "Service not found")
+                return
+            handler(self, query, body)
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_PUT(self):
+        self._route('PUT')
+
+    def do_POST(self):
+        self._route('POST')
+
+    def _resolve_device(self, query):
+        """Resolve the target device the way the real API does"""
+        device_id = query.get('device_id')
+        if device_id:
+            device = self.state.find_device(device_id)
+            if device is None:
+                self._send_error(404, "Device not found")
+                return None
+            self.state.activate(device_id)
+            return device
+        device = self.state.active_device()
+        if device is None:
+            self._send_error(404, "Player command failed: No active device found", 'NO_ACTIVE_DEVICE')
+        return device
+
+    def get_player(self, query, body):
+        player = self.state.player()
+        if player is None:
+            self._send_json(204)
+        else:
+            self._send_json(200, strip_markets(player) if query.get('market') else player)
+
+    def get_currently_playing(self, query, body):
+        player = self.state.player()
+        if player is None:
+            self._send_json(204)
+            return
+        del player['device']
+        if query.get('market'):
+            player = strip_markets(player)
+        self._send_json(200, player)
+
+    def get_queue(self, query, body):
+        tracks = self.state.tracks
+        position = self.state.position
+        upcoming = [tracks[(position + i) % len(tracks)] for i in range(1, 21)]
+        self._send_json(200, {'currently_playing': tracks[position], 'queue': upcoming})
+
+    def get_devices(self, query, body):
+        self._send_json(200, {'devices': [dict(d) for d in self.state.devices]})
+
+    def put_transfer(self, query, body):
+        device_ids = body.get('device_ids') or []
+        if not device_ids or self.state.find_device(device_ids[0]) is None:
+            self._send_error(404, "Device not found")
+            return
+        self.state.activate(device_ids[0])
+        if body.get('play'):
+            self.state.set_playing(True)
+        self._send_json(204)
+
+    def put_play(self, query, body):
+        if self._resolve_device(query) is None:
+            return
+        self.state.set_playing(True)
+        self._send_json(204)
+
+    def put_pause(self, query, body):
+        if self._resolve_device(query) is None:
+            return
+        self.state.set_playing(False)
+        self._send_json(204)
+
+    def post_next(self, query, body):
+        if self._resolve_device(query) is None:
+            return
+        self.state.skip(1)
+        self._send_json(204)
+
+    def post_previous(self, query, body):
+        if self._resolve_device(query) is None:
+            return
+        self.state.skip(-1)
+        self._send_json(204)
+
+
+    def _send_page(self, query, total, max_limit, make_item, etag_prefix, wrap=None):
+        """Send one page of a paging object, answering 304 when the client's ETag still matches"""
+        offset = int(query.get('offset', 0))
+        limit = min(int(query.get('limit', 20)), max_limit)
+        etag = f'"{etag_prefix}:{offset}:{limit}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        items = [make_item(i) for i in range(offset, min(offset + limit, total))]
+        if query.get('market'):
+            items = strip_markets(items)
+        following = offset + limit
+        page = {
+            'items': items,
+            'total': total,
+            'limit': limit,
+            'offset': offset,
+            'previous': None,
+            'next': f"{self.path.split('?')[0]}?offset={following}&limit={limit}" if following < total else None
+        }
+        self._send_json(200, {wrap: page} if wrap else page, headers={'ETag': etag})
+
+    def get_my_playlists(self, query, body):
+        playlists = self.state.playlists
+        self._send_page(query, len(playlists), 50, lambda i: self.state.playlist_object(playlists[i]),
+                        f"playlists{sum(p['revision'] for p in playlists)}")
+
+    def get_playlist(self, query, body):
+        playlist = self.state.find_playlist(query['playlist_id'])
+        if playlist is None:
+            self._send_error(404, "Not found.")
+            return
+        self._send_json(200, self.state.playlist_object(playlist))
+
+    def get_playlist_tracks(self, query, body):
+        playlist = self.state.find_playlist(query['playlist_id'])
+        if playlist is None:
+            self._send_error(404, "Not found.")
+            return
+        snapshot_id = self.state.playlist_object(playlist)['snapshot_id']
+        self._send_page(query, playlist['size'], 100,
+                        lambda i: {'added_at': '2020-01-01T00:00:00Z', 'is_local': False, 'track': make_track(i)},
+                        snapshot_id)
+
+    def get_saved_tracks(self, query, body):
+        self._send_page(query, self.state.saved_count, 50,
+                        lambda i: {'added_at': '2020-01-01T00:00:00Z', 'track': make_track(i + 50000)},
+                        f"saved-r{self.state.saved_revision}")
+
+    def get_search(self, query, body):
+        # Every query word has to start one of the words of the title or the first artist
+        words = query.get('q', '').casefold().split()
+        if not words:
+            self._send_error(400, "No search query")
+            return
+        matches = [index for index, entry in enumerate(self.state.search_index())
+                   if all(any(word.startswith(w) for word in entry) for w in words)]
+        self._send_page(query, len(matches), 50, lambda i: make_search_track(matches[i]),
+                        f"search:{' '.join(words)}", wrap='tracks')
+
+    def get_tracks(self, query, body):
+        ids = [i for i in query.get('ids', '').split(',') if i]
+        if not ids:
+            self._send_error(400, "invalid request")
+            return
+        if len(ids) > 50:
+            self._send_error(400, "Too many ids requested")
+            return
+        tracks = [self.state.find_track(i) for i in ids]
+        self._send_json(200, {'tracks': strip_markets(tracks) if query.get('market') else tracks})
+
+    def get_track(self, query, body):
+        track = self.state.find_track(query['track_id'])
+        if track is None:
+            self._send_error(404, "Not found.")
+            return
+        self._send_json(200, strip_markets(track) if query.get('market') else track)
+
+
+ROUTES = {
+    ('GET', '/v1/me/player'): StubHandler.get_player,
+    ('GET', '/v1/me/player/devices'): StubHandler.get_devices,
+    ('GET', '/v1/me/player/currently-playing'): StubHandler.get_currently_playing,
+    ('GET', '/v1/me/player/queue'): StubHandler.get_queue,
+    ('PUT', '/v1/me/player'): StubHandler.put_transfer,
+    ('PUT', '/v1/me/player/play'): StubHandler.put_play,
+    ('PUT', '/v1/me/player/pause'): StubHandler.put_pause,
+    ('POST', '/v1/me/player/next'): StubHandler.post_next,
+    ('POST', '/v1/me/player/previous'): StubHandler.post_previous,
+    ('GET', '/v1/me/playlists'): StubHandler.get_my_playlists,
+    ('GET', '/v1/me/tracks'): StubHandler.get_saved_tracks,
+    ('GET', '/v1/search'): StubHandler.get_search,
+    ('GET', '/v1/tracks'): StubHandler.get_tracks,
+}
+
+# Routes with ids in the path; named groups are passed to the handler in the query
+PATTERN_ROUTES = [
+    ('GET', re.compile(r'^/v1/playlists/(?P<playlist_id>[^/]+)$'), StubHandler.get_playlist),
+    ('GET', re.compile(r'^/v1/playlists/(?P<playlist_id>[^/]+)/tracks$'), StubHandler.get_playlist_tracks),
+    ('GET', re.compile(r'^/v1/tracks/(?P<track_id>[^/]+)$'), StubHandler.get_track),
+]
+
+
+def _match_pattern_route(method, path, query):
+    for route_method, pattern, handler in PATTERN_ROUTES:
+        match = pattern.match(path)
+        if route_method == method and match:
+            query.update(match.groupdict())
+            return handler
+    return None
+
+
+class SpotifyStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, state=None):
+        super().__init__(('127.0.0.1', port), StubHandler)
+        self.state = state or StubState()
+        self._thread = None
+        self._connections = set()
+
+    @property
+    def prefix(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/"
+
+    def start(self):
+        """Serve requests on a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def get_request(self):
+        request, address = super().get_request()
+        self._connections.add(request)
+        return request, address
+
+    def shutdown_request(self, request):
+        self._connections.discard(request)
+        super().shutdown_request(request)
+
+    def stop(self):
+        """Stop serving, drop kept-alive connections and release the port, like the network going away"""
+        self.shutdown()
+        for connection in list(self._connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Spotify Web API stub")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--devices', type=int, default=3)
+    parser.add_argument('--tracks', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds to delay every response")
+    parser.add_argument('--playlist-sizes', type=int, nargs='+', default=[25, 300, 10000])
+    parser.add_argument('--saved-tracks', type=int, default=500)
+    parser.add_argument('--search-catalog', type=int, default=5000, help="Number of tracks /search can find")
+    args = parser.parse_args()
+
+    state = StubState(device_count=args.devices, track_count=args.tracks, playlist_sizes=args.playlist_sizes,
+                      saved_count=args.saved_tracks, search_catalog=args.search_catalog)
+    state.latency = args.latency
+    server = SpotifyStubServer(args.port, state)
+    print(f"Spotify stub listening on {server.prefix}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from now_playing_publisher import replace_file
+
+# Bump when the saved fields change; snapshots from other versions are ignored
+SNAPSHOT_VERSION = 1
+
+
+def snapshot_from_state(source, player, state):
+    """Build the saved snapshot from a source's PlaybackState"""
+    raw = state.raw or {}
+    # Spotify playback objects carry the album art and device; MPD's raw status has neither
+    track = raw.get('item') or {}
+    images = (track.get('album') or {}).get('images') or []
+    device = raw.get('device') or {}
+    return {
+        'version': SNAPSHOT_VERSION,
+        'source': source,
+        'player': player,
+        'title': state.title,
+        'artist': state.artist,
+        'is_playing': bool(state.is_playing),
+        'progress_ms': state.progress_ms,
+        'duration_ms': state.duration_ms,
+        'art_url': images[-1].get('url') if images else None,
+        'device': device.get('name'),
+        'saved_at': time.time()
+    }
+
+
+def _changed_fields(snapshot):
+    # The position moves on every poll; it's only saved on close
+    return (snapshot['source'], snapshot['title'], snapshot['artist'], snapshot['is_playing'],
+            snapshot['art_url'], snapshot['device'])
+
+
+class StateSnapshot:
+    def __init__(self, path):
+        self.path = path
+        self.latest = None
+        self._written = None
+        # One writer keeps the writes in order and off the GUI thread
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='StateSnapshot')
+
+    def load(self):
+        """Return the last saved snapshot, or None when there is no usable one"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.error(f"Error reading state snapshot: {str(e)}")
+            return None
+        if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION or not snapshot.get('title'):
+            return None
+        self.latest = self._written = snapshot
+        return snapshot
+
+    def update(self, source, player, state):
+        """Remember the shown state and save it in the background when more than the position changed"""
+        if not state or not state.title:
+            # Keep the last track that was actually playing
+            return
+        snapshot = snapshot_from_state(source, player, state)
+        changed = self.latest is None or _changed_fields(snapshot) != _changed_fields(self.latest)
+        self.latest = snapshot
+        if changed:
+            self.executor.submit(self._write, snapshot)
+
+    def _write(self, snapshot):
+        try:
+            replace_file(self.path, json.dumps(snapshot))
+            self._written = snapshot
+        except OSError as e:
+            logging.error(f"Error writing state snapshot: {str(e)}")
+
+    def clear(self):
+        """Forget the saved state (the next login may be another account)"""
+        self.latest = None
+        self.executor.submit(self._remove)
+
+    def _remove(self):
+        self._written = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.error(f"Error removing state snapshot: {str(e)}")
+
+    def close(self):
+        """Finish pending writes, then save the latest position"""
+        self.executor.shutdown(wait=True)
+        if self.latest is not None and self.latest is not self._written:
+            self._write(self.latest)
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import namedtuple
+from PyQt5.QtCore import Qt, QObject, pyqtSignal
+
+# The widget's shared Spotify state. Values are replaced, never changed in place.
+WidgetState = namedtuple('WidgetState', 'is_spotify_running is_spotify_connected current_playback_state last_track_info')
+
+INITIAL_STATE = WidgetState(False, False, None, None)
+
+
+class StateStore(QObject):
+    """One immutable WidgetState, replaced whole by transitions under a lock
+
+    Reading .state never blocks: it's a single reference to a snapshot nobody changes. Subscribers of
+    changed get the keys that changed since their last notification and the latest snapshot, on the
+    GUI thread. Changes that arrive while a notification is queued are folded into it, so a burst of
+    writes costs one notification and the queue never grows.
+    """
+    # (frozenset of changed keys, WidgetState), on the thread the store lives in
+    changed = pyqtSignal(object, object)
+    # Internal: writers on any thread wake the store's thread through a queued signal
+    _notify = pyqtSignal()
+
+    def __init__(self, state=INITIAL_STATE):
+        super().__init__()
+        self.state = state
+        self.version = 0
+        self._lock = threading.Lock()
+        self._changed_keys = set()
+        self._notify_pending = False
+        self._first_change_at = None
+        # Seconds from the first change of a notification to its delivery, for the latest notification
+        self.notify_latency = 0.0
+        # Queued even for writers on the store's own thread: delivery must never run inside a transition
+        self._notify.connect(self._deliver, Qt.QueuedConnection)
+
+    def update(self, **changes):
+        """Set several keys in one transition; returns the new snapshot"""
+        return self.transition(lambda state: changes)
+
+    def transition(self, fn):
+        """Apply fn(state) -> {key: value} atomically, so it always sees the latest snapshot
+
+        fn runs under the lock: keep it short and don't call back into the store from it.
+        """
+        with self._lock:
+            old = self.state
+            changes = fn(old)
+            keys = {key for key, value in changes.items() if getattr(old, key) != value}
+            if not keys:
+                return old
+            new = old._replace(**changes)
+            self.state = new
+            self.version += 1
+            self._changed_keys |= keys
+            notify = not self._notify_pending
+            if notify:
+                self._notify_pending = True
+                self._first_change_at = time.perf_counter()
+        if notify:
+            self._notify.emit()
+        return new
+
+    def _deliver(self):
+        with self._lock:
+            keys, self._changed_keys = frozenset(self._changed_keys), set()
+            self._notify_pending = False
+            state = self.state
+            self.notify_latency = time.perf_counter() - self._first_change_at
+        self.changed.emit(keys, state)
+
+
+def stored(key):
+    """An attribute of the owner that reads from and writes to its state_store"""
+    return property(lambda self: getattr(self.state_store.state, key),
+                    lambda self, value: self.state_store.update(**{key: value}))
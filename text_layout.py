@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from PyQt5.QtCore import Qt, QEvent
+from PyQt5.QtGui import QFontMetrics, QPainter
+from PyQt5.QtWidgets import QLabel, QSizePolicy
+
+
+class TextElider:
+    """Elides text to a pixel width, remembering results by (text, font, width)"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.metrics = {}
+        self.hits = 0
+        self.misses = 0
+
+    def elide(self, text, font, width):
+        key = (text, font.key(), width)
+        elided = self.entries.get(key)
+        if elided is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return elided
+        self.misses += 1
+        metrics = self.metrics.get(key[1])
+        if metrics is None:
+            metrics = self.metrics[key[1]] = QFontMetrics(font)
+        elided = metrics.elidedText(text, Qt.ElideRight, width)
+        self.entries[key] = elided
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return elided
+
+
+# Shared by every ElidedLabel, so a title is measured once per font and width
+elider = TextElider()
+
+
+class ElidedLabel(QLabel):
+    """A one-line label that paints its text elided to its width
+
+    The text is never handed to QLabel, so changing it only repaints: the size hint can't change and
+    the window's layout is left alone. The label is one line high and takes whatever width it's given.
+    """
+
+    def __init__(self, text='', parent=None):
+        super().__init__(parent)
+        self._full_text = ''
+        self._shown_text = ''
+        self.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Fixed)
+        self._fit_height()
+        # Not the subclass override: it may rely on state its __init__ hasn't set up yet
+        ElidedLabel.setText(self, text)
+
+    def text(self):
+        return self._full_text
+
+    def setText(self, text):
+        if text == self._full_text:
+            return
+        self._full_text = text
+        self._elide()
+
+    def _elide(self):
+        shown = elider.elide(self._full_text, self.font(), self.contentsRect().width())
+        if shown != self._shown_text:
+            self._shown_text = shown
+            # The full text is a hover away when it doesn't fit
+            self.setToolTip(self._full_text if shown != self._full_text else '')
+            self.update()
+
+    def _fit_height(self):
+        margins = self.contentsMargins()
+        self.setFixedHeight(self.fontMetrics().height() + margins.top() + margins.bottom())
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._elide()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        # Stylesheets can change the font and the padding
+        if event.type() in (QEvent.FontChange, QEvent.StyleChange):
+            self._fit_height()
+            self._elide()
+
+    def paintEvent(self, event):
+        # Background and frame come from QLabel; its own text is always empty
+        super().paintEvent(event)
+        if self._shown_text:
+            painter = QPainter(self)
+            self.style().drawItemText(painter, self.contentsRect(), int(self.alignment()), self.palette(),
+                                      self.isEnabled(), self._shown_text, self.foregroundRole())
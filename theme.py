@@ -0,0 +1,218 @@
+from string import Template
+
+# Colours for each theme; the control icons are white, so their backgrounds stay dark in the light theme
+THEMES = {
+    'dark': {
+        'frame_bg': 'rgba(30, 30, 30, 0.3)',
+        'frame_border': 'rgba(255, 255, 255, 0.3)',
+        'round_button_bg': 'rgba(255, 255, 255, 0.1)',
+        'round_button_hover': 'rgba(255, 255, 255, 0.2)',
+        'glass_bg': 'rgba(255, 255, 255, 0.1)',
+        'glass_border': 'rgba(255, 255, 255, 0.2)',
+        'control_hover': 'rgba(255, 255, 255, 0.1)',
+        'control_pressed': 'rgba(255, 255, 255, 0.2)',
+        'close_text': '#888888',
+        'close_hover': '#ff4444',
+        'text': 'white',
+        'text_secondary': '#BBBBBB',
+        'text_lyrics': '#DDDDDD',
+        'text_muted': '#888888',
+        'input_bg': 'rgba(255, 255, 255, 0.1)',
+        'popup_bg': '#2D2D2D',
+        'popup_text': 'white',
+        'popup_selected': 'rgba(255, 255, 255, 0.1)',
+        'slider_groove': 'rgba(255, 255, 255, 0.1)',
+        'slider_handle': 'rgba(255, 255, 255, 0.5)',
+        'slider_handle_hover': 'rgba(0, 122, 255, 0.5)',
+        'slider_fill': 'rgba(0, 122, 255, 0.2)',
+    },
+    'light': {
+        'frame_bg': 'rgba(245, 245, 245, 0.85)',
+        'frame_border': 'rgba(0, 0, 0, 0.15)',
+        'round_button_bg': 'rgba(0, 0, 0, 0.35)',
+        'round_button_hover': 'rgba(0, 0, 0, 0.5)',
+        'glass_bg': 'rgba(30, 30, 30, 0.55)',
+        'glass_border': 'rgba(0, 0, 0, 0.2)',
+        'control_hover': 'rgba(255, 255, 255, 0.15)',
+        'control_pressed': 'rgba(255, 255, 255, 0.25)',
+        'close_text': '#777777',
+        'close_hover': '#ff4444',
+        'text': '#1E1E1E',
+        'text_secondary': '#555555',
+        'text_lyrics': '#333333',
+        'text_muted': '#777777',
+        'input_bg': 'rgba(0, 0, 0, 0.08)',
+        'popup_bg': '#F5F5F5',
+        'popup_text': '#1E1E1E',
+        'popup_selected': 'rgba(0, 0, 0, 0.08)',
+        'slider_groove': 'rgba(0, 0, 0, 0.15)',
+        'slider_handle': 'rgba(0, 0, 0, 0.45)',
+        'slider_handle_hover': 'rgba(0, 122, 255, 0.6)',
+        'slider_fill': 'rgba(0, 122, 255, 0.3)',
+    },
+}
+
+# Every rule is scoped to the widget's content frame or account menu, so dialogs keep the platform look.
+# Rules inside the frame carry two ids so they beat the frame's own QFrame rule, which QLabel and
+# QListWidget also match.
+STYLESHEET = Template("""
+#contentFrame, #contentFrame QFrame {
+    background-color: $frame_bg;
+    border-radius: 15px;
+    border: 1px solid $frame_border;
+}
+#contentFrame GlassFrame {
+    background-color: $glass_bg;
+    border-radius: 15px;
+    border: 1px solid $glass_border;
+}
+.ModernButton {
+    background-color: transparent;
+    border: none;
+    border-radius: 22px;
+}
+.ModernButton:hover {
+    background-color: $control_hover;
+}
+.ModernButton:pressed {
+    background-color: $control_pressed;
+}
+.ModernButton:disabled {
+    opacity: 0.5;
+}
+CloseButton {
+    background-color: transparent;
+    color: $close_text;
+    border-radius: 12px;
+    font-size: 30px;
+    font-weight: bold;
+}
+CloseButton:hover {
+    background-color: $close_hover;
+    color: white;
+}
+#contentFrame #accountButton, #contentFrame #settingsButton {
+    background-color: $round_button_bg;
+    border: none;
+    padding: 8px;
+    border-radius: 20px;
+}
+#contentFrame #accountButton:hover, #contentFrame #settingsButton:hover {
+    background-color: $round_button_hover;
+}
+#contentFrame #powerLabel {
+    color: $text_muted;
+    background-color: transparent;
+    border: none;
+}
+#contentFrame #searchBox {
+    background-color: $input_bg;
+    color: $text;
+    border: none;
+    border-radius: 16px;
+    padding: 0px 12px;
+}
+#contentFrame #searchResults {
+    background-color: $popup_bg;
+    color: $popup_text;
+    border: none;
+    border-radius: 8px;
+    padding: 5px;
+}
+#contentFrame #searchResults::item {
+    padding: 6px 10px;
+    border-radius: 4px;
+}
+#contentFrame #searchResults::item:selected {
+    background-color: $popup_selected;
+}
+#contentFrame #statusLabel {
+    color: $text_muted;
+    background-color: transparent;
+    border: none;
+}
+#contentFrame #songContainer, #contentFrame #songContainer QWidget {
+    background-color: transparent;
+    border: none;
+}
+#contentFrame #songLabel {
+    color: $text;
+    background-color: transparent;
+    border: none;
+}
+#contentFrame #artistLabel {
+    color: $text_secondary;
+    background-color: transparent;
+    border: none;
+}
+#contentFrame #lyricsLabel {
+    color: $text_lyrics;
+    background-color: transparent;
+    border: none;
+}
+#contentFrame #volumeIcon {
+    color: $text_muted;
+}
+#contentFrame #volumeSlider::groove:horizontal {
+    border: none;
+    height: 4px;
+    background: $slider_groove;
+    margin: 2px 0;
+    border-radius: 2px;
+    opacity: 0.5;
+}
+#contentFrame #volumeSlider::handle:horizontal {
+    background: $slider_handle;
+    border: none;
+    width: 12px;
+    height: 12px;
+    margin: -4px 0;
+    border-radius: 6px;
+    opacity: 0.5;
+}
+#contentFrame #volumeSlider::handle:horizontal:hover {
+    background: $slider_handle_hover;
+    width: 14px;
+    height: 14px;
+    margin: -5px 0;
+    opacity: 0.7;
+}
+#contentFrame #volumeSlider::sub-page:horizontal {
+    background: $slider_fill;
+    border-radius: 2px;
+    opacity: 0.5;
+}
+#accountMenu, #accountMenu QMenu {
+    background-color: $popup_bg;
+    border: none;
+    border-radius: 8px;
+    padding: 5px;
+}
+#accountMenu::item, #accountMenu QMenu::item {
+    color: $popup_text;
+    padding: 8px 20px;
+    border: none;
+    border-radius: 4px;
+}
+#accountMenu::item:selected, #accountMenu QMenu::item:selected {
+    background-color: $popup_selected;
+}
+""")
+
+_compiled = {}
+
+
+def build_stylesheet(name):
+    """Return the stylesheet text for a theme, built once per theme"""
+    if name not in _compiled:
+        _compiled[name] = STYLESHEET.substitute(THEMES[name])
+    return _compiled[name]
+
+
+def apply_theme(app, name):
+    """Install a theme as the one application stylesheet; unknown names fall back to dark"""
+    name = name if name in THEMES else 'dark'
+    sheet = build_stylesheet(name)
+    if app.styleSheet() != sheet:
+        app.setStyleSheet(sheet)
+    return name
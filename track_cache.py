@@ -0,0 +1,203 @@
+import json
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from now_playing_publisher import replace_file
+
+TrackInfo = namedtuple('TrackInfo', 'id name artist album duration_ms art_url')
+
+# Bump when the saved fields change; caches from other versions are ignored
+CACHE_VERSION = 1
+
+# The most ids GET /tracks accepts in one call
+MAX_IDS_PER_CALL = 50
+
+
+def track_info(track):
+    """Keep what the widget shows of a full or simplified track object, or None when it has no id"""
+    if not track or not track.get('id'):
+        return None
+    artists = track.get('artists') or []
+    album = track.get('album') or {}
+    images = album.get('images') or []
+    return TrackInfo(track['id'], track.get('name') or '', artists[0].get('name', '') if artists else '',
+                     album.get('name'), track.get('duration_ms') or 0, images[-1].get('url') if images else None)
+
+
+def _gather(found, waiting):
+    """One future for the cached tracks plus those still being fetched, keyed by id"""
+    result = Future()
+    if not waiting:
+        result.set_result(found)
+        return result
+    remaining = [len(waiting)]
+    lock = threading.Lock()
+
+    def on_done(track_id, future):
+        info = future.result()
+        with lock:
+            if info is not None:
+                found[track_id] = info
+            remaining[0] -= 1
+            finished = remaining[0] == 0
+        if finished:
+            result.set_result(found)
+
+    for track_id, future in waiting.items():
+        future.add_done_callback(lambda future, track_id=track_id: on_done(track_id, future))
+    return result
+
+
+class TrackCache:
+    """Track metadata by Spotify id: filled from playback payloads, missing ids fetched 50 per call"""
+
+    def __init__(self, path, client=None, max_entries=5000):
+        self.path = path
+        # Anything with get(path, params) -> (data, etag), like LibraryClient
+        self.client = client
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Ids being fetched or waiting for a batch, each with the future its callers share
+        self._pending = {}
+        self._queued = []
+        self._draining = False
+        self._dirty = False
+        # One worker sends the batches in order and writes the file after them
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='TrackCache')
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def load(self):
+        """Read the tracks saved by the last run; entries added since are kept"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.error(f"Error reading track cache: {str(e)}")
+            return
+        if not isinstance(saved, dict) or saved.get('version') != CACHE_VERSION:
+            return
+        try:
+            entries = OrderedDict((row[0], TrackInfo(*row)) for row in saved.get('tracks') or [])
+        except (TypeError, IndexError, KeyError) as e:
+            # A row of the wrong shape: the file can't be trusted, so start empty; the next save replaces it
+            logging.error(f"Discarding malformed track cache: {str(e)}")
+            return
+        with self._lock:
+            # The file is oldest first; what this run already saw is newer still
+            entries.update(self.entries)
+            self.entries = entries
+            self._trim()
+
+    def get(self, track_id):
+        """Return a cached track or None, without fetching it"""
+        with self._lock:
+            info = self.entries.get(track_id)
+            if info is not None:
+                self.entries.move_to_end(track_id)
+            return info
+
+    def add_tracks(self, tracks):
+        """Remember full or simplified track objects that came with another response"""
+        infos = [info for info in map(track_info, tracks) if info is not None and info.album is not None]
+        if not infos:
+            return
+        with self._lock:
+            for info in infos:
+                if self.entries.get(info.id) != info:
+                    self._dirty = True
+                self.entries[info.id] = info
+                self.entries.move_to_end(info.id)
+            self._trim()
+
+    def add_from_playback(self, current):
+        """Remember the track of a current_playback() payload"""
+        if current and current.get('item'):
+            self.add_tracks([current['item']])
+
+    def resolve(self, track_ids):
+        """Return a future of {id: TrackInfo} for the ids; misses are fetched in batches off the calling thread
+
+        Ids another caller is already waiting for share its request. Ids the API doesn't know, and ids
+        whose batch failed, are left out of the result.
+        """
+        found = {}
+        waiting = {}
+        with self._lock:
+            for track_id in dict.fromkeys(track_ids):
+                if not track_id:
+                    continue
+                info = self.entries.get(track_id)
+                if info is not None:
+                    self.entries.move_to_end(track_id)
+                    found[track_id] = info
+                    self.hits += 1
+                elif track_id in self._pending:
+                    waiting[track_id] = self._pending[track_id]
+                    self.coalesced += 1
+                else:
+                    waiting[track_id] = self._pending[track_id] = Future()
+                    self._queued.append(track_id)
+                    self.misses += 1
+            if self._queued and not self._draining:
+                self._draining = True
+                self.executor.submit(self._drain)
+        return _gather(found, waiting)
+
+    def _drain(self):
+        # Misses that arrive while a batch is in flight join the next one
+        while True:
+            with self._lock:
+                batch = self._queued[:MAX_IDS_PER_CALL]
+                del self._queued[:MAX_IDS_PER_CALL]
+                if not batch:
+                    self._draining = False
+                    dirty, self._dirty = self._dirty, False
+                    break
+            infos = self._fetch(batch)
+            with self._lock:
+                for info in infos.values():
+                    self.entries[info.id] = info
+                    self._dirty = True
+                self._trim()
+                futures = [(self._pending.pop(track_id), infos.get(track_id)) for track_id in batch]
+            for future, info in futures:
+                future.set_result(info)
+        if dirty:
+            self._save()
+
+    def _fetch(self, batch):
+        if self.client is None:
+            return {}
+        try:
+            data, _ = self.client.get('tracks', {'ids': ','.join(batch), 'market': self.client.market})
+        except Exception as e:
+            logging.error(f"Error fetching track details: {str(e)}")
+            return {}
+        infos = (track_info(track) for track in data.get('tracks') or [])
+        return {info.id: info for info in infos if info is not None}
+
+    def _trim(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _save(self):
+        with self._lock:
+            saved = {'version': CACHE_VERSION, 'tracks': [list(info) for info in self.entries.values()]}
+        try:
+            replace_file(self.path, json.dumps(saved))
+        except OSError as e:
+            logging.error(f"Error writing track cache: {str(e)}")
+
+    def close(self):
+        """Finish pending batches, then save tracks added since the last write"""
+        self.executor.shutdown(wait=True)
+        with self._lock:
+            dirty, self._dirty = self._dirty, False
+        if dirty:
+            self._save()
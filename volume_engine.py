@@ -0,0 +1,160 @@
+import logging
+import time
+from PyQt5.QtCore import QObject, QTimer, QEasingCurve, pyqtSignal
+
+
+class PycawBackend:
+    """The system master volume through pycaw"""
+
+    def __init__(self):
+        self._endpoint = None
+
+    def _volume(self):
+        if self._endpoint is None:
+            from ctypes import cast, POINTER
+            from comtypes import CLSCTX_ALL
+            from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
+
+            devices = AudioUtilities.GetSpeakers()
+            interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
+            self._endpoint = cast(interface, POINTER(IAudioEndpointVolume))
+        return self._endpoint
+
+    def set_level(self, percent):
+        try:
+            self._volume().SetMasterVolumeLevelScalar(percent / 100.0, None)
+        except Exception:
+            self._endpoint = None
+            raise
+
+    def release(self):
+        """Drop the endpoint between ramps, so the next one follows a change of default device"""
+        self._endpoint = None
+
+
+class VolumeEngine(QObject):
+    # The level the user asked for; the slider shows this, not the level mid-ramp
+    target_changed = pyqtSignal(int)
+    write_failed = pyqtSignal(str)
+
+    def __init__(self, backend, ramp_ms=150, fade_ms=0, interval_ms=15):
+        super().__init__()
+        self.backend = backend
+        self.ramp_ms = ramp_ms
+        # Fade out before pausing and in after playing; 0 turns it off
+        self.fade_ms = fade_ms
+        # Steps respond quickly; fades ease in and out so neither end is abrupt
+        self.curve = QEasingCurve(QEasingCurve.OutCubic)
+        self.fade_curve = QEasingCurve(QEasingCurve.InOutSine)
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self._tick)
+        self.target = None
+        # Level last written to the backend; None until the first write
+        self.level = None
+        self.writes = 0
+        self.fading = False
+        self._ramp = None
+
+    def set_target(self, value):
+        """Ease toward a new level; presses and drags that arrive mid-ramp just move the target"""
+        value = max(0, min(100, int(value)))
+        if value == self.target:
+            return
+        self.target = value
+        self.target_changed.emit(value)
+        if self.fading:
+            # Applied when the fade ends
+            return
+        if self.level is None:
+            # Nothing to ease from yet
+            self._write(value)
+            return
+        self._start_ramp(value, self.ramp_ms)
+
+    def nudge(self, delta, current=0):
+        """Move the target by a step, counting from where earlier steps were heading
+
+        current is the level to count from when nothing has been set yet.
+        """
+        self.set_target((self.target if self.target is not None else current) + delta)
+
+    def fade_out(self, then):
+        """Fade to silence and call then() once it's reached; the level comes back with end_fade()"""
+        self.fading = True
+        if not self.fade_ms or self.level is None:
+            self._write(0)
+            then()
+            return
+        self._start_ramp(0, self.fade_ms, then, self.fade_curve)
+
+    def silence(self):
+        """Go silent right away, ahead of a play command that will be followed by end_fade()"""
+        self.fading = True
+        self._stop_ramp()
+        self._write(0)
+
+    def end_fade(self, fade_in):
+        """Bring the target level back, easing in after a play or at once after a pause"""
+        if not self.fading:
+            return
+        self.fading = False
+        if self.target is None:
+            return
+        if fade_in and self.fade_ms:
+            self._start_ramp(self.target, self.fade_ms, curve=self.fade_curve)
+        else:
+            self._stop_ramp()
+            self._write(self.target)
+            self.backend.release()
+
+    def stop(self):
+        """Settle on the target at once, so closing mid-ramp or mid-fade doesn't leave the volume behind"""
+        self.fading = False
+        self._stop_ramp()
+        if self.target is not None:
+            self._write(self.target)
+        self.backend.release()
+
+    def _start_ramp(self, end, duration_ms, on_done=None, curve=None):
+        # After a failed write the level is unknown, so there's nothing to ease from
+        self._ramp = (self.level if self.level is not None else end, end, time.monotonic(), duration_ms, on_done,
+                      curve or self.curve)
+        self._tick()
+        # Restarting a running timer would starve it while a drag keeps moving the target
+        if self._ramp is not None and not self.timer.isActive():
+            self.timer.start()
+
+    def _stop_ramp(self):
+        self.timer.stop()
+        self._ramp = None
+
+    def _tick(self):
+        start, end, started, duration_ms, on_done, curve = self._ramp
+        progress = min(1.0, (time.monotonic() - started) * 1000 / duration_ms) if duration_ms > 0 else 1.0
+        written = self._write(start + (end - start) * curve.valueForProgress(progress))
+        if written and progress < 1.0:
+            return
+        self._stop_ramp()
+        self.backend.release()
+        if written and not self.fading:
+            logging.info(f"Volume set to {end}%")
+        # A failed write ends the ramp early, but the pause waiting on a fade still has to go out
+        if on_done:
+            on_done()
+
+    def _write(self, level):
+        """Write a level, skipping it when it rounds to what was last written"""
+        level = round(level)
+        if level == self.level:
+            return True
+        try:
+            self.backend.set_level(level)
+        except Exception as e:
+            logging.error(f"Error setting volume: {str(e)}")
+            self._stop_ramp()
+            self.write_failed.emit(str(e))
+            return False
+        self.level = level
+        self.writes += 1
+        return True